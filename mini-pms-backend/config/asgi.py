@@ -16,8 +16,13 @@ os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
 
 django_asgi_app = get_asgi_application()
 
+from django.conf import settings
 from projects.routing import websocket_urlpatterns
 
+if settings.PREWARM_SCHEMA:
+    from projects.startup import prewarm
+    prewarm()
+
 application = ProtocolTypeRouter({
     'http': django_asgi_app,
     'websocket': URLRouter(websocket_urlpatterns),
@@ -13,6 +13,8 @@ https://docs.djangoproject.com/en/6.0/ref/settings/
 import os
 from pathlib import Path
 
+from corsheaders.defaults import default_headers
+
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 
@@ -106,6 +108,21 @@ else:
         }
     }
 
+# Tenant shards (projects/sharding.py)
+# DB_SHARDS=shard1,shard2 adds one database per alias next to 'default': a
+# PostgreSQL database named <DB_NAME>_<alias>, or db-<alias>.sqlite3. An
+# organization and everything it owns live on one of them; organizations
+# not listed in the TenantPlacement directory stay on 'default'. Move one
+# with `manage.py move_tenant <slug> <alias>`. Each alias hands out ids from
+# a range chosen by its position, so add new shards at the end.
+DB_SHARDS = [alias.strip() for alias in os.environ.get('DB_SHARDS', '').split(',') if alias.strip()]
+for alias in DB_SHARDS:
+    if USE_POSTGRES:
+        DATABASES[alias] = {**DATABASES['default'], 'NAME': f"{DATABASES['default']['NAME']}_{alias}"}
+    else:
+        DATABASES[alias] = {**DATABASES['default'], 'NAME': BASE_DIR / f'db-{alias}.sqlite3'}
+DATABASE_ROUTERS = ['projects.sharding.TenantRouter']
+
 
 # Password validation
 # https://docs.djangoproject.com/en/6.0/ref/settings/#auth-password-validators
@@ -152,6 +169,94 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 AUTH_USER_MODEL = 'projects.User'
 
 
+# Password hashing pool (projects/hashing.py)
+# Hashing and verification run on a bounded process pool instead of the
+# request worker. WORKERS=0 hashes inline; MAX_PENDING caps queued + running jobs.
+PASSWORD_HASHING_POOL = {
+    'WORKERS': int(os.environ.get('PASSWORD_HASH_WORKERS', '2')),
+    'MAX_PENDING': int(os.environ.get('PASSWORD_HASH_MAX_PENDING', '32')),
+    'TIMEOUT': 10,
+}
+
+
+# Admission control for auth mutations (projects/ratelimit.py)
+# Rules are (attempts, seconds) per client IP and per email. BACKEND 'memory'
+# keeps token buckets in-process; 'cache' shares sliding-window counters
+# across workers through the Django cache.
+AUTH_RATE_LIMITS = {
+    'ENABLED': os.environ.get('AUTH_RATE_LIMIT_ENABLED', 'True') == 'True',
+    'BACKEND': os.environ.get('AUTH_RATE_LIMIT_BACKEND', 'memory'),
+    'MAX_KEYS': 10000,
+    'TRUST_X_FORWARDED_FOR': os.environ.get('TRUST_X_FORWARDED_FOR', 'False') == 'True',
+    'RULES': {
+        'login': {'ip': (30, 60), 'email': (10, 300)},
+        'register': {'ip': (10, 3600)},
+        'create_org_member': {'ip': (30, 60)},
+    },
+}
+
+
+# Background deletes (projects/purge.py)
+# DeleteProject / DeleteOrgMember only mark rows as deleted; the rows are
+# removed after commit on a background thread in BATCH_SIZE id batches.
+DELETION_WORKER = {
+    'BACKGROUND': True,
+    'BATCH_SIZE': 1000,
+}
+
+
+# Subscription connections (projects/consumers.py)
+# Each connection queues at most SEND_QUEUE_SIZE outgoing messages; when a
+# client reads slower than events arrive the oldest results are dropped
+# ('drop') or the connection is closed with 1013 ('disconnect'). The server
+# pings every KEEPALIVE_INTERVAL seconds and closes connections silent for
+# KEEPALIVE_TIMEOUT seconds or not initialised within CONNECTION_INIT_TIMEOUT.
+# Board presence changes are sent every PRESENCE_TICK seconds; viewers
+# announced by another process expire after PRESENCE_TTL seconds.
+SUBSCRIPTIONS = {
+    'SEND_QUEUE_SIZE': 32,
+    'SLOW_CONSUMER_POLICY': 'drop',
+    'KEEPALIVE_INTERVAL': 15,
+    'KEEPALIVE_TIMEOUT': 45,
+    'CONNECTION_INIT_TIMEOUT': 10,
+    'MAX_SUBSCRIPTIONS': 50,
+    'PRESENCE_TICK': 1.0,
+    'PRESENCE_TTL': 30,
+}
+
+
+# Delta sync (projects/sync.py)
+# changesSince re-sends rows updated up to OVERLAP_SECONDS before the cursor
+# and keeps tombstones of deleted rows for TOMBSTONE_RETENTION_DAYS; older
+# cursors, or more than MAX_CHANGES rows of one kind, mean a full reload.
+SYNC = {
+    'OVERLAP_SECONDS': 30,
+    'TOMBSTONE_RETENTION_DAYS': 30,
+    'MAX_CHANGES': 1000,
+}
+
+# GraphQL responses (projects/encoding.py)
+# ENCODER is 'auto' (orjson if installed), 'orjson' or 'json'; an encoder
+# that isn't installed falls back to 'json' with a system check warning.
+# Responses of at least GZIP_MIN_SIZE bytes are gzipped for clients that
+# accept it.
+GRAPHQL_RESPONSE = {
+    'ENCODER': os.environ.get('GRAPHQL_JSON_ENCODER', 'auto'),
+    'GZIP_MIN_SIZE': 1024,
+}
+
+# Startup profile (projects/startup.py)
+# DJANGO_STARTUP_PROFILE=lean leaves out installed apps nothing in the
+# project uses, so workers start faster. DJANGO_PREWARM_SCHEMA=True builds
+# the GraphQL schema when wsgi.py/asgi.py is imported instead of on the
+# first request; run a preloading server so it happens once, before forking.
+STARTUP_PROFILE = os.environ.get('DJANGO_STARTUP_PROFILE', 'full')
+LEAN_SKIPPED_APPS = ['rest_framework', 'django_filters']
+if STARTUP_PROFILE == 'lean':
+    INSTALLED_APPS = [app for app in INSTALLED_APPS if app not in LEAN_SKIPPED_APPS]
+PREWARM_SCHEMA = os.environ.get('DJANGO_PREWARM_SCHEMA', 'False') == 'True'
+
+
 # CORS Configuration
 CORS_ALLOWED_ORIGINS = [
     'http://localhost:5173',
@@ -162,10 +267,14 @@ CORS_ALLOWED_ORIGINS = [
 
 CORS_ALLOW_CREDENTIALS = True
 
+# The frontend names the organization it works on (see OrganizationMiddleware).
+CORS_ALLOW_HEADERS = (*default_headers, 'x-organization-slug')
+
 
 # GraphQL Configuration
 GRAPHENE = {
     'SCHEMA': 'projects.schema.schema',
+    'TESTING_ENDPOINT': '/graphql/',
     'MIDDLEWARE': [
         'graphql_jwt.middleware.JSONWebTokenMiddleware',
     ] if os.environ.get('USE_JWT', 'False') == 'True' else [],
@@ -173,6 +282,9 @@ GRAPHENE = {
 
 
 # Channels Configuration (for WebSocket subscriptions)
+# The in-memory layer only reaches consumers in the same process. dispatch_outbox
+# and run_reminders run as separate processes, so any deployment that uses
+# them needs a shared layer such as Redis (below).
 CHANNEL_LAYERS = {
     'default': {
         'BACKEND': 'channels.layers.InMemoryChannelLayer',
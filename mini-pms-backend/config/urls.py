@@ -4,9 +4,10 @@ URL configuration for config project.
 from django.contrib import admin
 from django.urls import path
 from django.views.decorators.csrf import csrf_exempt
-from graphene_django.views import GraphQLView
+from projects.views import BatchGraphQLView, import_view
 
 urlpatterns = [
     path('admin/', admin.site.urls),
-    path('graphql/', csrf_exempt(GraphQLView.as_view(graphiql=True))),
+    path('graphql/', csrf_exempt(BatchGraphQLView.as_view(graphiql=True))),
+    path('import/', csrf_exempt(import_view)),
 ]
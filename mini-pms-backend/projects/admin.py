@@ -1,12 +1,14 @@
 from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin as BaseUserAdmin
+from .admin_performance import AutocompleteFilter, PerformanceAdminMixin
 from .models import Organization, Project, Task, TaskComment, User
 
 
 @admin.register(User)
-class UserAdmin(BaseUserAdmin):
+class UserAdmin(PerformanceAdminMixin, BaseUserAdmin):
     list_display = ['email', 'name', 'organization', 'role', 'is_active', 'created_at']
-    list_filter = ['role', 'is_active', 'organization']
+    list_filter = ['role', 'is_active', ('organization', AutocompleteFilter)]
+    list_select_related = ['organization']
     search_fields = ['email', 'name']
     ordering = ['email']
 
@@ -33,23 +35,31 @@ class OrganizationAdmin(admin.ModelAdmin):
 
 
 @admin.register(Project)
-class ProjectAdmin(admin.ModelAdmin):
+class ProjectAdmin(PerformanceAdminMixin, admin.ModelAdmin):
     list_display = ['name', 'organization', 'status', 'due_date', 'created_at']
-    list_filter = ['status', 'organization']
+    list_filter = ['status', ('organization', AutocompleteFilter)]
+    list_select_related = ['organization']
+    autocomplete_fields = ['organization']
     search_fields = ['name', 'description']
     date_hierarchy = 'created_at'
 
 
 @admin.register(Task)
-class TaskAdmin(admin.ModelAdmin):
+class TaskAdmin(PerformanceAdminMixin, admin.ModelAdmin):
     list_display = ['title', 'project', 'status', 'assignee_email', 'due_date', 'created_at']
-    list_filter = ['status', 'project__organization']
-    search_fields = ['title', 'description', 'assignee_email']
-    date_hierarchy = 'created_at'
+    list_filter = ['status', ('project', AutocompleteFilter), ('project__organization', AutocompleteFilter)]
+    list_select_related = ['project']
+    autocomplete_fields = ['project']
+    indexed_search = True
+    search_fields = ['id__exact', 'assignee_email__exact', 'title__startswith']
+    ordering = ['-id']
 
 
 @admin.register(TaskComment)
-class TaskCommentAdmin(admin.ModelAdmin):
+class TaskCommentAdmin(PerformanceAdminMixin, admin.ModelAdmin):
     list_display = ['task', 'author_email', 'created_at']
-    search_fields = ['content', 'author_email']
-    date_hierarchy = 'created_at'
+    list_select_related = ['task']
+    autocomplete_fields = ['task']
+    indexed_search = True
+    search_fields = ['id__exact', 'task__id__exact']
+    ordering = ['-id']
@@ -0,0 +1,160 @@
+import json
+
+from django import forms
+from django.contrib import admin
+from django.contrib.admin.utils import get_fields_from_path
+from django.contrib.admin.widgets import AutocompleteSelect
+from django.core.exceptions import ValidationError
+from django.core.paginator import Paginator
+from django.db import connections
+from django.db.models import EmailField, Q
+from django.utils.functional import cached_property
+
+
+# Below this many rows an exact COUNT(*) is cheap enough to run.
+ESTIMATE_THRESHOLD = 10000
+
+
+def estimate_count(queryset):
+    """
+    Row count of ``queryset`` from planner statistics, or None if there are none.
+
+    PostgreSQL: pg_class.reltuples for an unfiltered table, otherwise the
+    planner's row estimate from EXPLAIN. SQLite: the row count recorded by
+    ANALYZE in sqlite_stat1, for unfiltered tables only.
+    """
+    connection = connections[queryset.db]
+    table = queryset.model._meta.db_table
+    unfiltered = not queryset.query.where
+    with connection.cursor() as cursor:
+        if connection.vendor == 'postgresql':
+            if unfiltered:
+                cursor.execute('SELECT reltuples FROM pg_class WHERE oid = %s::regclass', [table])
+                row = cursor.fetchone()
+                return int(row[0]) if row and row[0] >= 0 else None
+            sql, params = queryset.query.sql_with_params()
+            cursor.execute('EXPLAIN (FORMAT JSON) ' + sql, params)
+            plan = cursor.fetchone()[0]
+            if isinstance(plan, str):
+                plan = json.loads(plan)
+            return int(plan[0]['Plan']['Plan Rows'])
+        if connection.vendor == 'sqlite' and unfiltered:
+            cursor.execute("SELECT name FROM sqlite_master WHERE type = 'table' AND name = 'sqlite_stat1'")
+            if cursor.fetchone() is None:
+                return None
+            # Each stat starts with the number of rows in the index; the
+            # widest index (partial ones are smaller) holds every row.
+            cursor.execute('SELECT MAX(CAST(stat AS INTEGER)) FROM sqlite_stat1 WHERE tbl = %s', [table])
+            row = cursor.fetchone()
+            return row[0] if row else None
+    return None
+
+
+class EstimatedCountPaginator(Paginator):
+    """
+    Paginator that trusts planner statistics for large result sets.
+
+    An exact COUNT(*) over millions of rows scans the table on every
+    changelist page; the estimate is used instead once it reaches
+    ESTIMATE_THRESHOLD rows, so page counts near the end are approximate.
+    """
+
+    @cached_property
+    def count(self):
+        try:
+            estimate = estimate_count(self.object_list)
+        except Exception:
+            estimate = None
+        if estimate is not None and estimate >= ESTIMATE_THRESHOLD:
+            return estimate
+        return super().count
+
+
+class AutocompleteFilter(admin.RelatedFieldListFilter):
+    """
+    Foreign key filter with a search box instead of a link per related row.
+
+    Uses the admin's autocomplete view, so the related model's admin must
+    define search_fields. Use as ``('project__organization', AutocompleteFilter)``.
+    """
+    template = 'admin/projects/autocomplete_filter.html'
+
+    def __init__(self, field, request, params, model, model_admin, field_path):
+        self.request = request
+        self.admin_site = model_admin.admin_site
+        super().__init__(field, request, params, model, model_admin, field_path)
+
+    def field_choices(self, field, request, model_admin):
+        return []
+
+    def has_output(self):
+        return True
+
+    def choices(self, changelist):
+        yield {
+            'selected': not self.lookup_val,
+            'query_string': changelist.get_query_string(remove=[self.lookup_kwarg, self.lookup_kwarg_isnull]),
+            'display': 'All',
+        }
+
+    def hidden_params(self):
+        """Query parameters of the changelist that the filter form must keep."""
+        skip = {self.lookup_kwarg, self.lookup_kwarg_isnull, 'p'}
+        return [(name, value) for name, values in self.request.GET.lists() if name not in skip for value in values]
+
+    def rendered_widget(self):
+        related = self.field.remote_field.model
+        choice = forms.ModelChoiceField(
+            queryset=related._default_manager.all(),
+            widget=AutocompleteSelect(self.field, self.admin_site, attrs={'onchange': 'this.form.submit()'}),
+        )
+        value = self.lookup_val[-1] if self.lookup_val else None
+        return choice.widget.render(self.lookup_kwarg, value, attrs={'id': f'filter_{self.lookup_kwarg}'})
+
+
+class PerformanceAdminMixin:
+    """
+    ModelAdmin settings for tables too large for the admin's defaults.
+
+    - related objects in list_display are joined via list_select_related;
+    - AutocompleteFilter is used for foreign key filters;
+    - the paginator estimates large counts, and the unfiltered total is not
+      counted a second time (show_full_result_count);
+    - with ``indexed_search``, search_fields are lookups that can use an
+      index (``id__exact``, ``email__exact``, ``title__startswith``) and
+      are matched against the whole search term instead of every word
+      with ``icontains``.
+    """
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    indexed_search = False
+
+    @property
+    def media(self):
+        media = super().media
+        for entry in self.list_filter:
+            if isinstance(entry, tuple) and entry[1] is AutocompleteFilter:
+                field = get_fields_from_path(self.model, entry[0])[-1]
+                return media + AutocompleteSelect(field, self.admin_site).media
+        return media
+
+    def get_search_results(self, request, queryset, search_term):
+        if not self.indexed_search:
+            return super().get_search_results(request, queryset, search_term)
+        term = search_term.strip()
+        if not term:
+            return queryset, False
+        query = Q()
+        for lookup in self.get_search_fields(request):
+            field = get_fields_from_path(self.model, lookup.rsplit('__', 1)[0])[-1]
+            try:
+                value = field.to_python(term)
+            except ValidationError:
+                continue
+            if isinstance(field, EmailField):
+                # Emails are stored lower-cased.
+                value = value.lower()
+            query |= Q(**{lookup: value})
+        if not query:
+            return queryset.none(), False
+        return queryset.filter(query), False
@@ -3,3 +3,12 @@ from django.apps import AppConfig
 
 class ProjectsConfig(AppConfig):
     name = 'projects'
+
+    def ready(self):
+        from django.core import checks
+        from django.db.models.signals import post_migrate
+
+        from .encoding import check_encoder
+        from .sharding import reserve_id_range_after_migrate
+        checks.register(check_encoder)
+        post_migrate.connect(reserve_id_range_after_migrate, sender=self)
@@ -0,0 +1,254 @@
+from datetime import timedelta
+
+from django.db import transaction
+from django.utils import timezone
+
+from .models import (
+    ArchivedProject, ArchivedTask, ArchivedTaskComment, Project, Task, TaskComment, Tombstone,
+)
+from .sharding import tenant_db
+from .sync import record_tombstones
+
+
+DEFAULT_ARCHIVE_AFTER_DAYS = 90
+DEFAULT_BATCH_SIZE = 500
+
+PROJECT_FIELDS = ['id', 'organization_id', 'name', 'description', 'status', 'due_date', 'created_at', 'updated_at']
+TASK_FIELDS = ['id', 'project_id', 'title', 'description', 'status', 'assignee_email', 'due_date', 'created_at', 'updated_at']
+COMMENT_FIELDS = ['id', 'task_id', 'content', 'author_email', 'created_at', 'updated_at']
+
+
+def _values(instance, fields):
+    return {name: getattr(instance, name) for name in fields}
+
+
+def _raw_delete(queryset):
+    # Rows have already been copied to the archive tables; skip the cascade
+    # collector so the history tables (no DB-level FK) keep their rows.
+    return queryset._raw_delete(queryset.db)
+
+
+def _insert_raw(model, instances, fields):
+    """Insert instances keeping their ids and timestamps (auto_now/auto_now_add are not applied)."""
+    if instances:
+        model._base_manager._insert(instances, fields=[model._meta.get_field(name) for name in fields], raw=True)
+
+
+# Reading archived rows as regular model instances; they keep the database
+# they were read from, so their fields are loaded from the same one.
+
+def as_project(archived):
+    project = Project(**_values(archived, PROJECT_FIELDS))
+    project._state.db = archived._state.db
+    project.is_archived = True
+    return project
+
+
+def as_task(archived):
+    task = Task(**_values(archived, TASK_FIELDS))
+    task._state.db = archived._state.db
+    task.is_archived = True
+    return task
+
+
+def as_comment(archived):
+    comment = TaskComment(**_values(archived, COMMENT_FIELDS))
+    comment._state.db = archived._state.db
+    comment.is_archived = True
+    return comment
+
+
+def archived_projects(*args, **kwargs):
+    """Archived projects matching the given filters, as Project instances."""
+    return [as_project(row) for row in ArchivedProject.objects.filter(*args, **kwargs)]
+
+
+def _visible_archived_tasks():
+    # Like their live tasks, the archived tasks of a project marked for
+    # deletion stay hidden until projects.purge removes them.
+    return ArchivedTask.objects.exclude(
+        project_id__in=Project.all_objects.filter(deleted_at__isnull=False).values('id')
+    )
+
+
+def archived_tasks(*args, **kwargs):
+    """Archived tasks matching the given filters, as Task instances."""
+    return [as_task(row) for row in _visible_archived_tasks().filter(*args, **kwargs)]
+
+
+def archived_comments(task_id, using=None):
+    return [as_comment(row) for row in ArchivedTaskComment.objects.using(using).filter(task_id=task_id)]
+
+
+def find_project(pk, include_archived=False):
+    """Return the live project, or its archived copy when ``include_archived`` is set."""
+    project = Project.objects.select_related('organization').filter(pk=pk).first()
+    if project is None and include_archived:
+        archived = ArchivedProject.objects.filter(pk=pk).first()
+        project = as_project(archived) if archived else None
+    return project
+
+
+def find_task(pk, include_archived=False):
+    task = Task.objects.select_related('project').filter(pk=pk).first()
+    if task is None and include_archived:
+        archived = _visible_archived_tasks().filter(pk=pk).first()
+        task = as_task(archived) if archived else None
+    return task
+
+
+# Archiving
+
+def _archive_comments(task_ids):
+    comments = list(TaskComment.objects.filter(task_id__in=task_ids))
+    ArchivedTaskComment.objects.bulk_create([
+        ArchivedTaskComment(**_values(comment, COMMENT_FIELDS)) for comment in comments
+    ])
+    _raw_delete(TaskComment.objects.filter(task_id__in=task_ids))
+    return len(comments)
+
+
+def _archive_tasks(tasks, organization_ids):
+    ArchivedTask.objects.bulk_create([
+        ArchivedTask(organization_id=organization_ids[task.project_id], **_values(task, TASK_FIELDS))
+        for task in tasks
+    ])
+    task_ids = [task.id for task in tasks]
+    comments = _archive_comments(task_ids)
+    _raw_delete(Task.objects.filter(pk__in=task_ids))
+    return comments
+
+
+def archive_projects(project_ids):
+    """Move projects with all their tasks and comments to the archive tables."""
+    with transaction.atomic(using=tenant_db()):
+        projects = list(Project.objects.select_for_update().filter(pk__in=project_ids))
+        organization_ids = {project.id: project.organization_id for project in projects}
+        ArchivedProject.objects.bulk_create([
+            ArchivedProject(**_values(project, PROJECT_FIELDS)) for project in projects
+        ])
+        tasks = list(Task.objects.filter(project_id__in=organization_ids))
+        _archive_tasks(tasks, organization_ids)
+        _raw_delete(Project.objects.filter(pk__in=organization_ids))
+        # Synced clients drop archived rows like deleted ones (and a
+        # project's tasks with it); restoring stamps them as changed again.
+        record_tombstones(Tombstone.PROJECT, [(project.id, project.organization_id, None) for project in projects])
+    return len(projects), len(tasks)
+
+
+def archive_tasks(task_ids):
+    """Move tasks and their comments to the archive tables."""
+    with transaction.atomic(using=tenant_db()):
+        tasks = list(Task.objects.select_for_update().select_related('project').filter(pk__in=task_ids))
+        _archive_tasks(tasks, {task.project_id: task.project.organization_id for task in tasks})
+        record_tombstones(Tombstone.TASK, [(task.id, task.project.organization_id, task.project_id) for task in tasks])
+    return len(tasks)
+
+
+def archive_completed(older_than=timedelta(days=DEFAULT_ARCHIVE_AFTER_DAYS), batch_size=DEFAULT_BATCH_SIZE,
+                      now=None, progress=None):
+    """
+    Archive COMPLETED projects and DONE tasks not updated within ``older_than``.
+
+    Work is done in batches of ``batch_size`` ids, each in its own
+    transaction, so locks are short and an interrupted run keeps the
+    batches it finished. Returns {'projects': n, 'tasks': n}.
+    """
+    cutoff = (now or timezone.now()) - older_than
+    totals = {'projects': 0, 'tasks': 0}
+
+    projects = Project.objects.filter(status='COMPLETED', updated_at__lt=cutoff).order_by('id')
+    while True:
+        ids = list(projects.values_list('id', flat=True)[:batch_size])
+        if not ids:
+            break
+        archived, tasks = archive_projects(ids)
+        totals['projects'] += archived
+        totals['tasks'] += tasks
+        if progress:
+            progress(totals)
+
+    tasks = Task.objects.filter(status='DONE', updated_at__lt=cutoff).order_by('id')
+    while True:
+        ids = list(tasks.values_list('id', flat=True)[:batch_size])
+        if not ids:
+            break
+        totals['tasks'] += archive_tasks(ids)
+        if progress:
+            progress(totals)
+    return totals
+
+
+# Restoring
+
+def _restored(model, row, fields, now):
+    # A fresh updated_at brings the row back to clients that synced its
+    # archiving (see changesSince); created_at and the id are kept.
+    return model(**{**_values(row, fields), 'updated_at': now})
+
+
+def _restore_comments(task_ids, now):
+    archived = ArchivedTaskComment.objects.filter(task_id__in=task_ids)
+    _insert_raw(TaskComment, [_restored(TaskComment, row, COMMENT_FIELDS, now) for row in archived], COMMENT_FIELDS)
+    archived.delete()
+
+
+def _restore_tasks(archived, now):
+    rows = list(archived)
+    _insert_raw(Task, [_restored(Task, row, TASK_FIELDS, now) for row in rows], TASK_FIELDS)
+    task_ids = [row.id for row in rows]
+    _restore_comments(task_ids, now)
+    ArchivedTask.objects.filter(pk__in=task_ids).delete()
+
+
+def restore_project(pk):
+    """Move an archived project and its archived tasks back. Returns False if it isn't archived."""
+    with transaction.atomic(using=tenant_db()):
+        archived = ArchivedProject.objects.select_for_update().filter(pk=pk).first()
+        if archived is None:
+            return False
+        now = timezone.now()
+        _insert_raw(Project, [_restored(Project, archived, PROJECT_FIELDS, now)], PROJECT_FIELDS)
+        _restore_tasks(ArchivedTask.objects.filter(project_id=pk), now)
+        archived.delete()
+    return True
+
+
+def restore_task(pk):
+    """Move an archived task (and its project, if archived) back. Returns False if it isn't archived."""
+    with transaction.atomic(using=tenant_db()):
+        archived = ArchivedTask.objects.select_for_update().filter(pk=pk).first()
+        if archived is None:
+            return False
+        if not Project.objects.filter(pk=archived.project_id).exists():
+            return restore_project(archived.project_id)
+        _restore_tasks([archived], timezone.now())
+    return True
+
+
+def restore_comment(pk):
+    archived = ArchivedTaskComment.objects.filter(pk=pk).first()
+    return archived is not None and restore_task(archived.task_id)
+
+
+RESTORERS = {
+    Project: restore_project,
+    Task: restore_task,
+    TaskComment: restore_comment,
+}
+
+
+def get_or_restore(model, pk, queryset=None):
+    """
+    Like ``model.objects.get(pk=pk)``, restoring the row from the archive first if needed.
+
+    Mutations use this so that editing an archived project, task or comment
+    brings it back into the hot tables transparently.
+    """
+    queryset = queryset if queryset is not None else model.objects.all()
+    try:
+        return queryset.get(pk=pk)
+    except model.DoesNotExist:
+        if not RESTORERS[model](pk):
+            raise
+    return queryset.get(pk=pk)
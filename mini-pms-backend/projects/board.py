@@ -0,0 +1,68 @@
+from django.db.models import Count, F, Q, RowRange, Window
+from django.db.models.functions import RowNumber
+
+from .models import Task
+from .pagination import encode_cursor, newest_first_page
+
+
+COLUMNS = [status for status, _ in Task.STATUS_CHOICES]
+
+
+def board_filters(project_id, search=None, assignee_email=None):
+    filters = Q(project_id=project_id)
+    if search:
+        filters &= Q(title__icontains=search) | Q(description__icontains=search)
+    if assignee_email:
+        filters &= Q(assignee_email__icontains=assignee_email)
+    return filters
+
+
+def board_columns(filters, first):
+    """
+    The first ``first`` tasks (newest first) and the task count of every status column, in one query.
+
+    ROW_NUMBER() and COUNT() over a window partitioned by status number and
+    count the rows of each column. The window runs over (id, status,
+    created_at) only, which the (project, status, -created_at, -id) index
+    covers and already yields in window order; full rows are joined back
+    for the rows numbered up to ``first``, so a column with 20k DONE tasks
+    costs an index scan, not a sort of wide rows or a second query.
+    Returns a list of dicts with status, count, items, next_cursor and
+    has_next_page, in COLUMNS order.
+    """
+    order = [F('created_at').desc(), F('id').desc()]
+    ranked = Task.objects.filter(filters).order_by().annotate(
+        board_position=Window(RowNumber(), partition_by=F('status'), order_by=order),
+        column_count=Window(Count('id'), partition_by=F('status'), order_by=order, frame=RowRange(None, None)),
+    ).values('pk', 'board_position', 'column_count')
+    sql, params = ranked.query.sql_with_params()
+    rows = Task.objects.raw(
+        f'SELECT task.*, ranked.board_position, ranked.column_count FROM {Task._meta.db_table} task '
+        f'INNER JOIN ({sql}) ranked ON ranked.pk = task.id '
+        'WHERE ranked.board_position <= %s ORDER BY task.status, ranked.board_position',
+        (*params, first),
+    )
+
+    columns = {status: {'status': status, 'count': 0, 'items': []} for status in COLUMNS}
+    for task in rows:
+        column = columns.setdefault(task.status, {'status': task.status, 'count': 0, 'items': []})
+        column['count'] = task.column_count
+        column['items'].append(task)
+    for column in columns.values():
+        items = column['items']
+        column['has_next_page'] = column['count'] > len(items)
+        column['next_cursor'] = encode_cursor(items[-1].created_at, items[-1].id) if column['has_next_page'] else None
+    return list(columns.values())
+
+
+def board_column(filters, status, first, after=None):
+    """One more page of a board column, after a cursor from board_columns or a previous page."""
+    queryset = Task.objects.filter(filters, status=status).select_related('project')
+    items, next_cursor, has_next_page = newest_first_page(queryset, first, after)
+    return {
+        'status': status,
+        'count': queryset.count(),
+        'items': items,
+        'next_cursor': next_cursor,
+        'has_next_page': has_next_page,
+    }
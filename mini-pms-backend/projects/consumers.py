@@ -0,0 +1,629 @@
+import asyncio
+import json
+import logging
+import re
+import time
+import uuid
+import weakref
+from collections import OrderedDict, deque
+from functools import lru_cache
+from types import SimpleNamespace
+
+from channels.db import database_sync_to_async
+from channels.generic.websocket import AsyncWebsocketConsumer
+from channels.layers import get_channel_layer
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS
+from graphql import GraphQLError, OperationType, execute, get_operation_ast, parse, validate
+from graphql.execution.values import get_argument_values, get_variable_values
+
+from .incremental import IncrementalExecutionContext, initial_payload
+from .models import Project, Task, TaskComment, User
+from .presence import PresenceTracker
+from .schema import schema
+from .sharding import placement, use_shard
+from .subscriptions import reminder_value
+
+
+logger = logging.getLogger(__name__)
+
+PROTOCOL = 'graphql-transport-ws'
+
+DEFAULTS = {
+    'SEND_QUEUE_SIZE': 32,
+    'SLOW_CONSUMER_POLICY': 'drop',
+    'KEEPALIVE_INTERVAL': 15,
+    'KEEPALIVE_TIMEOUT': 45,
+    'CONNECTION_INIT_TIMEOUT': 10,
+    'MAX_SUBSCRIPTIONS': 50,
+    'PRESENCE_TICK': 1.0,
+    'PRESENCE_TTL': 30,
+}
+
+# Close codes: 44xx are defined by graphql-transport-ws; 1013 is "try again later".
+BAD_REQUEST = 4400
+UNAUTHORIZED = 4401
+SUBPROTOCOL_NOT_ACCEPTABLE = 4406
+INIT_TIMEOUT = 4408
+SUBSCRIBER_EXISTS = 4409
+TOO_MANY_INIT = 4429
+KEEPALIVE_TIMEOUT = 4504
+SLOW_CONSUMER = 1013
+
+GROUP_ARG = re.compile(r'^[-\w.]{1,80}$')
+
+# Subscription root field -> (resolver name, argument, channel group, event type, model, event key of the id)
+FIELDS = {
+    'taskUpdated': ('task_updated', 'project_id', 'project_{}_tasks', 'task.updated', Task, 'task_id'),
+    'commentAdded': ('comment_added', 'task_id', 'task_{}_comments', 'comment.added', TaskComment, 'comment_id'),
+    'projectUpdated': (
+        'project_updated', 'organization_slug', 'org_{}_projects', 'project.updated', Project, 'project_id'
+    ),
+    # Sent by the reminder scheduler (reminders.py); rendered with subscriptions.reminder_value.
+    'taskReminder': ('task_reminder', 'project_id', 'project_{}_tasks', 'task.reminder', Task, 'task_id'),
+    'projectReminder': (
+        'project_reminder', 'organization_slug', 'org_{}_projects', 'project.reminder', Project, 'project_id'
+    ),
+    # Fed by the presence tracker, not by outbox events.
+    'boardPresence': ('board_presence', 'project_id', 'presence_{}', None, None, None),
+}
+EVENT_FIELDS = {spec[3]: field for field, spec in FIELDS.items() if spec[3]}
+REMINDER_FIELDS = {'taskReminder', 'projectReminder'}
+PRESENCE = 'boardPresence'
+PING = json.dumps({'type': 'ping'})
+PONG = json.dumps({'type': 'pong'})
+RENDER_CACHE_SIZE = 256
+GROUP_REFRESH_INTERVAL = 3600
+DOCUMENT_CACHE_SIZE = 128
+
+
+def _config():
+    return {**DEFAULTS, **getattr(settings, 'SUBSCRIPTIONS', {})}
+
+
+def _belongs_to(field, instance, arg):
+    if field in ('taskUpdated', 'taskReminder'):
+        return str(instance.project_id) == arg
+    if field == 'commentAdded':
+        return str(instance.task_id) == arg
+    return instance.organization.slug == arg
+
+
+def _fetch(model, pk):
+    queryset = model.objects.all()
+    if model is Task:
+        queryset = queryset.select_related('project')
+    elif model is Project:
+        queryset = queryset.select_related('organization')
+    return queryset.filter(pk=pk).first()
+
+
+def _is_viewer(project_id, user_id):
+    # Two queries, not a join: users stay on 'default', projects may live on a shard.
+    organization_id = Project.objects.filter(pk=project_id).values_list('organization_id', flat=True).first()
+    return organization_id is not None and User.objects.filter(
+        pk=user_id, is_active=True, deleted_at__isnull=True, organization_id=organization_id,
+    ).exists()
+
+
+class Subscription:
+    __slots__ = ('document', 'operation_name', 'variables', 'field', 'python_name', 'arg', 'args', 'group', 'key')
+
+    def __init__(self, query, document, operation_name, variables, field, python_name, args, arg, group):
+        self.document = document
+        self.operation_name = operation_name
+        self.variables = variables
+        self.field = field
+        self.python_name = python_name
+        self.args = args
+        self.arg = arg
+        self.group = group
+        self.key = (query, operation_name, json.dumps(variables, sort_keys=True, default=str))
+
+
+@lru_cache(maxsize=DOCUMENT_CACHE_SIZE)
+def _parse_and_validate(query):
+    """
+    Parsed and validated document for ``query``.
+
+    Clients of one frontend send the same few documents, so with thousands
+    of connections validation would dominate the cost of subscribing.
+    """
+    document = parse(query)
+    errors = validate(schema.graphql_schema, document)
+    if errors:
+        raise errors[0]
+    return document
+
+
+def prepare_query(payload):
+    """The parsed document if a subscribe payload holds a query operation, else None."""
+    query = payload.get('query')
+    if not isinstance(query, str):
+        raise GraphQLError('Must provide a query string.')
+    document = _parse_and_validate(query)
+    operation = get_operation_ast(document, payload.get('operationName'))
+    if operation is None or operation.operation != OperationType.QUERY:
+        return None
+    return document
+
+
+def prepare(payload):
+    """
+    Parse and validate a subscribe payload; returns a Subscription or raises GraphQLError.
+
+    Only the single root field is inspected here: it picks the channel group
+    the connection joins. The selection set is executed per event.
+    """
+    query = payload.get('query')
+    if not isinstance(query, str):
+        raise GraphQLError('Must provide a query string.')
+    document = _parse_and_validate(query)
+    operation_name = payload.get('operationName')
+    operation = get_operation_ast(document, operation_name)
+    if operation is None or operation.operation != OperationType.SUBSCRIPTION:
+        raise GraphQLError('Only subscription operations are accepted over this connection.')
+
+    variables = get_variable_values(
+        schema.graphql_schema, operation.variable_definitions or [], payload.get('variables') or {}
+    )
+    if isinstance(variables, list):
+        raise variables[0]
+    node = operation.selection_set.selections[0]
+    field = node.name.value
+    if field not in FIELDS:
+        raise GraphQLError(f'Unknown subscription field {field}.')
+    python_name, arg_name, group_format = FIELDS[field][:3]
+    root = schema.graphql_schema.subscription_type
+    args = get_argument_values(root.fields[field], node, variables)
+    arg = str(args[arg_name])
+    if not GROUP_ARG.match(arg):
+        raise GraphQLError(f'Invalid {arg_name}.')
+    return Subscription(
+        query, document, operation_name, variables, field, python_name, args, arg, group_format.format(arg)
+    )
+
+
+def _render(subscription, model, pk, event=None):
+    instance = _fetch(model, pk)
+    if instance is None or not _belongs_to(subscription.field, instance, subscription.arg):
+        return None
+    if subscription.field in REMINDER_FIELDS:
+        return _execute(subscription, reminder_value(instance, event))
+    return _execute(subscription, instance)
+
+
+def _in_shard(alias, function, *args):
+    with use_shard(alias):
+        return function(*args)
+
+
+def _execute_query(document, payload):
+    return execute(
+        schema.graphql_schema,
+        document,
+        context_value=SimpleNamespace(),
+        variable_values=payload.get('variables') or {},
+        operation_name=payload.get('operationName'),
+        execution_context_class=IncrementalExecutionContext,
+    )
+
+
+def _execute(subscription, value):
+    result = execute(
+        schema.graphql_schema,
+        subscription.document,
+        root_value={subscription.python_name: value},
+        context_value=SimpleNamespace(),
+        variable_values=subscription.variables,
+        operation_name=subscription.operation_name,
+    )
+    payload = {'data': result.data}
+    if result.errors:
+        payload['errors'] = [error.formatted for error in result.errors]
+    return json.dumps(payload, separators=(',', ':'), default=str)
+
+
+class _LoopState:
+    """
+    Per-event-loop shared state: the render cache, the heartbeat, the group relay and presence.
+
+    The relay joins each channel group once per process, on its own channel,
+    and hands events to the local connections subscribed to that group. The
+    channel layer thus sees one member per process instead of one per
+    connection, and an event costs one layer message per process.
+    """
+
+    def __init__(self):
+        self.rendered = OrderedDict()
+        self.consumers = set()
+        self.heartbeat = None
+        self.members = {}
+        self.channel_name = None
+        self.listener = None
+        self.refreshed_at = time.monotonic()
+        self.presence = PresenceTracker(uuid.uuid4().hex)
+        self.presence_loop = None
+
+    async def join(self, group, consumer):
+        layer = get_channel_layer()
+        if self.channel_name is None:
+            self.channel_name = await layer.new_channel()
+            self.listener = asyncio.ensure_future(self._listen(layer, self.channel_name))
+        if group not in self.members:
+            self.members[group] = set()
+            await layer.group_add(group, self.channel_name)
+        self.members[group].add(consumer)
+
+    async def leave(self, group, consumer):
+        members = self.members.get(group)
+        if members is None:
+            return
+        members.discard(consumer)
+        if not members:
+            del self.members[group]
+            await get_channel_layer().group_discard(group, self.channel_name)
+
+    async def refresh(self, now):
+        # Layers expire group memberships (after a day by default); a
+        # connection rarely lives that long but the relay does.
+        if now - self.refreshed_at >= GROUP_REFRESH_INTERVAL and self.channel_name is not None:
+            self.refreshed_at = now
+            layer = get_channel_layer()
+            for group in list(self.members):
+                await layer.group_add(group, self.channel_name)
+
+    def stop(self):
+        if self.listener is not None:
+            self.listener.cancel()
+        self.listener = self.channel_name = None
+
+    async def _listen(self, layer, channel_name):
+        while True:
+            event = await layer.receive(channel_name)
+            if event.get('type') == 'presence.viewers':
+                self.presence.apply(event['origin'], event['project_id'], event['viewers'])
+                continue
+            if event.get('type') not in EVENT_FIELDS:
+                continue
+            for consumer in list(self.members.get(event.get('group'), ())):
+                try:
+                    await consumer.publish(event)
+                except Exception:
+                    logger.exception('Delivering %s failed', event['type'])
+
+    # Presence
+
+    def view(self, project_id, user_id, config):
+        self.presence.ttl = config['PRESENCE_TTL']
+        self.presence.add(project_id, user_id)
+        if self.presence_loop is None:
+            self.presence_loop = asyncio.ensure_future(self._tick_presence(config['PRESENCE_TICK']))
+
+    async def _tick_presence(self, tick):
+        layer = get_channel_layer()
+        try:
+            while True:
+                await asyncio.sleep(tick)
+                announcements, diffs = self.presence.tick()
+                for project_id, viewers in announcements:
+                    group = FIELDS[PRESENCE][2].format(project_id)
+                    await layer.group_send(group, {
+                        'type': 'presence.viewers', 'group': group, 'origin': self.presence.origin,
+                        'project_id': project_id, 'viewers': viewers,
+                    })
+                for project_id, (joined, left, count) in diffs.items():
+                    self.send_presence(project_id, joined, left, count)
+                if not self.presence.local:
+                    break
+        except Exception:
+            logger.exception('Presence tick failed')
+        finally:
+            self.presence_loop = None
+
+    def send_presence(self, project_id, joined, left, count, only=None):
+        """Push a presence message to the project's viewers (or just ``only``), rendered once per document."""
+        group = FIELDS[PRESENCE][2].format(project_id)
+        value = {'project_id': project_id, 'joined': joined, 'left': left, 'viewer_count': count}
+        rendered = {}
+        for consumer in [only] if only else list(self.members.get(group, ())):
+            for sub_id, subscription in list(consumer.subscriptions.items()):
+                if subscription.field != PRESENCE or subscription.group != group:
+                    continue
+                if subscription.key not in rendered:
+                    rendered[subscription.key] = _execute(subscription, value)
+                consumer.push('{"id":%s,"type":"next","payload":%s}' % (json.dumps(sub_id), rendered[subscription.key]))
+
+
+_loop_states = weakref.WeakKeyDictionary()
+
+
+def _state():
+    loop = asyncio.get_running_loop()
+    state = _loop_states.get(loop)
+    if state is None:
+        state = _loop_states[loop] = _LoopState()
+    return state
+
+
+async def render_payload(subscription, model, pk, event_id, shard=DEFAULT_DB_ALIAS, event=None):
+    """
+    Render the subscription's result for one event, or None if it doesn't apply.
+
+    Every connection in the process with the same document and variables
+    shares one render per outbox event: the first caller runs the query in
+    the database thread and the rest await the same future, so fan-out to
+    many subscribers costs one query, not one per connection.
+    """
+    if event_id is None:
+        return await database_sync_to_async(_in_shard)(shard, _render, subscription, model, pk, event)
+    rendered = _state().rendered
+    key = (shard, event_id, subscription.key)
+    future = rendered.get(key)
+    if future is None:
+        future = rendered[key] = asyncio.get_running_loop().create_future()
+        while len(rendered) > RENDER_CACHE_SIZE:
+            rendered.popitem(last=False)
+        try:
+            future.set_result(
+                await database_sync_to_async(_in_shard)(shard, _render, subscription, model, pk, event)
+            )
+        except Exception as e:
+            rendered.pop(key, None)
+            future.set_exception(e)
+    return await asyncio.shield(future)
+
+
+async def _heartbeat(state, tick):
+    while state.consumers:
+        await asyncio.sleep(tick)
+        now = time.monotonic()
+        for consumer in list(state.consumers):
+            consumer.check_alive(now)
+        await state.refresh(now)
+    state.heartbeat = None
+
+
+class GraphQLSubscriptionConsumer(AsyncWebsocketConsumer):
+    """
+    GraphQL subscriptions over the graphql-transport-ws protocol.
+
+    Connections register their subscriptions' channel groups with the
+    process-wide relay, which turns group events (task.updated,
+    comment.added, project.updated, task.reminder, project.reminder) into
+    ``next`` messages. Outgoing messages go through a bounded queue written
+    by a single task; when a client reads too slowly and the queue is full,
+    the oldest pending result is dropped or, with the 'disconnect' policy,
+    the connection is closed with 1013 so the client reconnects and resyncs.
+    One heartbeat task per process pings every connection and closes those
+    that don't finish the handshake or stop answering.
+
+    Query operations are answered too, with @defer and @stream honoured:
+    the initial result and each later payload are sent as ``next`` messages,
+    followed by ``complete``.
+    """
+
+    # No channel per connection: group events arrive through the relay.
+    channel_layer_alias = None
+
+    async def connect(self):
+        if PROTOCOL not in self.scope.get('subprotocols', []):
+            await self.close(code=SUBPROTOCOL_NOT_ACCEPTABLE)
+            return
+        self.config = _config()
+        self.subscriptions = {}
+        self.queries = {}
+        self.group_refs = {}
+        self.queue = deque()
+        self.ready = asyncio.Event()
+        self.initialised = False
+        self.shard = DEFAULT_DB_ALIAS
+        self.closing = False
+        self.dropped = 0
+        self.connected_at = self.last_seen = self.last_ping = time.monotonic()
+        await self.accept(PROTOCOL)
+        self.writer = asyncio.ensure_future(self._write())
+
+        state = _state()
+        state.consumers.add(self)
+        if state.heartbeat is None:
+            tick = min(self.config['KEEPALIVE_INTERVAL'], self.config['CONNECTION_INIT_TIMEOUT'], 5)
+            state.heartbeat = asyncio.ensure_future(_heartbeat(state, tick))
+
+    async def disconnect(self, code):
+        state = _state()
+        state.consumers.discard(self)
+        writer = getattr(self, 'writer', None)
+        if writer is not None:
+            writer.cancel()
+        for task in getattr(self, 'queries', {}).values():
+            task.cancel()
+        for subscription in list(getattr(self, 'subscriptions', {}).values()):
+            if subscription.field == PRESENCE:
+                state.presence.remove(int(subscription.arg), int(subscription.args['user_id']))
+        for group in getattr(self, 'group_refs', {}):
+            await state.leave(group, self)
+        if not state.consumers:
+            state.stop()
+
+    # Outgoing messages
+
+    def push(self, frame, droppable=False):
+        """Queue a message for the writer, applying the slow consumer policy."""
+        if self.closing:
+            return
+        if len(self.queue) >= self.config['SEND_QUEUE_SIZE']:
+            if self.config['SLOW_CONSUMER_POLICY'] == 'disconnect':
+                self.shut(SLOW_CONSUMER)
+                return
+            # Make room by dropping the oldest pending result. A queue full
+            # of messages that can't be dropped (control messages, presence
+            # diffs) means the client has stopped reading.
+            victim = next((index for index, (_, pending) in enumerate(self.queue) if pending), None)
+            if victim is None:
+                self.shut(SLOW_CONSUMER)
+                return
+            self.dropped += 1
+            del self.queue[victim]
+        self.queue.append((frame, droppable))
+        self.ready.set()
+
+    def shut(self, code):
+        if not self.closing:
+            self.closing = True
+            self.queue.clear()
+            asyncio.ensure_future(self.close(code=code))
+
+    async def _write(self):
+        while True:
+            if not self.queue:
+                self.ready.clear()
+                await self.ready.wait()
+                continue
+            frame, _ = self.queue.popleft()
+            await self.send(text_data=frame)
+
+    def check_alive(self, now):
+        if self.closing:
+            return
+        if not self.initialised and now - self.connected_at > self.config['CONNECTION_INIT_TIMEOUT']:
+            self.shut(INIT_TIMEOUT)
+        elif now - self.last_seen > self.config['KEEPALIVE_TIMEOUT']:
+            self.shut(KEEPALIVE_TIMEOUT)
+        elif now - self.last_ping >= self.config['KEEPALIVE_INTERVAL']:
+            self.last_ping = now
+            self.push(PING)
+
+    # Incoming messages
+
+    async def receive(self, text_data=None, bytes_data=None):
+        self.last_seen = time.monotonic()
+        try:
+            message = json.loads(text_data or '')
+            kind = message['type']
+        except (ValueError, TypeError, KeyError):
+            self.shut(BAD_REQUEST)
+            return
+
+        if kind == 'connection_init':
+            if self.initialised:
+                self.shut(TOO_MANY_INIT)
+                return
+            self.initialised = True
+            # The organization's database; everything on this connection
+            # reads from it.
+            payload = message.get('payload')
+            slug = payload.get('organizationSlug') if isinstance(payload, dict) else None
+            if isinstance(slug, str) and slug:
+                found = await database_sync_to_async(placement)(slug=slug)
+                self.shard = found.alias if found else DEFAULT_DB_ALIAS
+            self.push(json.dumps({'type': 'connection_ack'}))
+        elif kind == 'ping':
+            self.push(PONG)
+        elif kind == 'pong':
+            pass
+        elif kind == 'subscribe':
+            await self._subscribe(message)
+        elif kind == 'complete':
+            await self._complete(message.get('id'))
+        else:
+            self.shut(BAD_REQUEST)
+
+    async def _subscribe(self, message):
+        if not self.initialised:
+            self.shut(UNAUTHORIZED)
+            return
+        sub_id = message.get('id')
+        if not isinstance(sub_id, str) or not isinstance(message.get('payload'), dict):
+            self.shut(BAD_REQUEST)
+            return
+        if sub_id in self.subscriptions or sub_id in self.queries:
+            self.shut(SUBSCRIBER_EXISTS)
+            return
+        try:
+            if len(self.subscriptions) + len(self.queries) >= self.config['MAX_SUBSCRIPTIONS']:
+                raise GraphQLError('Too many subscriptions on this connection.')
+            document = prepare_query(message['payload'])
+            if document is not None:
+                self.queries[sub_id] = asyncio.ensure_future(self._query(sub_id, document, message['payload']))
+                return
+            subscription = prepare(message['payload'])
+            if subscription.field == PRESENCE:
+                viewer = await self._viewer(subscription)
+        except GraphQLError as e:
+            self.push(json.dumps({'id': sub_id, 'type': 'error', 'payload': [e.formatted]}))
+            return
+        if self.closing or sub_id in self.subscriptions:
+            return
+        self.subscriptions[sub_id] = subscription
+        if subscription.group not in self.group_refs:
+            self.group_refs[subscription.group] = 0
+            await _state().join(subscription.group, self)
+        self.group_refs[subscription.group] += 1
+        if subscription.field == PRESENCE:
+            state = _state()
+            current = sorted(state.presence.viewers(viewer[0]))
+            state.send_presence(viewer[0], current, [], len(current), only=self)
+            state.view(*viewer, self.config)
+
+    async def _viewer(self, subscription):
+        try:
+            project_id, user_id = int(subscription.arg), int(subscription.args['user_id'])
+        except ValueError:
+            raise GraphQLError('Project or user not found.')
+        if not await database_sync_to_async(_in_shard)(self.shard, _is_viewer, project_id, user_id):
+            raise GraphQLError('Project or user not found.')
+        return project_id, user_id
+
+    async def _query(self, sub_id, document, payload):
+        """Send the result of a query, then its deferred and streamed payloads, as they are ready."""
+        prefix = '{"id":%s,"type":"next","payload":' % json.dumps(sub_id)
+        try:
+            result = await database_sync_to_async(_in_shard)(self.shard, _execute_query, document, payload)
+            self.push(prefix + json.dumps(initial_payload(result), separators=(',', ':'), default=str) + '}')
+            while result.subsequent is not None:
+                part = await database_sync_to_async(_in_shard)(self.shard, next, result.subsequent, None)
+                if part is None:
+                    break
+                self.push(prefix + json.dumps(part, separators=(',', ':'), default=str) + '}')
+            self.push(json.dumps({'id': sub_id, 'type': 'complete'}))
+        except Exception:
+            logger.exception('Query %s failed', sub_id)
+            self.push(json.dumps({'id': sub_id, 'type': 'error', 'payload': [{'message': 'Internal server error.'}]}))
+        finally:
+            self.queries.pop(sub_id, None)
+
+    async def _complete(self, sub_id):
+        query = self.queries.pop(sub_id, None)
+        if query is not None:
+            query.cancel()
+            return
+        subscription = self.subscriptions.pop(sub_id, None)
+        if subscription is None:
+            return
+        if subscription.field == PRESENCE:
+            _state().presence.remove(int(subscription.arg), int(subscription.args['user_id']))
+        self.group_refs[subscription.group] -= 1
+        if not self.group_refs[subscription.group]:
+            del self.group_refs[subscription.group]
+            await _state().leave(subscription.group, self)
+
+    # Group events
+
+    async def publish(self, event):
+        if event.get('shard', DEFAULT_DB_ALIAS) != self.shard:
+            return
+        field = EVENT_FIELDS[event['type']]
+        model, id_key = FIELDS[field][4:]
+        for sub_id, subscription in list(self.subscriptions.items()):
+            if subscription.field != field or subscription.group != event['group']:
+                continue
+            try:
+                payload = await render_payload(
+                    subscription, model, event.get(id_key), event.get('event_id'), self.shard, event
+                )
+            except Exception:
+                logger.exception('Rendering %s for subscription %s failed', event['type'], sub_id)
+                continue
+            if payload is not None and sub_id in self.subscriptions:
+                self.push('{"id":%s,"type":"next","payload":%s}' % (json.dumps(sub_id), payload), droppable=True)
@@ -0,0 +1,102 @@
+import importlib.util
+import json
+import re
+
+from django.conf import settings
+from django.core import checks
+from django.utils.cache import patch_vary_headers
+from django.utils.text import compress_string
+
+
+DEFAULTS = {
+    # 'auto' uses orjson when it is installed and the standard library otherwise.
+    'ENCODER': 'auto',
+    # Bodies smaller than this are sent uncompressed: gzip's header and the
+    # compression time aren't worth it.
+    'GZIP_MIN_SIZE': 1024,
+}
+
+_accepts_gzip = re.compile(r'\bgzip\b')
+
+
+def _config():
+    return {**DEFAULTS, **getattr(settings, 'GRAPHQL_RESPONSE', {})}
+
+
+def encode_stdlib(data):
+    return json.dumps(data, separators=(',', ':'))
+
+
+def encode_orjson(data):
+    import orjson
+
+    try:
+        return orjson.dumps(data).decode()
+    except TypeError:
+        # Integers beyond 64 bits and other values orjson refuses.
+        return encode_stdlib(data)
+
+
+ENCODERS = {
+    'json': encode_stdlib,
+    'orjson': encode_orjson,
+}
+
+
+def available_encoders():
+    """Names of the encoders that can run here."""
+    return [name for name in ENCODERS if name == 'json' or importlib.util.find_spec(name) is not None]
+
+
+def get_encoder(name=None):
+    """The compact JSON encoder called ``name``, or the configured one."""
+    name = name or _config()['ENCODER']
+    if name == 'auto':
+        name = 'orjson' if 'orjson' in available_encoders() else 'json'
+    if name not in ENCODERS:
+        raise ValueError(f"Unknown JSON encoder '{name}', expected one of: auto, {', '.join(ENCODERS)}.")
+    if name not in available_encoders():
+        # Not installed: answer with the standard library rather than fail
+        # every request; check_encoder() reports it at startup.
+        return encode_stdlib
+    return ENCODERS[name]
+
+
+def check_encoder(app_configs=None, **kwargs):
+    """System check: the configured encoder exists and can be imported."""
+    name = _config()['ENCODER']
+    if name != 'auto' and name not in ENCODERS:
+        return [checks.Error(
+            f"Unknown JSON encoder '{name}'.",
+            hint=f"Set GRAPHQL_RESPONSE['ENCODER'] to one of: auto, {', '.join(ENCODERS)}.",
+            id='projects.E001',
+        )]
+    if name != 'auto' and name not in available_encoders():
+        return [checks.Warning(
+            f"JSON encoder '{name}' is not installed; responses are encoded with 'json'.",
+            hint=f'Install {name} or set GRAPHQL_JSON_ENCODER=auto.',
+            id='projects.W001',
+        )]
+    return []
+
+
+def gzip_response(request, response, min_size=None):
+    """
+    Gzip ``response`` in place if the client accepts it and the body is big enough.
+
+    Same rules as Django's GZipMiddleware, including its random padding
+    against BREACH, but only for the views that call it.
+    """
+    min_size = _config()['GZIP_MIN_SIZE'] if min_size is None else min_size
+    if response.streaming or response.has_header('Content-Encoding') or len(response.content) < min_size:
+        return response
+    patch_vary_headers(response, ('Accept-Encoding',))
+    if not _accepts_gzip.search(request.META.get('HTTP_ACCEPT_ENCODING', '')):
+        return response
+    compressed = compress_string(response.content, max_random_bytes=100)
+    if len(compressed) >= len(response.content):
+        return response
+    response.content = compressed
+    response['Content-Length'] = str(len(compressed))
+    response['Content-Encoding'] = 'gzip'
+    return response
@@ -0,0 +1,238 @@
+import asyncio
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import Future, ProcessPoolExecutor
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import check_password, identify_hasher, make_password
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+
+
+DEFAULTS = {
+    'WORKERS': 2,
+    'MAX_PENDING': 32,
+    'TIMEOUT': 10,
+    'START_METHOD': None,
+}
+
+
+class HashingPoolBusy(Exception):
+    """Raised when the hashing queue is full and the request should be shed."""
+
+
+def _init_worker():
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
+    import django
+    django.setup()
+
+
+def _make_password(password):
+    return make_password(password)
+
+
+def _check_password(password, encoded):
+    return check_password(password, encoded)
+
+
+class PasswordHashingPool:
+    """
+    Runs password hashing and verification on a bounded process pool.
+
+    PBKDF2 holds the GIL for its whole run, so hashing inline in a request
+    worker stalls every other request served by that process. Submitting the
+    work to a process pool frees the worker while it waits, and ``MAX_PENDING``
+    caps queued plus running jobs: once full, new jobs fail fast with
+    HashingPoolBusy instead of building an unbounded backlog. With
+    ``WORKERS`` set to 0 hashing runs inline (still subject to the limit).
+    """
+
+    def __init__(self, workers, max_pending, timeout, start_method=None):
+        if max_pending < 1:
+            raise ValueError('MAX_PENDING must be at least 1.')
+        self.workers = workers
+        self.max_pending = max_pending
+        self.timeout = timeout
+        self.start_method = start_method
+        self._slots = threading.BoundedSemaphore(max_pending)
+        self._executor = None
+        self._lock = threading.Lock()
+        self._submitted = 0
+        self._completed = 0
+        self._failed = 0
+        self._rejected = 0
+        self._pending = 0
+        self._max_pending_seen = 0
+        self._busy_seconds = 0.0
+
+    def _get_executor(self):
+        with self._lock:
+            if self._executor is None:
+                context = multiprocessing.get_context(self.start_method) if self.start_method else None
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    mp_context=context,
+                    initializer=_init_worker,
+                )
+            return self._executor
+
+    def _acquire(self):
+        if not self._slots.acquire(blocking=False):
+            with self._lock:
+                self._rejected += 1
+            raise HashingPoolBusy('Password hashing queue is full.')
+        with self._lock:
+            self._submitted += 1
+            self._pending += 1
+            self._max_pending_seen = max(self._max_pending_seen, self._pending)
+
+    def _release(self, started, failed):
+        with self._lock:
+            self._pending -= 1
+            self._busy_seconds += time.perf_counter() - started
+            if failed:
+                self._failed += 1
+            else:
+                self._completed += 1
+        self._slots.release()
+
+    def submit(self, func, *args):
+        """Queue ``func(*args)`` and return a concurrent.futures.Future."""
+        self._acquire()
+        started = time.perf_counter()
+
+        if self.workers <= 0:
+            future = Future()
+            try:
+                future.set_result(func(*args))
+            except Exception as e:
+                future.set_exception(e)
+            self._release(started, future.exception() is not None)
+            return future
+
+        try:
+            future = self._get_executor().submit(func, *args)
+        except Exception:
+            self._release(started, True)
+            raise
+        future.add_done_callback(
+            lambda done: self._release(started, done.cancelled() or done.exception() is not None)
+        )
+        return future
+
+    def run(self, func, *args):
+        """Run ``func(*args)`` on the pool and wait for the result."""
+        return self.submit(func, *args).result(timeout=self.timeout)
+
+    async def arun(self, func, *args):
+        """Await ``func(*args)`` on the pool without blocking the event loop."""
+        if self.workers <= 0:
+            return await sync_to_async(self.run, thread_sensitive=False)(func, *args)
+        return await asyncio.wait_for(asyncio.wrap_future(self.submit(func, *args)), self.timeout)
+
+    def stats(self):
+        with self._lock:
+            finished = self._completed + self._failed
+            return {
+                'workers': self.workers,
+                'max_pending': self.max_pending,
+                'pending': self._pending,
+                'max_pending_seen': self._max_pending_seen,
+                'submitted': self._submitted,
+                'completed': self._completed,
+                'failed': self._failed,
+                'rejected': self._rejected,
+                'avg_seconds': self._busy_seconds / finished if finished else 0.0,
+            }
+
+    def shutdown(self, wait=True):
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=wait)
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_pool():
+    """Return the process-wide hashing pool, creating it from settings on first use."""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            config = {**DEFAULTS, **getattr(settings, 'PASSWORD_HASHING_POOL', {})}
+            _pool = PasswordHashingPool(
+                workers=config['WORKERS'],
+                max_pending=config['MAX_PENDING'],
+                timeout=config['TIMEOUT'],
+                start_method=config['START_METHOD'],
+            )
+        return _pool
+
+
+def reset_pool():
+    """Shut down the current pool so the next call rebuilds it from settings."""
+    global _pool
+    with _pool_lock:
+        pool, _pool = _pool, None
+    if pool is not None:
+        pool.shutdown(wait=False)
+
+
+@receiver(setting_changed)
+def _reset_on_setting_changed(setting, **kwargs):
+    if setting in ('PASSWORD_HASHING_POOL', 'PASSWORD_HASHERS'):
+        reset_pool()
+
+
+def pool_stats():
+    return get_pool().stats()
+
+
+def hash_password(password):
+    """Hash a raw password off the request thread."""
+    return get_pool().run(_make_password, password)
+
+
+def verify_password(password, encoded):
+    """Check a raw password against an encoded hash off the request thread."""
+    return get_pool().run(_check_password, password, encoded)
+
+
+async def ahash_password(password):
+    return await get_pool().arun(_make_password, password)
+
+
+async def averify_password(password, encoded):
+    return await get_pool().arun(_check_password, password, encoded)
+
+
+def authenticate_user(email, password):
+    """
+    Email/password authentication equivalent to ModelBackend, with hashing offloaded.
+
+    Unknown emails still pay for one hash so response times don't reveal
+    which accounts exist, and hashes from outdated hashers are upgraded.
+    """
+    User = get_user_model()
+    try:
+        user = User._default_manager.get_by_natural_key(email)
+    except User.DoesNotExist:
+        hash_password(password)
+        return None
+
+    if not verify_password(password, user.password):
+        return None
+
+    if identify_hasher(user.password).must_update(user.password):
+        user.password = hash_password(password)
+        user.save(update_fields=['password'])
+
+    if not user.is_active:
+        return None
+    return user
@@ -0,0 +1,180 @@
+from collections import defaultdict
+from datetime import timedelta
+
+from django.db import transaction
+from django.db.models import F, Sum
+from django.utils import timezone
+
+from .models import ProjectDailyRollup, Task, TaskStatusTransition
+from .sharding import tenant_db
+
+
+CODES = TaskStatusTransition.STATUS_CODES
+DELTA_FIELDS = {
+    TaskStatusTransition.TODO: 'todo_delta',
+    TaskStatusTransition.IN_PROGRESS: 'in_progress_delta',
+    TaskStatusTransition.DONE: 'done_delta',
+}
+
+
+def _rollup_changes(from_code, to_code):
+    """Rollup column increments caused by one transition."""
+    changes = defaultdict(int)
+    if from_code in DELTA_FIELDS:
+        changes[DELTA_FIELDS[from_code]] -= 1
+    if to_code in DELTA_FIELDS:
+        changes[DELTA_FIELDS[to_code]] += 1
+    if from_code == TaskStatusTransition.NONE:
+        changes['created'] += 1
+    if to_code == TaskStatusTransition.NONE:
+        changes['deleted'] += 1
+    elif to_code == TaskStatusTransition.DONE and from_code != TaskStatusTransition.DONE:
+        changes['completed'] += 1
+    elif from_code == TaskStatusTransition.DONE:
+        changes['reopened'] += 1
+    return changes
+
+
+def _apply_rollups(changes_by_day):
+    """Add {(project_id, day): {field: increment}} to the rollup rows with F() updates."""
+    for (project_id, day), changes in sorted(changes_by_day.items()):
+        changes = {field: value for field, value in changes.items() if value}
+        if not changes:
+            continue
+        ProjectDailyRollup.objects.get_or_create(project_id=project_id, day=day)
+        ProjectDailyRollup.objects.filter(project_id=project_id, day=day).update(
+            **{field: F(field) + value for field, value in changes.items()}
+        )
+
+
+def record_transitions(changes, at=None):
+    """
+    Log a batch of (project_id, task_id, from_status, to_status) changes.
+
+    Statuses are the Task status strings, with None for "did not exist".
+    The log rows are bulk inserted and each affected (project, day) rollup
+    is updated once, in the caller's transaction.
+    """
+    at = at or timezone.now()
+    day = timezone.localdate(at)
+    rows = []
+    changes_by_day = defaultdict(lambda: defaultdict(int))
+    for project_id, task_id, from_status, to_status in changes:
+        from_code, to_code = CODES[from_status], CODES[to_status]
+        if from_code == to_code:
+            continue
+        rows.append(TaskStatusTransition(
+            project_id=project_id,
+            task_id=task_id,
+            from_status=from_code,
+            to_status=to_code,
+            created_at=at,
+        ))
+        for field, value in _rollup_changes(from_code, to_code).items():
+            changes_by_day[(project_id, day)][field] += value
+
+    if not rows:
+        return []
+    with transaction.atomic(using=tenant_db()):
+        TaskStatusTransition.objects.bulk_create(rows)
+        _apply_rollups(changes_by_day)
+    return rows
+
+
+def record_transition(task, from_status, to_status, at=None):
+    """Log a single task status change (from_status None on create, to_status None on delete)."""
+    return record_transitions([(task.project_id, task.pk, from_status, to_status)], at=at)
+
+
+def rebuild_rollups(project_ids=None):
+    """Recompute rollup rows from the transition log (for backfills and repairs)."""
+    log = TaskStatusTransition.objects.all()
+    rollups = ProjectDailyRollup.objects.all()
+    if project_ids is not None:
+        log = log.filter(project_id__in=project_ids)
+        rollups = rollups.filter(project_id__in=project_ids)
+
+    totals = defaultdict(lambda: defaultdict(int))
+    for project_id, created_at, from_code, to_code in log.values_list(
+        'project_id', 'created_at', 'from_status', 'to_status'
+    ).iterator():
+        key = (project_id, timezone.localdate(created_at))
+        for field, value in _rollup_changes(from_code, to_code).items():
+            totals[key][field] += value
+
+    with transaction.atomic(using=tenant_db()):
+        rollups.delete()
+        ProjectDailyRollup.objects.bulk_create([
+            ProjectDailyRollup(project_id=project_id, day=day, **fields)
+            for (project_id, day), fields in totals.items()
+        ], batch_size=1000)
+    return len(totals)
+
+
+def backfill_initial_transitions(batch_size=1000):
+    """
+    Record a creation transition for every task that has no history yet.
+
+    Tasks created before the log existed are entered at their created_at with
+    their current status; earlier status changes can't be recovered.
+    """
+    logged = TaskStatusTransition.objects.values('task_id')
+    tasks = Task.objects.exclude(pk__in=logged).values_list('id', 'project_id', 'status', 'created_at')
+    created = 0
+    batch = []
+    for task_id, project_id, status, created_at in tasks.iterator():
+        batch.append(TaskStatusTransition(
+            project_id=project_id,
+            task_id=task_id,
+            from_status=TaskStatusTransition.NONE,
+            to_status=CODES[status],
+            created_at=created_at,
+        ))
+        if len(batch) >= batch_size:
+            TaskStatusTransition.objects.bulk_create(batch)
+            created += len(batch)
+            batch = []
+    if batch:
+        TaskStatusTransition.objects.bulk_create(batch)
+        created += len(batch)
+    return created
+
+
+def burndown(project_id, start, end):
+    """
+    Return one point per day from ``start`` to ``end`` (inclusive).
+
+    The board at ``start`` comes from a single Sum over the earlier rollup
+    rows; each following day is a running total over that day's rollup row,
+    so a year of history reads about 365 rows.
+    """
+    rollups = ProjectDailyRollup.objects.filter(project_id=project_id)
+    base = rollups.filter(day__lt=start).aggregate(
+        todo=Sum('todo_delta'), in_progress=Sum('in_progress_delta'), done=Sum('done_delta')
+    )
+    todo = base['todo'] or 0
+    in_progress = base['in_progress'] or 0
+    done = base['done'] or 0
+    by_day = {row.day: row for row in rollups.filter(day__gte=start, day__lte=end)}
+
+    points = []
+    day = start
+    while day <= end:
+        row = by_day.get(day)
+        if row is not None:
+            todo += row.todo_delta
+            in_progress += row.in_progress_delta
+            done += row.done_delta
+        points.append({
+            'date': day,
+            'todo': todo,
+            'in_progress': in_progress,
+            'done': done,
+            'remaining': todo + in_progress,
+            'created': row.created if row else 0,
+            'completed': row.completed if row else 0,
+            'reopened': row.reopened if row else 0,
+            'deleted': row.deleted if row else 0,
+        })
+        day += timedelta(days=1)
+    return points
@@ -0,0 +1,338 @@
+import csv
+import io
+import json
+from datetime import datetime, time
+
+from django.db import transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+
+from .history import record_transitions
+from .models import Project, Task
+from .sharding import tenant_db
+from .validators import PROJECT_PLAN, TASK_PLAN, flatten_errors
+
+
+DEFAULT_BATCH_SIZE = 500
+MAX_REPORTED_ERRORS = 1000
+JSON_CHUNK_SIZE = 64 * 1024
+MAX_JSON_ROW_SIZE = 1024 * 1024
+
+
+def iter_csv_rows(stream):
+    """Yield (line_number, row) pairs from a CSV text stream, one row at a time."""
+    reader = csv.DictReader(stream)
+    for row in reader:
+        yield reader.line_num, row
+
+
+def iter_json_rows(stream, chunk_size=JSON_CHUNK_SIZE):
+    """
+    Yield (row_number, row) pairs from a JSON array or newline-delimited JSON.
+
+    The stream is decoded one object at a time, so only the current object
+    and one read chunk are held in memory regardless of the file size. An
+    object that does not decode is read further until the stream ends or it
+    grows past MAX_JSON_ROW_SIZE, then raises a ValueError naming its row.
+    """
+    decoder = json.JSONDecoder()
+    buffer = ''
+    position = 0
+    row_number = 0
+    eof = False
+
+    while True:
+        while position < len(buffer) and buffer[position] in ' \t\r\n,[]':
+            position += 1
+
+        if position < len(buffer):
+            try:
+                row, end = decoder.raw_decode(buffer, position)
+            except json.JSONDecodeError as e:
+                if eof or len(buffer) - position > MAX_JSON_ROW_SIZE:
+                    raise ValueError(f'Row {row_number + 1}: invalid JSON ({e.msg}).') from e
+            else:
+                row_number += 1
+                yield row_number, row
+                position = end
+                continue
+        elif eof:
+            return
+
+        chunk = stream.read(chunk_size)
+        buffer = buffer[position:] + chunk
+        position = 0
+        eof = not chunk
+
+
+def open_rows(stream, file_format):
+    """Return a row iterator for a text stream in the given format ('csv' or 'json')."""
+    if file_format == 'csv':
+        return iter_csv_rows(stream)
+    if file_format == 'json':
+        return iter_json_rows(stream)
+    raise ValueError(f'Unsupported import format: {file_format}')
+
+
+def guess_format(filename):
+    """Guess the import format from a file name."""
+    name = (filename or '').lower()
+    if name.endswith('.json') or name.endswith('.ndjson') or name.endswith('.jsonl'):
+        return 'json'
+    return 'csv'
+
+
+def _text(row, key):
+    value = row.get(key)
+    if value is None:
+        return ''
+    return str(value).strip()
+
+
+def _parse_project_due_date(value):
+    if not value:
+        return None
+    return parse_date(value)
+
+
+def _parse_task_due_date(value):
+    if not value:
+        return None
+    parsed = parse_datetime(value)
+    if parsed is None:
+        day = parse_date(value)
+        if day is None:
+            return None
+        parsed = datetime.combine(day, time.min)
+    if timezone.is_naive(parsed):
+        parsed = timezone.make_aware(parsed)
+    return parsed
+
+
+class ImportResult:
+    """Progress counters and per-row errors for an import run."""
+
+    def __init__(self, max_errors=MAX_REPORTED_ERRORS):
+        self.rows = 0
+        self.projects_created = 0
+        self.tasks_created = 0
+        self.failed = 0
+        self.batches = 0
+        self.errors = []
+        self.max_errors = max_errors
+
+    def add_error(self, row_number, messages):
+        self.failed += 1
+        if len(self.errors) < self.max_errors:
+            self.errors.append({'row': row_number, 'errors': list(messages)})
+
+    def has_errors(self):
+        return self.failed > 0
+
+    def as_dict(self):
+        return {
+            'rows': self.rows,
+            'projects_created': self.projects_created,
+            'tasks_created': self.tasks_created,
+            'failed': self.failed,
+            'batches': self.batches,
+            'errors': self.errors,
+            'errors_truncated': self.failed > len(self.errors),
+        }
+
+
+class BulkImporter:
+    """
+    Import project and task rows into an organization in bulk_create batches.
+
+    Each row carries a ``type`` of ``project`` or ``task``. Task rows reference
+    their project by ``project_id`` or by ``project`` (project name within the
+    organization); projects created earlier in the same import can be referenced
+    by name. Each batch is validated with the compiled project/task plans (the
+    same rules as the GraphQL mutations) and written inside its own savepoint,
+    so a failing batch is reported row by row without undoing earlier batches.
+    """
+
+    def __init__(self, organization, batch_size=DEFAULT_BATCH_SIZE, progress=None,
+                 max_errors=MAX_REPORTED_ERRORS):
+        if batch_size < 1:
+            raise ValueError('Batch size must be at least 1.')
+        self.organization = organization
+        self.batch_size = batch_size
+        self.progress = progress
+        self.result = ImportResult(max_errors=max_errors)
+
+    def run(self, rows):
+        batch = []
+        for row_number, row in rows:
+            self.result.rows += 1
+            parsed = self._parse(row_number, row)
+            if parsed is None:
+                continue
+            batch.append(parsed)
+            if len(batch) >= self.batch_size:
+                self._flush(self._build(batch))
+                batch = []
+        if batch:
+            self._flush(self._build(batch))
+        return self.result
+
+    def _parse(self, row_number, row):
+        if not isinstance(row, dict):
+            self.result.add_error(row_number, ['Row must be an object.'])
+            return None
+
+        kind = _text(row, 'type').lower()
+        if kind == 'project':
+            data = {
+                'organization_id': self.organization.id,
+                'name': _text(row, 'name'),
+                'description': _text(row, 'description'),
+                'status': _text(row, 'status').upper(),
+                'due_date': _text(row, 'due_date'),
+            }
+        elif kind == 'task':
+            data = {
+                'project_id': _text(row, 'project_id'),
+                'project': _text(row, 'project'),
+                'title': _text(row, 'title'),
+                'description': _text(row, 'description'),
+                'status': _text(row, 'status').upper(),
+                'assignee_email': _text(row, 'assignee_email').lower(),
+                'due_date': _text(row, 'due_date'),
+            }
+        else:
+            self.result.add_error(row_number, ['Type must be one of: project, task.'])
+            return None
+        return row_number, kind, data
+
+    def _build(self, batch):
+        """Validate a batch with the compiled plans and build unsaved model instances."""
+        project_rows = [(row_number, data) for row_number, kind, data in batch if kind == 'project']
+        task_rows = [(row_number, data) for row_number, kind, data in batch if kind == 'task']
+        project_errors = PROJECT_PLAN.validate_many([data for _, data in project_rows])
+        task_errors = TASK_PLAN.validate_many([
+            {**data, 'project_id': data['project_id'] or data['project']} for _, data in task_rows
+        ])
+
+        entries = []
+        for index, (row_number, data) in enumerate(project_rows):
+            errors = flatten_errors(project_errors.get(index, {}))
+            due_date = _parse_project_due_date(data['due_date'])
+            if data['due_date'] and due_date is None:
+                errors.append('Due date format is invalid.')
+            if errors:
+                self.result.add_error(row_number, errors)
+                continue
+
+            project = Project(
+                organization=self.organization,
+                name=data['name'],
+                description=data['description'],
+                status=data['status'] or 'ACTIVE',
+                due_date=due_date,
+            )
+            entries.append((row_number, project, None))
+
+        for index, (row_number, data) in enumerate(task_rows):
+            errors = flatten_errors(task_errors.get(index, {}))
+            due_date = _parse_task_due_date(data['due_date'])
+            if data['due_date'] and due_date is None:
+                errors.append('Due date format is invalid.')
+            project_id = data['project_id']
+            if project_id and not project_id.isdigit():
+                errors.append('Project must be a numeric id.')
+            if errors:
+                self.result.add_error(row_number, errors)
+                continue
+
+            task = Task(
+                title=data['title'],
+                description=data['description'],
+                status=data['status'] or 'TODO',
+                assignee_email=data['assignee_email'],
+                due_date=due_date,
+            )
+            reference = ('id', int(project_id)) if project_id else ('name', data['project'])
+            entries.append((row_number, task, reference))
+
+        return entries
+
+    def _flush(self, batch):
+        if not batch:
+            self.result.batches += 1
+            if self.progress:
+                self.progress(self.result)
+            return
+
+        projects = [entry for entry in batch if entry[2] is None]
+        tasks = [entry for entry in batch if entry[2] is not None]
+
+        # Task rows whose project is unknown are reported while resolving and
+        # never reach the insert, so they must not be reported again below.
+        resolved = tasks
+        try:
+            with transaction.atomic(using=tenant_db()):
+                if projects:
+                    Project.objects.bulk_create([entry[1] for entry in projects])
+                resolved = self._resolve_projects(tasks)
+                if resolved:
+                    created = Task.objects.bulk_create([entry[1] for entry in resolved])
+                    record_transitions([(task.project_id, task.pk, None, task.status) for task in created])
+        except Exception as e:
+            for entry in projects + resolved:
+                self.result.add_error(entry[0], [str(e)])
+        else:
+            self.result.projects_created += len(projects)
+            self.result.tasks_created += len(resolved)
+
+        self.result.batches += 1
+        if self.progress:
+            self.progress(self.result)
+
+    def _resolve_projects(self, tasks):
+        """Attach project ids to task rows, reporting rows whose project is unknown."""
+        if not tasks:
+            return []
+
+        ids = {ref for _, _, (kind, ref) in tasks if kind == 'id'}
+        names = {ref for _, _, (kind, ref) in tasks if kind == 'name'}
+        projects = Project.objects.filter(organization=self.organization)
+
+        known_ids = set()
+        if ids:
+            known_ids = set(projects.filter(pk__in=ids).values_list('id', flat=True))
+        ids_by_name = {}
+        if names:
+            for project_id, name in projects.filter(name__in=names).order_by('created_at', 'id').values_list('id', 'name'):
+                ids_by_name[name] = project_id
+
+        resolved = []
+        for row_number, task, (kind, ref) in tasks:
+            if kind == 'id':
+                project_id = ref if ref in known_ids else None
+            else:
+                project_id = ids_by_name.get(ref)
+            if project_id is None:
+                self.result.add_error(row_number, ['Project not found.'])
+                continue
+            task.project_id = project_id
+            resolved.append((row_number, task, (kind, ref)))
+        return resolved
+
+
+def import_stream(organization, stream, file_format, batch_size=DEFAULT_BATCH_SIZE, progress=None):
+    """Import rows from a text stream into an organization and return the ImportResult."""
+    importer = BulkImporter(organization, batch_size=batch_size, progress=progress)
+    return importer.run(open_rows(stream, file_format))
+
+
+def import_upload(organization, upload, file_format=None, batch_size=DEFAULT_BATCH_SIZE):
+    """Import an uploaded file without reading it into memory as a whole."""
+    file_format = file_format or guess_format(upload.name)
+    upload.seek(0)
+    stream = io.TextIOWrapper(upload.file, encoding='utf-8-sig', newline='')
+    try:
+        return import_stream(organization, stream, file_format, batch_size=batch_size)
+    finally:
+        stream.detach()
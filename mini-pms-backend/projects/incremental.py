@@ -0,0 +1,240 @@
+from collections import deque
+
+from graphql import (
+    DirectiveLocation,
+    FieldNode,
+    FragmentSpreadNode,
+    GraphQLArgument,
+    GraphQLBoolean,
+    GraphQLDirective,
+    GraphQLError,
+    GraphQLInt,
+    GraphQLNonNull,
+    GraphQLString,
+    InlineFragmentNode,
+    OperationType,
+    located_error,
+)
+from graphql.execution import ExecutionContext, ExecutionResult
+from graphql.execution.collect_fields import does_fragment_condition_match, get_field_entry_key, should_include_node
+from graphql.execution.values import get_directive_values
+from graphql.pyutils import is_iterable
+
+
+# Items of a @stream field completed per subsequent payload.
+STREAM_BATCH_SIZE = 25
+
+MULTIPART_CONTENT_TYPE = 'multipart/mixed; boundary="-"; deferSpec=20220824'
+PART_HEADER = '\r\n---\r\nContent-Type: application/json; charset=utf-8\r\n\r\n'
+CLOSING_DELIMITER = '\r\n-----\r\n'
+
+DeferDirective = GraphQLDirective(
+    name='defer',
+    locations=[DirectiveLocation.FRAGMENT_SPREAD, DirectiveLocation.INLINE_FRAGMENT],
+    args={
+        'if': GraphQLArgument(GraphQLNonNull(GraphQLBoolean), default_value=True),
+        'label': GraphQLArgument(GraphQLString),
+    },
+    description='Send the fragment in a later payload instead of waiting for it.',
+)
+
+StreamDirective = GraphQLDirective(
+    name='stream',
+    locations=[DirectiveLocation.FIELD],
+    args={
+        'if': GraphQLArgument(GraphQLNonNull(GraphQLBoolean), default_value=True),
+        'label': GraphQLArgument(GraphQLString),
+        'initialCount': GraphQLArgument(GraphQLNonNull(GraphQLInt), default_value=0),
+    },
+    description='Send the first initialCount items of the list, then the rest in later payloads.',
+)
+
+
+def _directive(directive, node, variables):
+    values = get_directive_values(directive, node, variables)
+    return values if values and values['if'] else None
+
+
+class IncrementalResult(ExecutionResult):
+    """The initial result, plus an iterator of the subsequent payloads if there are any."""
+    __slots__ = ('subsequent',)
+
+    def __init__(self, data=None, errors=None, subsequent=None):
+        super().__init__(data, errors)
+        self.subsequent = subsequent
+
+
+class IncrementalExecutionContext(ExecutionContext):
+    """
+    Execution that leaves @defer fragments and @stream list tails for later.
+
+    graphql-core 3.2 has no incremental delivery, so this context does the
+    minimum on top of its executor. While the initial result is executed,
+    deferred fragments and the items of streamed lists past initialCount
+    are queued with their parent value and path; ``subsequent_payloads()``
+    then executes them one by one and yields payloads in the 2022 format of
+    the incremental delivery RFC (``incremental`` plus ``hasNext``), which
+    is the one Apollo Client reads. The root fields of a mutation still run
+    serially, with @defer ignored at that level.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.pending = deque()
+
+    def build_response(self, data, errors):
+        result = super().build_response(data, errors)
+        subsequent = self.subsequent_payloads() if data is not None and self.pending else None
+        return IncrementalResult(result.data, result.errors, subsequent)
+
+    def execute_operation(self, operation, root_value):
+        if operation.operation != OperationType.QUERY:
+            return super().execute_operation(operation, root_value)
+        root_type = self.schema.query_type
+        fields, deferred = self.collect(root_type, [operation.selection_set])
+        data = self.execute_fields(root_type, root_value, None, fields)
+        self.defer(deferred, root_type, root_value, None)
+        return data
+
+    # Field collection
+
+    def collect(self, runtime_type, selection_sets):
+        """Fields of ``selection_sets`` and the (label, selection set) of each fragment to defer."""
+        fields, deferred, visited = {}, [], set()
+        for selection_set in selection_sets:
+            self._collect(runtime_type, selection_set, fields, deferred, visited)
+        return fields, deferred
+
+    def _collect(self, runtime_type, selection_set, fields, deferred, visited):
+        for selection in selection_set.selections:
+            if not should_include_node(self.variable_values, selection):
+                continue
+            if isinstance(selection, FieldNode):
+                fields.setdefault(get_field_entry_key(selection), []).append(selection)
+                continue
+            if isinstance(selection, InlineFragmentNode):
+                fragment = selection
+            elif isinstance(selection, FragmentSpreadNode):
+                if selection.name.value in visited:
+                    continue
+                visited.add(selection.name.value)
+                fragment = self.fragments.get(selection.name.value)
+                if fragment is None:
+                    continue
+            if not does_fragment_condition_match(self.schema, fragment, runtime_type):
+                continue
+            defer = _directive(DeferDirective, selection, self.variable_values)
+            if defer is not None:
+                deferred.append((defer.get('label'), fragment.selection_set))
+            else:
+                self._collect(runtime_type, fragment.selection_set, fields, deferred, visited)
+
+    def collect_subfields(self, return_type, field_nodes):
+        return self._collected(return_type, field_nodes)[0]
+
+    def _collected(self, return_type, field_nodes):
+        key = (return_type, *map(id, field_nodes))
+        collected = self._subfields_cache.get(key)
+        if collected is None:
+            collected = self.collect(return_type, [node.selection_set for node in field_nodes if node.selection_set])
+            self._subfields_cache[key] = collected
+        return collected
+
+    # Completion
+
+    def complete_object_value(self, return_type, field_nodes, info, path, result):
+        data = super().complete_object_value(return_type, field_nodes, info, path, result)
+        self.defer(self._collected(return_type, field_nodes)[1], return_type, result, path)
+        return data
+
+    def complete_list_value(self, return_type, field_nodes, info, path, result):
+        stream = _directive(StreamDirective, field_nodes[0], self.variable_values)
+        if stream is None or not is_iterable(result):
+            return super().complete_list_value(return_type, field_nodes, info, path, result)
+        if stream['initialCount'] < 0:
+            raise GraphQLError('initialCount must be a positive integer.', field_nodes)
+        items = list(result)
+        initial = stream['initialCount']
+        completed = super().complete_list_value(return_type, field_nodes, info, path, items[:initial])
+        if len(items) > initial:
+            self.pending.append(('stream', stream.get('label'), path, (return_type.of_type, field_nodes, info, items, initial)))
+        return completed
+
+    def defer(self, deferred, parent_type, source, path):
+        for label, selection_set in deferred:
+            self.pending.append(('defer', label, path, (parent_type, source, selection_set)))
+
+    # Subsequent payloads
+
+    def subsequent_payloads(self):
+        """
+        Execute the queued fragments and stream batches and yield the payloads.
+
+        Everything queued when a payload starts goes into that payload, so a
+        deferred fragment on every task of a list arrives as one part, not
+        one part per task. What those records queue in turn comes next.
+        """
+        while self.pending:
+            wave, self.pending = self.pending, deque()
+            incremental = [self._run(*record) for record in wave]
+            yield {'incremental': incremental, 'hasNext': bool(self.pending)}
+
+    def _run(self, kind, label, path, args):
+        errors_before = len(self.errors)
+        try:
+            if kind == 'defer':
+                entry = {'data': self._execute_deferred(path, *args)}
+            else:
+                entry = {'items': self._complete_stream_batch(label, path, *args)}
+        except GraphQLError as error:
+            # A non-null field failed; the whole fragment or batch is null.
+            if error not in self.errors:
+                self.errors.append(error)
+            entry = {'data': None} if kind == 'defer' else {'items': None}
+        entry['path'] = path.as_list() if path else []
+        if kind == 'stream':
+            # Stream paths end with the index of the batch's first item.
+            entry['path'].append(args[4])
+        if label is not None:
+            entry['label'] = label
+        errors = self.errors[errors_before:]
+        if errors:
+            entry['errors'] = [error.formatted for error in errors]
+        return entry
+
+    def _execute_deferred(self, path, parent_type, source, selection_set):
+        fields, deferred = self.collect(parent_type, [selection_set])
+        data = self.execute_fields(parent_type, source, path, fields)
+        self.defer(deferred, parent_type, source, path)
+        return data
+
+    def _complete_stream_batch(self, label, path, item_type, field_nodes, info, items, start):
+        end = min(start + STREAM_BATCH_SIZE, len(items))
+        if end < len(items):
+            self.pending.append(('stream', label, path, (item_type, field_nodes, info, items, end)))
+        completed = []
+        for index in range(start, end):
+            item_path = path.add_key(index, None)
+            try:
+                completed.append(self.complete_value(item_type, field_nodes, info, item_path, items[index]))
+            except Exception as raw_error:
+                error = located_error(raw_error, field_nodes, item_path.as_list())
+                self.handle_field_error(error, item_type)
+                completed.append(None)
+        return completed
+
+
+def initial_payload(result):
+    """The first payload of an incremental response, as a dict."""
+    payload = result.formatted
+    if getattr(result, 'subsequent', None) is not None:
+        payload['hasNext'] = True
+    return payload
+
+
+def multipart_body(first, subsequent, encode):
+    """The parts of a multipart/mixed incremental response; ``first`` is already encoded."""
+    yield PART_HEADER + first
+    for payload in subsequent:
+        yield PART_HEADER + encode(payload)
+    yield CLOSING_DELIMITER
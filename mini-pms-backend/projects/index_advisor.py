@@ -0,0 +1,331 @@
+import re
+import time
+
+from django.apps import apps
+from django.db import connection, migrations, models
+from django.db.migrations.loader import MigrationLoader
+from django.db.migrations.writer import MigrationWriter
+from django.test.client import RequestFactory
+
+
+COLUMN = r'"(?P<table>\w+)"\."(?P<column>\w+)"'
+EQUALITY_RE = re.compile(COLUMN + r'\s*(?:=\s*(?:%s|\?|\'|\d)|IN\s*\()')
+RANGE_RE = re.compile(COLUMN + r'\s*(?:<=|>=|<|>|BETWEEN)')
+LIKE_RE = re.compile(r'(?:UPPER\()?' + COLUMN + r'(?:::text)?\)?\s*(?:LIKE|ILIKE)')
+ORDER_RE = re.compile(COLUMN + r'(?:\s+(?P<direction>ASC|DESC))?')
+CLAUSE_END_RE = re.compile(r'\s(?:ORDER BY|GROUP BY|LIMIT|HAVING)\s')
+
+
+class CapturedStatement:
+    """A SQL statement issued while running a named workload operation."""
+
+    def __init__(self, operation, sql, params, duration):
+        self.operation = operation
+        self.sql = sql
+        self.params = params
+        self.duration = duration
+        self.plan = []
+
+
+class StatementRecorder:
+    """connection.execute_wrapper that records every statement with its parameters."""
+
+    def __init__(self):
+        self.operation = None
+        self.statements = []
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            if not many:
+                self.statements.append(CapturedStatement(
+                    self.operation, sql, params, time.perf_counter() - started
+                ))
+
+
+class IndexProposal:
+    """A candidate index with the operations and plan lines that motivated it."""
+
+    def __init__(self, model, fields, condition=None):
+        self.model = model
+        self.fields = list(fields)
+        self.condition = condition
+        self.operations = set()
+        self.evidence = []
+
+    @property
+    def key(self):
+        return (self.model._meta.label, tuple(self.fields), repr(self.condition))
+
+    def build_index(self):
+        index = models.Index(fields=self.fields)
+        index.set_name_with_model(self.model)
+        if self.condition is None:
+            return index
+        # Partial indexes must be named explicitly; reuse the generated
+        # name with an '_nn' (not null) suffix instead of '_idx'.
+        return models.Index(fields=self.fields, condition=self.condition, name=index.name[:-3] + 'nn')
+
+    def describe(self):
+        text = f"{self.model.__name__}({', '.join(self.fields)})"
+        if self.condition is not None:
+            text += f' WHERE {self.condition}'
+        return text
+
+
+def _graphql_request():
+    request = RequestFactory().post('/graphql/')
+    request.organization = None
+    return request
+
+
+def run_operation(operation, dataset):
+    """Run one workload entry: a GraphQL (name, query, variables) tuple or an ORM (name, callable) pair."""
+    from .schema import schema
+
+    if len(operation) == 3:
+        _, query, variables = operation
+        if callable(variables):
+            variables = variables(dataset)
+        result = schema.execute(query, variable_values=variables, context_value=_graphql_request())
+        if result.errors:
+            raise RuntimeError(f'{operation[0]}: {result.errors[0]}')
+        return result
+    return operation[1](dataset)
+
+
+def capture_workload(operations, dataset):
+    """Run the workload once and return the statements each operation issued."""
+    recorder = StatementRecorder()
+    with connection.execute_wrapper(recorder):
+        for operation in operations:
+            recorder.operation = operation[0]
+            run_operation(operation, dataset)
+    return recorder.statements
+
+
+def time_workload(operations, dataset, repeat=3):
+    """Return the best wall time in seconds of each operation over ``repeat`` runs."""
+    timings = {}
+    for operation in operations:
+        best = None
+        for _ in range(repeat):
+            started = time.perf_counter()
+            run_operation(operation, dataset)
+            elapsed = time.perf_counter() - started
+            best = elapsed if best is None else min(best, elapsed)
+        timings[operation[0]] = best
+    return timings
+
+
+def explain(statement):
+    """Return the planner output for a SELECT statement as a list of lines."""
+    if not statement.sql.lstrip().upper().startswith('SELECT'):
+        return []
+    prefix = 'EXPLAIN QUERY PLAN ' if connection.vendor == 'sqlite' else 'EXPLAIN '
+    with connection.cursor() as cursor:
+        cursor.execute(prefix + statement.sql, statement.params)
+        rows = cursor.fetchall()
+    return [str(row[-1]) for row in rows]
+
+
+def _problem_tables(plan):
+    """Tables the plan reads with a full scan or sorts without an index."""
+    tables = {}
+    for line in plan:
+        sqlite_scan = re.match(r'SCAN (\w+)(?! USING (?:COVERING )?INDEX)', line.strip())
+        postgres_scan = re.search(r'Seq Scan on (\w+)', line)
+        match = sqlite_scan or postgres_scan
+        if match:
+            tables.setdefault(match.group(1), []).append(line.strip())
+        if 'TEMP B-TREE FOR ORDER BY' in line or re.match(r'\s*(?:->\s*)?Sort\b', line):
+            tables.setdefault(None, []).append(line.strip())
+    return tables
+
+
+def _where_and_order(sql):
+    where = ''
+    order = ''
+    upper = sql.upper()
+    where_at = upper.rfind(' WHERE ')
+    if where_at != -1:
+        tail = sql[where_at + 7:]
+        end = CLAUSE_END_RE.search(tail)
+        where = tail[:end.start()] if end else tail
+    order_at = upper.rfind(' ORDER BY ')
+    if order_at != -1:
+        tail = sql[order_at + 10:]
+        end = re.search(r'\s(?:LIMIT|OFFSET)\s', tail)
+        order = tail[:end.start()] if end else tail
+    return where, order
+
+
+def _model_for_table(table):
+    for model in apps.get_models():
+        if model._meta.db_table == table:
+            return model
+    return None
+
+
+def _field_name(model, column):
+    for field in model._meta.concrete_fields:
+        if field.column == column:
+            return field
+    return None
+
+
+def existing_indexes(model):
+    """Column lists of the indexes and unique constraints already on a model's table."""
+    with connection.cursor() as cursor:
+        constraints = connection.introspection.get_constraints(cursor, model._meta.db_table)
+    return [tuple(info['columns']) for info in constraints.values() if info.get('index') or info.get('unique') or info.get('primary_key')]
+
+
+def _is_covered(model, fields):
+    columns = tuple(model._meta.get_field(name.lstrip('-')).column for name in fields)
+    return any(existing[:len(columns)] == columns for existing in existing_indexes(model))
+
+
+def redundant_pairs(indexes):
+    """
+    (index, covering) for every plain index whose columns lead a longer one.
+
+    A B-tree index serves any query its leading columns serve, so the
+    shorter one only costs writes and space. Partial, opclass and
+    expression indexes are left alone.
+    """
+    plain = [index for index in indexes if index.fields and index.condition is None and not index.opclasses and not index.include]
+    pairs = []
+    for index in plain:
+        for other in plain:
+            if len(other.fields) > len(index.fields) and other.fields[:len(index.fields)] == index.fields:
+                pairs.append((index, other))
+                break
+    return pairs
+
+
+def redundant_indexes(app_label='projects'):
+    """(model, index, covering) for the redundant Meta.indexes of every model in the app."""
+    return [
+        (model, index, covering)
+        for model in apps.get_app_config(app_label).get_models()
+        for index, covering in redundant_pairs(model._meta.indexes)
+    ]
+
+
+def propose_for_statement(statement):
+    """Derive index proposals (and advisory notes) for one captured statement."""
+    proposals = []
+    notes = []
+    problems = _problem_tables(statement.plan)
+    if not problems:
+        return proposals, notes
+
+    where, order = _where_and_order(statement.sql)
+    tables = {name for name in problems if name}
+    if None in problems:
+        tables.update(match.group('table') for match in ORDER_RE.finditer(order))
+
+    for table in sorted(tables):
+        model = _model_for_table(table)
+        if model is None:
+            continue
+
+        def fields_for(regex, text):
+            found = []
+            for match in regex.finditer(text):
+                if match.group('table') != table:
+                    continue
+                field = _field_name(model, match.group('column'))
+                if field is not None and field not in found:
+                    found.append(field)
+            return found
+
+        equality = fields_for(EQUALITY_RE, where)
+        ranges = [field for field in fields_for(RANGE_RE, where) if field not in equality]
+        likes = fields_for(LIKE_RE, where)
+
+        ordering = []
+        for match in ORDER_RE.finditer(order):
+            field = _field_name(model, match.group('column')) if match.group('table') == table else None
+            if field is None:
+                ordering = []
+                break
+            prefix = '-' if match.group('direction') == 'DESC' else ''
+            ordering.append(prefix + field.name)
+
+        for field in likes:
+            notes.append(
+                f'{model.__name__}.{field.name}: LIKE/icontains filters cannot use a B-tree index; '
+                f'store a normalized value and filter with an exact match instead.'
+            )
+
+        # Equality columns first; then either the first range column (a sort
+        # on anything else can't be served by the same index) or the ORDER BY
+        # columns. Range filters on nullable columns get a partial index that
+        # leaves out the NULL rows.
+        names = [field.name for field in equality]
+        condition = None
+        if ranges:
+            names.append(ranges[0].name)
+            if ranges[0].null:
+                condition = models.Q(**{f'{ranges[0].name}__isnull': False})
+        elif ordering and None in problems:
+            names += [name for name in ordering if name.lstrip('-') not in names]
+        if not names or _is_covered(model, names):
+            continue
+
+        proposal = IndexProposal(model, names, condition)
+        proposal.operations.add(statement.operation)
+        proposal.evidence.extend(problems.get(table, []) + problems.get(None, []))
+        proposals.append(proposal)
+
+    return proposals, notes
+
+
+def advise(statements):
+    """Explain every captured statement and merge the resulting proposals."""
+    merged = {}
+    notes = []
+    for statement in statements:
+        statement.plan = explain(statement)
+        proposals, statement_notes = propose_for_statement(statement)
+        for note in statement_notes:
+            if note not in notes:
+                notes.append(note)
+        for proposal in proposals:
+            existing = merged.setdefault(proposal.key, proposal)
+            if existing is not proposal:
+                existing.operations.update(proposal.operations)
+                existing.evidence.extend(line for line in proposal.evidence if line not in existing.evidence)
+    return list(merged.values()), notes
+
+
+def apply_proposals(proposals):
+    """Create the proposed indexes on the current connection (call inside a transaction to undo)."""
+    editor = connection.schema_editor()
+    with connection.cursor() as cursor:
+        for proposal in proposals:
+            cursor.execute(str(proposal.build_index().create_sql(proposal.model, editor)))
+        cursor.execute('ANALYZE')
+
+
+def build_migration(proposals, app_label='projects', name='advised_indexes', redundant=()):
+    """Return (path, source) of a migration adding the proposed indexes and dropping redundant ones."""
+    loader = MigrationLoader(None, ignore_no_migrations=True)
+    leaves = loader.graph.leaf_nodes(app_label)
+    number = max((int(leaf[1].split('_')[0]) for leaf in leaves), default=0) + 1
+
+    migration = migrations.Migration(f'{number:04d}_{name}', app_label)
+    migration.dependencies = leaves
+    migration.operations = [
+        migrations.AddIndex(model_name=proposal.model._meta.model_name, index=proposal.build_index())
+        for proposal in proposals
+    ] + [
+        migrations.RemoveIndex(model_name=model._meta.model_name, name=index.name)
+        for model, index, _ in redundant
+    ]
+    writer = MigrationWriter(migration)
+    return writer.path, writer.as_string()
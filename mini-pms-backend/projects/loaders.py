@@ -0,0 +1,221 @@
+from django.db.models import Count, F, Q, Window
+from django.db.models.functions import RowNumber
+
+from .archive import as_task
+from .models import ArchivedTask, ArchivedTaskComment, Project, TaskComment
+
+
+class CountLoader:
+    """
+    Counts rows of ``model`` per ``field`` value, in batches.
+
+    Resolvers that return a list register the keys they are about to return
+    with ``prime()``; the first ``load()`` then counts every registered key
+    that hasn't been counted yet in one grouped query, so a list of tasks
+    costs one query for its counts instead of one per task. Keys name the
+    database their rows live on (``using``, see sharding.py), so fields
+    resolved after a resolver's organization scope has ended still read the
+    right one; keys on different databases get one query per database.
+    """
+
+    def __init__(self, model, field):
+        self.model = model
+        self.field = field
+        self._pending = {}
+        self._counts = {}
+
+    def prime(self, keys, using=None):
+        for key in keys:
+            if key not in self._counts:
+                self._pending.setdefault(key, using)
+
+    def load(self, key, using=None):
+        if key not in self._counts:
+            self._pending.setdefault(key, using)
+            self._fetch()
+        return self._counts[key]
+
+    def _take_pending(self):
+        pending, self._pending = self._pending, {}
+        keys_by_alias = {}
+        for key, alias in pending.items():
+            keys_by_alias.setdefault(alias, []).append(key)
+        return keys_by_alias.items()
+
+    def _fetch(self):
+        for alias, keys in self._take_pending():
+            self._counts.update(dict.fromkeys(keys, 0))
+            rows = self.model.objects.using(alias).filter(
+                **{f'{self.field}__in': keys}
+            ).order_by().values(self.field).annotate(count=Count('pk'))
+            for row in rows:
+                self._counts[row[self.field]] = row['count']
+
+
+class GroupLoader(CountLoader):
+    """
+    Like CountLoader, but loads the rows themselves, grouped by ``field``.
+
+    Rows come back in the model's default ordering, the same as the related
+    manager's ``all()``.
+    """
+
+    def _fetch(self):
+        for alias, keys in self._take_pending():
+            groups = {key: [] for key in keys}
+            for row in self.model.objects.using(alias).filter(**{f'{self.field}__in': keys}):
+                groups[getattr(row, self.field)].append(self.convert(row))
+            self._counts.update(groups)
+
+    def convert(self, row):
+        return row
+
+
+class ArchivedTaskLoader(GroupLoader):
+    """
+    The archived tasks of each project, as Task instances (see archive.as_task).
+
+    An archived project's tasks, taskCount, completedTasks and
+    completionRate all read the same list, and a page of archived projects
+    loads its tasks in one query.
+    """
+
+    def __init__(self):
+        super().__init__(ArchivedTask, 'project_id')
+
+    def convert(self, row):
+        return as_task(row)
+
+
+class ArchivedTaskCountLoader(CountLoader):
+    """
+    (total, done) counts of the archived tasks of each live project.
+
+    DONE tasks are archived on their own while their project stays live;
+    they still count towards its taskCount, completedTasks and
+    completionRate, and a list of projects counts them in one grouped query.
+    """
+
+    def __init__(self):
+        super().__init__(ArchivedTask, 'project_id')
+
+    def _fetch(self):
+        for alias, keys in self._take_pending():
+            self._counts.update(dict.fromkeys(keys, (0, 0)))
+            rows = ArchivedTask.objects.using(alias).filter(project_id__in=keys).order_by().values(
+                'project_id'
+            ).annotate(total=Count('pk'), done=Count('pk', filter=Q(status='DONE')))
+            for row in rows:
+                self._counts[row['project_id']] = (row['total'], row['done'])
+
+
+class RecentProjectsLoader:
+    """
+    The newest projects of each organization, up to a limit, in batches.
+
+    Organizations are registered with ``prime()`` like CountLoader keys. The
+    first ``load()`` for a limit numbers the projects of every registered
+    organization with ROW_NUMBER() over a window partitioned by
+    organization, newest first, and keeps the rows numbered up to the
+    limit: one query for the whole list, and only ``limit`` rows per
+    organization leave the database. Organizations on other databases
+    (``using``, see sharding.py) get one query per database.
+    """
+
+    def __init__(self):
+        self._keys = {}
+        self._projects = {}
+
+    def prime(self, keys, using=None):
+        for key in keys:
+            self._keys.setdefault(key, using)
+
+    def load(self, key, limit, using=None):
+        if (key, limit) not in self._projects:
+            self._keys.setdefault(key, using)
+            self._fetch(limit)
+        return self._projects[(key, limit)]
+
+    def _fetch(self, limit):
+        pending = {}
+        for key, alias in self._keys.items():
+            if (key, limit) not in self._projects:
+                self._projects[(key, limit)] = []
+                pending.setdefault(alias, []).append(key)
+        order = [F('created_at').desc(), F('id').desc()]
+        for alias, keys in pending.items():
+            rows = Project.objects.using(alias).filter(organization_id__in=keys).annotate(
+                recent_position=Window(RowNumber(), partition_by=F('organization_id'), order_by=order),
+            ).filter(recent_position__lte=limit).order_by('organization_id', 'recent_position')
+            for project in rows:
+                self._projects[(project.organization_id, limit)].append(project)
+
+
+LOADERS = {
+    'comment_count': lambda: CountLoader(TaskComment, 'task_id'),
+    'comments': lambda: GroupLoader(TaskComment, 'task_id'),
+    'archived_comment_count': lambda: CountLoader(ArchivedTaskComment, 'task_id'),
+    'archived_tasks': ArchivedTaskLoader,
+    'archived_task_counts': ArchivedTaskCountLoader,
+    'recent_projects': RecentProjectsLoader,
+}
+
+
+def get_loader(context, name):
+    """
+    Return the loader ``name`` for the current request.
+
+    Loaders live on the request so their caches never outlive it; without
+    a request (e.g. schema.execute in a shell) a fresh loader is returned.
+    """
+    if context is None:
+        return LOADERS[name]()
+    loaders = getattr(context, '_loaders', None)
+    if loaders is None:
+        loaders = context._loaders = {}
+    if name not in loaders:
+        loaders[name] = LOADERS[name]()
+    return loaders[name]
+
+
+def clear_loaders(context):
+    """Drop the request's cached loaders, e.g. after a mutation."""
+    if context is not None:
+        context._loaders = {}
+
+
+def prime_comment_counts(context, tasks):
+    """Register ``tasks`` so that their commentCount fields, and their comments, each share one query."""
+    for task in tasks:
+        keys, using = [task.pk], task._state.db
+        if getattr(task, 'is_archived', False):
+            get_loader(context, 'archived_comment_count').prime(keys, using=using)
+        else:
+            get_loader(context, 'comment_count').prime(keys, using=using)
+            get_loader(context, 'comments').prime(keys, using=using)
+    return tasks
+
+
+def prime_archived_tasks(context, projects):
+    """Register archived ``projects`` so that their task fields share one query."""
+    loader = get_loader(context, 'archived_tasks')
+    for project in projects:
+        loader.prime([project.pk], using=project._state.db)
+    return projects
+
+
+def prime_task_counts(context, projects):
+    """Register live ``projects`` so that the archived part of their task counts shares one query."""
+    loader = get_loader(context, 'archived_task_counts')
+    for project in projects:
+        if not getattr(project, 'is_archived', False):
+            loader.prime([project.pk], using=project._state.db)
+    return projects
+
+
+def prime_recent_projects(context, organizations):
+    """Register ``organizations`` so that their recentProjects fields share one query."""
+    loader = get_loader(context, 'recent_projects')
+    for organization in organizations:
+        loader.prime([organization.pk], using=organization._state.db)
+    return organizations
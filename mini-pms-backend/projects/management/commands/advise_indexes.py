@@ -0,0 +1,127 @@
+import json
+import os
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+
+from projects.index_advisor import (
+    advise,
+    apply_proposals,
+    build_migration,
+    capture_workload,
+    redundant_indexes,
+    time_workload,
+)
+from projects.synthetic import ORM_WORKLOAD, WORKLOAD, SyntheticDataset, seed_dataset
+
+
+def _load_workload(path):
+    """Read captured GraphQL operations, one JSON object per line: {name, query, variables}."""
+    operations = []
+    with open(path, encoding='utf-8') as handle:
+        for number, line in enumerate(handle, start=1):
+            line = line.strip()
+            if not line:
+                continue
+            entry = json.loads(line)
+            operations.append((entry.get('name') or f'op{number}', entry['query'], entry.get('variables') or {}))
+    return operations
+
+
+class Command(BaseCommand):
+    help = (
+        'Run the GraphQL workload against a synthetic dataset, EXPLAIN every statement, '
+        'propose indexes, flag indexes made redundant by a longer one and emit a migration '
+        'with before/after timings.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workload', help='Replay captured operations from a JSON-lines file instead of the built-in workload.')
+        parser.add_argument('--no-seed', action='store_true', help='Run against the existing data instead of seeding.')
+        parser.add_argument('--orgs', type=int, default=2)
+        parser.add_argument('--projects', type=int, default=10, help='Projects per organization.')
+        parser.add_argument('--tasks', type=int, default=500, help='Tasks per project.')
+        parser.add_argument('--comments', type=int, default=3, help='Comments per task.')
+        parser.add_argument('--repeat', type=int, default=3, help='Timing runs per operation (best is reported).')
+        parser.add_argument('--explain', action='store_true', help='Print the plan of every flagged statement.')
+        parser.add_argument('--name', default='advised_indexes', help='Migration name suffix.')
+        parser.add_argument('--write', action='store_true', help='Write the migration into the app instead of printing it.')
+
+    def handle(self, *args, **options):
+        if options['workload']:
+            if not os.path.exists(options['workload']):
+                raise CommandError(f"Workload file '{options['workload']}' not found.")
+            operations = _load_workload(options['workload'])
+        else:
+            operations = WORKLOAD + ORM_WORKLOAD
+
+        # Seeding, index creation and timings all happen in one transaction
+        # that is rolled back, so the database is left untouched.
+        with transaction.atomic():
+            if options['no_seed']:
+                dataset = SyntheticDataset()
+            else:
+                self.stdout.write('Seeding synthetic dataset...')
+                dataset = seed_dataset(
+                    organizations=options['orgs'],
+                    projects_per_org=options['projects'],
+                    tasks_per_project=options['tasks'],
+                    comments_per_task=options['comments'],
+                    prefix='advisor',
+                )
+            with connection.cursor() as cursor:
+                cursor.execute('ANALYZE')
+
+            statements = capture_workload(operations, dataset)
+            proposals, notes = advise(statements)
+            self.stdout.write(f'Captured {len(statements)} statements from {len(operations)} operations.')
+
+            if options['explain']:
+                for statement in statements:
+                    if any(statement.operation in p.operations for p in proposals):
+                        self.stdout.write(f'\n[{statement.operation}] {statement.sql}')
+                        for line in statement.plan:
+                            self.stdout.write(f'    {line}')
+
+            for note in notes:
+                self.stdout.write(self.style.WARNING(f'note: {note}'))
+
+            redundant = redundant_indexes()
+            for model, index, covering in redundant:
+                self.stdout.write(self.style.WARNING(
+                    f"redundant: {model.__name__}({', '.join(index.fields)}) leads "
+                    f"{model.__name__}({', '.join(covering.fields)}); dropping {index.name}"
+                ))
+
+            if not proposals:
+                self.stdout.write(self.style.SUCCESS('No index proposals: every statement uses an index.'))
+                transaction.set_rollback(True)
+                if redundant:
+                    self._emit(build_migration([], name=options['name'], redundant=redundant), options)
+                return
+
+            self.stdout.write('\nProposed indexes:')
+            for proposal in proposals:
+                self.stdout.write(f"  {proposal.describe()}  <- {', '.join(sorted(proposal.operations))}")
+                for line in proposal.evidence:
+                    self.stdout.write(f'      {line}')
+
+            before = time_workload(operations, dataset, options['repeat'])
+            apply_proposals(proposals)
+            after = time_workload(operations, dataset, options['repeat'])
+            transaction.set_rollback(True)
+
+        self.stdout.write(f"\n{'operation':<24}{'before ms':>12}{'after ms':>12}")
+        for name, seconds in before.items():
+            self.stdout.write(f'{name:<24}{seconds * 1000:>12.2f}{after[name] * 1000:>12.2f}')
+
+        self._emit(build_migration(proposals, name=options['name'], redundant=redundant), options)
+
+    def _emit(self, migration, options):
+        path, source = migration
+        if options['write']:
+            with open(path, 'w', encoding='utf-8') as handle:
+                handle.write(source)
+            self.stdout.write(self.style.SUCCESS(f'\nWrote {path}'))
+        else:
+            self.stdout.write(f'\n# {path}\n{source}')
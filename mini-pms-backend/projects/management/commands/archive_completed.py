@@ -0,0 +1,38 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+
+from projects.archive import DEFAULT_ARCHIVE_AFTER_DAYS, DEFAULT_BATCH_SIZE, archive_completed
+from projects.sharding import TenantMoving, each_shard
+
+
+class Command(BaseCommand):
+    help = 'Move COMPLETED projects and DONE tasks that have not changed recently into the archive tables.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=DEFAULT_ARCHIVE_AFTER_DAYS, help='Archive rows not updated for this many days.')
+        parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE, help='Rows moved per transaction.')
+
+    def handle(self, *args, **options):
+        if options['batch_size'] < 1:
+            raise CommandError('Batch size must be at least 1.')
+
+        def progress(totals):
+            self.stdout.write(f"Archived {totals['projects']} projects, {totals['tasks']} tasks so far...")
+
+        totals = {'projects': 0, 'tasks': 0}
+        for alias in each_shard():
+            try:
+                shard_totals = archive_completed(
+                    older_than=timedelta(days=options['days']),
+                    batch_size=options['batch_size'],
+                    progress=progress,
+                )
+            except TenantMoving:
+                # Finished batches are kept; the rest is archived by the next run.
+                self.stdout.write(self.style.WARNING(f'{alias}: an organization is being moved, skipped the rest.'))
+                continue
+            totals = {key: totals[key] + shard_totals[key] for key in totals}
+        self.stdout.write(self.style.SUCCESS(
+            f"Archived {totals['projects']} projects and {totals['tasks']} tasks."
+        ))
@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from projects.history import backfill_initial_transitions, rebuild_rollups
+
+
+class Command(BaseCommand):
+    help = 'Log a creation transition for tasks without history and rebuild the daily rollups.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rollups-only', action='store_true', help='Only rebuild rollups from the existing log.')
+        parser.add_argument('--batch-size', type=int, default=1000, help='Rows per bulk_create batch.')
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            if not options['rollups_only']:
+                created = backfill_initial_transitions(batch_size=options['batch_size'])
+                self.stdout.write(f'Logged {created} initial transitions.')
+            rows = rebuild_rollups()
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt {rows} daily rollup rows.'))
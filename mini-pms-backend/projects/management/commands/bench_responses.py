@@ -0,0 +1,120 @@
+import json
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.test import RequestFactory
+from django.test.utils import override_settings
+from django.utils import timezone
+from django.utils.text import compress_string
+
+from projects.encoding import available_encoders, get_encoder
+from projects.pagination import encode_cursor
+from projects.schema import schema
+from projects.synthetic import seed_dataset
+
+
+PAYLOADS = [
+    (
+        'board',
+        '''query Board($projectId: ID!) {
+            board(projectId: $projectId, first: 200) {
+                columns { status count nextCursor hasNextPage
+                    items { id title description status assigneeEmail dueDate createdAt updatedAt commentCount } }
+            }
+        }''',
+        lambda ds: {'projectId': ds.project_ids[0]},
+    ),
+    (
+        'tasks',
+        '''query Tasks($projectId: ID!) {
+            tasks(projectId: $projectId) {
+                id title description status assigneeEmail dueDate createdAt updatedAt
+                comments { id content authorEmail createdAt }
+            }
+        }''',
+        lambda ds: {'projectId': ds.project_ids[0]},
+    ),
+    (
+        'changes_since',
+        '''query Export($slug: String!, $cursor: String) {
+            changesSince(organizationSlug: $slug, cursor: $cursor) {
+                cursor
+                projects { id name description status dueDate }
+                tasks { id title description status assigneeEmail dueDate createdAt updatedAt }
+                comments { id content authorEmail createdAt }
+            }
+        }''',
+        # Everything changed within the hour: the whole seeded organization.
+        lambda ds: {'slug': ds.organization_slugs[0], 'cursor': encode_cursor(timezone.now() - timedelta(hours=1))},
+    ),
+]
+
+
+def _best(function, repeat):
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        function()
+        timings.append(time.perf_counter() - started)
+    return min(timings)
+
+
+class Command(BaseCommand):
+    help = (
+        'Seed a large project, run the biggest GraphQL responses (board, task list, sync export) '
+        'and time each available JSON encoder and gzip on them.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--tasks', type=int, default=2000)
+        parser.add_argument('--comments', type=int, default=3, help='Comments per task.')
+        parser.add_argument('--repeat', type=int, default=20, help='Timing runs per encoder (best is reported).')
+        parser.add_argument('--json', action='store_true', help='Print the result as JSON.')
+
+    def handle(self, *args, **options):
+        if options['tasks'] < 1 or options['repeat'] < 1:
+            raise CommandError('--tasks and --repeat must be at least 1.')
+
+        results = []
+        # Seeding happens in a transaction that is rolled back, so the
+        # database is left untouched.
+        with transaction.atomic(), override_settings(SYNC={'MAX_CHANGES': options['tasks'] * options['comments'] + 1}):
+            dataset = seed_dataset(
+                organizations=1, projects_per_org=1, tasks_per_project=options['tasks'],
+                comments_per_task=options['comments'], prefix='bench',
+            )
+            for name, query, variables in PAYLOADS:
+                context = RequestFactory().post('/graphql/')
+                result = schema.execute(query, variables=variables(dataset), context_value=context)
+                if result.errors:
+                    raise CommandError(f'{name}: {result.errors[0]}')
+                data = {'data': result.data}
+                body = get_encoder('json')(data).encode()
+                row = {
+                    'payload': name,
+                    'bytes': len(body),
+                    'gzip_bytes': len(compress_string(body)),
+                    'gzip_ms': _best(lambda: compress_string(body), options['repeat']) * 1000,
+                    'encode_ms': {},
+                }
+                for encoder_name in available_encoders():
+                    encoder = get_encoder(encoder_name)
+                    row['encode_ms'][encoder_name] = _best(lambda: encoder(data), options['repeat']) * 1000
+                results.append(row)
+            transaction.set_rollback(True)
+
+        if options['json']:
+            self.stdout.write(json.dumps(results, indent=2))
+            return
+        encoders = available_encoders()
+        header = f"{'payload':<16}{'KB':>9}{'gzip KB':>10}{'gzip ms':>10}" + ''.join(f'{name + " ms":>12}' for name in encoders)
+        self.stdout.write(header)
+        for row in results:
+            self.stdout.write(
+                f"{row['payload']:<16}{row['bytes'] / 1024:>9.1f}{row['gzip_bytes'] / 1024:>10.1f}{row['gzip_ms']:>10.2f}"
+                + ''.join(f"{row['encode_ms'][name]:>12.2f}" for name in encoders)
+            )
+        if 'orjson' not in encoders:
+            self.stdout.write(self.style.WARNING('orjson is not installed: pip install orjson to compare it.'))
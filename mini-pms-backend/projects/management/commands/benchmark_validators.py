@@ -0,0 +1,81 @@
+import random
+import time
+from types import SimpleNamespace
+
+from django.core.management.base import BaseCommand
+
+from projects.validators import (
+    PROJECT_PLAN,
+    TASK_PLAN,
+    validate_project_input,
+    validate_task_input,
+)
+
+
+def _pick(rng, valid, invalid, error_rate):
+    return rng.choice(invalid) if rng.random() < error_rate else valid
+
+
+def _project_rows(count, rng, error_rate):
+    rows = []
+    for i in range(count):
+        rows.append(SimpleNamespace(
+            organization_id=str(rng.randint(1, 50)),
+            name=_pick(rng, f'Project {i}', ['X', '', 'P' * 250], error_rate),
+            description='',
+            status=_pick(rng, rng.choice(['ACTIVE', 'COMPLETED', 'ON_HOLD', None]), ['ARCHIVED'], error_rate),
+        ))
+    return rows
+
+
+def _task_rows(count, rng, error_rate):
+    assignees = [f'dev{i}@example.com' for i in range(25)] + ['']
+    rows = []
+    for i in range(count):
+        rows.append(SimpleNamespace(
+            project_id=str(rng.randint(1, 500)),
+            title=_pick(rng, f'Task {i}', ['T', '', 'T' * 250], error_rate),
+            description='',
+            status=_pick(rng, rng.choice(['TODO', 'IN_PROGRESS', 'DONE', None]), ['BLOCKED'], error_rate),
+            assignee_email=_pick(rng, rng.choice(assignees), ['not-an-email'], error_rate),
+        ))
+    return rows
+
+
+def _best_of(repeat, func):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+class Command(BaseCommand):
+    help = 'Benchmark compiled validation plans against the per-object validators.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=10000, help='Rows per input type.')
+        parser.add_argument('--repeat', type=int, default=5, help='Runs per measurement (best is reported).')
+        parser.add_argument('--error-rate', type=float, default=0.05, help='Fraction of invalid values per field.')
+        parser.add_argument('--seed', type=int, default=1)
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        count = options['rows']
+        repeat = options['repeat']
+
+        cases = [
+            ('project', _project_rows(count, rng, options['error_rate']), validate_project_input, PROJECT_PLAN),
+            ('task', _task_rows(count, rng, options['error_rate']), validate_task_input, TASK_PLAN),
+        ]
+
+        self.stdout.write(f'{"input":<10}{"rows":>8}{"per-object ms":>16}{"plan ms":>12}{"speedup":>10}')
+        for name, rows, legacy, plan in cases:
+            legacy_time = _best_of(repeat, lambda: [legacy(row) for row in rows])
+            plan_time = _best_of(repeat, lambda: plan.validate_many(rows))
+            self.stdout.write(
+                f'{name:<10}{count:>8}{legacy_time * 1000:>16.1f}{plan_time * 1000:>12.1f}'
+                f'{legacy_time / plan_time:>9.1f}x'
+            )
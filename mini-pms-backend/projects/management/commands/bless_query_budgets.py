@@ -0,0 +1,40 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from projects.query_budget import BUDGET_PATH, check, load_budgets, measure, write_budgets
+
+
+class Command(BaseCommand):
+    help = (
+        'Count the SQL queries of every budgeted GraphQL operation against two seeded dataset sizes '
+        'and write them as the new query budgets.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--check', action='store_true', help='Only compare with the budgets; fail if any is exceeded.')
+        parser.add_argument('--path', default=BUDGET_PATH, help='Budget file to read and write.')
+
+    def handle(self, *args, **options):
+        # Rows are seeded in transactions that are rolled back.
+        counts = measure()
+        budgets = load_budgets(options['path'])
+        failures, improvements = check(counts, budgets)
+        for line in improvements:
+            self.stdout.write(f'improved  {line}')
+        for line in failures:
+            self.stdout.write(self.style.WARNING(f'changed   {line}'))
+
+        if options['check']:
+            if failures:
+                raise CommandError(f'{len(failures)} operation(s) over budget.')
+            self.stdout.write(self.style.SUCCESS(f'{len(counts)} operations within budget.'))
+            return
+
+        scaling = [line for line in failures if 'scales with data size' in line]
+        if scaling:
+            # A budget can't fix an N+1: the count would still grow with the data.
+            raise CommandError(f'Not blessing: {len(scaling)} operation(s) run queries per row.')
+        stale = sorted(set(budgets) - set(counts))
+        write_budgets(counts, options['path'])
+        for name in stale:
+            self.stdout.write(f'removed   {name}')
+        self.stdout.write(self.style.SUCCESS(f"Wrote budgets for {len(counts)} operations to {options['path']}"))
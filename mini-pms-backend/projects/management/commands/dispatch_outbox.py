@@ -0,0 +1,46 @@
+import time
+
+from channels.layers import InMemoryChannelLayer, get_channel_layer
+from django.core.management.base import BaseCommand
+
+from projects.outbox import DEFAULT_BATCH_SIZE, dispatch_batch, retry_failed
+from projects.sharding import each_shard
+
+
+class Command(BaseCommand):
+    help = 'Deliver queued outbox events to the channel layer.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE, help='Events sent per transaction.')
+        parser.add_argument('--poll-interval', type=float, default=0.5, help='Seconds to wait when the outbox is empty.')
+        parser.add_argument('--once', action='store_true', help='Drain the outbox once and exit.')
+        parser.add_argument('--retry-failed', action='store_true', help='Requeue events that ran out of attempts first.')
+
+    def handle(self, *args, **options):
+        if isinstance(get_channel_layer(), InMemoryChannelLayer):
+            # The in-memory layer lives inside this process, so the events
+            # would never reach the ASGI server's subscribers.
+            self.stdout.write(self.style.WARNING(
+                'The channel layer is in-memory: events sent from here cannot reach the ASGI server. '
+                'Configure a shared layer such as Redis in CHANNEL_LAYERS.'
+            ))
+        if options['retry_failed']:
+            self.stdout.write(f'Requeued {sum(retry_failed() for _ in each_shard())} failed events.')
+
+        try:
+            while True:
+                # Each database has its own outbox; a full batch from any
+                # of them means another pass right away.
+                busy = False
+                for alias in each_shard():
+                    sent, failed = dispatch_batch(batch_size=options['batch_size'])
+                    if sent or failed:
+                        self.stdout.write(f'{alias}: sent {sent} events, {failed} failed.')
+                    busy |= sent + failed >= options['batch_size']
+                if not busy:
+                    if options['once']:
+                        break
+                    time.sleep(options['poll_interval'])
+        except KeyboardInterrupt:
+            pass
+        self.stdout.write(self.style.SUCCESS('Outbox dispatcher stopped.'))
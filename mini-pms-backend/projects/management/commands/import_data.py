@@ -0,0 +1,62 @@
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from projects.importers import DEFAULT_BATCH_SIZE, guess_format, import_stream
+from projects.models import Organization
+
+
+class Command(BaseCommand):
+    help = 'Stream projects and tasks from a CSV or JSON file into an organization.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('organization_slug', help='Slug of the organization to import into.')
+        parser.add_argument('path', help="Path to the CSV/JSON file, or '-' for stdin.")
+        parser.add_argument('--format', choices=['csv', 'json'], help='File format (guessed from the extension by default).')
+        parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE, help='Rows per bulk_create batch.')
+        parser.add_argument('--atomic', action='store_true', help='Roll back the whole import if any row fails.')
+
+    def handle(self, *args, **options):
+        try:
+            org = Organization.objects.get(slug=options['organization_slug'])
+        except Organization.DoesNotExist:
+            raise CommandError(f"Organization '{options['organization_slug']}' not found.")
+
+        path = options['path']
+        file_format = options['format'] or guess_format(path)
+
+        def progress(result):
+            self.stdout.write(
+                f'batch {result.batches}: {result.rows} rows read, '
+                f'{result.projects_created} projects, {result.tasks_created} tasks, '
+                f'{result.failed} failed'
+            )
+
+        stream = sys.stdin if path == '-' else open(path, encoding='utf-8-sig', newline='')
+        try:
+            if options['atomic']:
+                with transaction.atomic():
+                    result = import_stream(org, stream, file_format, options['batch_size'], progress)
+                    if result.has_errors():
+                        transaction.set_rollback(True)
+            else:
+                result = import_stream(org, stream, file_format, options['batch_size'], progress)
+        except ValueError as e:
+            raise CommandError(str(e))
+        finally:
+            if stream is not sys.stdin:
+                stream.close()
+
+        for error in result.errors:
+            self.stderr.write(f"row {error['row']}: {' '.join(error['errors'])}")
+        if result.failed > len(result.errors):
+            self.stderr.write(f'... {result.failed - len(result.errors)} more rows failed')
+
+        if options['atomic'] and result.has_errors():
+            raise CommandError(f'{result.failed} rows failed; nothing was imported.')
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Imported {result.projects_created} projects and {result.tasks_created} tasks '
+            f'from {result.rows} rows ({result.failed} failed).'
+        ))
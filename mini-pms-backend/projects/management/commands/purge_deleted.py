@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand
+
+from projects.purge import purge_deleted
+from projects.sharding import TenantMoving, each_shard
+from projects.sync import prune_tombstones
+
+
+class Command(BaseCommand):
+    help = (
+        'Remove projects and users still marked as deleted (e.g. after a worker restart) '
+        'and sync tombstones past their retention.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=None, help='Rows deleted per statement.')
+
+    def handle(self, *args, **options):
+        totals = purge_deleted(batch_size=options['batch_size'])
+        tombstones = 0
+        for alias in each_shard():
+            try:
+                tombstones += prune_tombstones()
+            except TenantMoving:
+                self.stdout.write(self.style.WARNING(f'{alias}: an organization is being moved, tombstones kept.'))
+        self.stdout.write(self.style.SUCCESS(
+            f"Purged {totals['projects']} projects and {totals['users']} users, "
+            f"pruned {tombstones} tombstones."
+        ))
@@ -0,0 +1,30 @@
+import asyncio
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+
+from projects.reminders import ReminderScheduler
+
+
+class Command(BaseCommand):
+    help = 'Run the due-date reminder scheduler, queueing due-soon and overdue events in the outbox.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--lookahead-hours', type=float, default=6, help='Hours of deadlines kept in memory.')
+        parser.add_argument('--due-soon-minutes', type=float, default=60, help='How long before a deadline to send the due-soon event.')
+
+    def handle(self, *args, **options):
+        try:
+            scheduler = ReminderScheduler(
+                lookahead=timedelta(hours=options['lookahead_hours']),
+                due_soon=timedelta(minutes=options['due_soon_minutes']),
+            )
+        except ValueError as e:
+            raise CommandError(str(e))
+
+        self.stdout.write('Reminder scheduler running. Press Ctrl+C to stop.')
+        try:
+            asyncio.run(scheduler.run())
+        except KeyboardInterrupt:
+            scheduler.stop()
+        self.stdout.write(self.style.SUCCESS('Reminder scheduler stopped.'))
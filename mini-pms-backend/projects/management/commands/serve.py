@@ -0,0 +1,58 @@
+import importlib.util
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.module_loading import import_string
+
+from projects.server import DEFAULTS, PreforkServer
+from projects.startup import prewarm
+
+
+class Command(BaseCommand):
+    help = (
+        'Production server: preload Django and the GraphQL schema, fork ASGI workers '
+        'that share it copy-on-write, and recycle them by request count or memory.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--host', default=DEFAULTS['HOST'])
+        parser.add_argument('--port', type=int, default=DEFAULTS['PORT'])
+        parser.add_argument('--workers', type=int, default=DEFAULTS['WORKERS'], help='Worker processes (default: one per CPU).')
+        parser.add_argument('--max-requests', type=int, default=DEFAULTS['MAX_REQUESTS'],
+                            help='Recycle a worker after this many requests (0 disables).')
+        parser.add_argument('--max-requests-jitter', type=int, default=DEFAULTS['MAX_REQUESTS_JITTER'],
+                            help='Random extra requests per worker so recycling is staggered.')
+        parser.add_argument('--max-rss', type=int, default=DEFAULTS['MAX_RSS_MB'],
+                            help='Recycle a worker whose resident memory exceeds this many MB (0 disables).')
+        parser.add_argument('--graceful-timeout', type=int, default=DEFAULTS['GRACEFUL_TIMEOUT'],
+                            help='Seconds a stopping worker waits for in-flight requests and WebSockets.')
+        parser.add_argument('--stats-interval', type=int, default=DEFAULTS['STATS_INTERVAL'],
+                            help='Seconds between per-worker load reports.')
+
+    def handle(self, *args, **options):
+        if importlib.util.find_spec('uvicorn') is None:
+            raise CommandError('The serve command needs uvicorn: pip install "uvicorn[standard]".')
+        if options['workers'] < 1:
+            raise CommandError('--workers must be at least 1.')
+
+        application = import_string(settings.ASGI_APPLICATION)
+        prewarm()
+
+        server = PreforkServer(
+            application,
+            host=options['host'],
+            port=options['port'],
+            workers=options['workers'],
+            max_requests=options['max_requests'],
+            max_requests_jitter=options['max_requests_jitter'],
+            max_rss_mb=options['max_rss'],
+            graceful_timeout=options['graceful_timeout'],
+            stats_interval=options['stats_interval'],
+            log=self.stdout.write,
+        )
+        try:
+            server.bind()
+        except OSError as e:
+            raise CommandError(f"Can't listen on {options['host']}:{options['port']}: {e}")
+        server.run()
+        self.stdout.write(self.style.SUCCESS('Server stopped.'))
@@ -0,0 +1,55 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from projects.startup import compare, run_probe
+
+
+class Command(BaseCommand):
+    help = 'Boot the project in a fresh interpreter and break startup time down by phase, app and imported package.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--profile', choices=['full', 'lean'], default='full', help='Startup profile to measure.')
+        parser.add_argument('--no-schema', action='store_true', help="Don't build the GraphQL schema (as a lazily loading worker).")
+        parser.add_argument('--top', type=int, default=15, help='Packages to list by import time.')
+        parser.add_argument('--compare', action='store_true', help='Compare the cold start of the full and lean profiles.')
+        parser.add_argument('--runs', type=int, default=5, help='Runs per measurement with --compare (median is reported).')
+
+    def handle(self, *args, **options):
+        try:
+            if options['compare']:
+                self._compare(options['runs'])
+            else:
+                self._report(options)
+        except RuntimeError as e:
+            raise CommandError(str(e))
+
+    def _report(self, options):
+        report = run_probe(options['profile'], build_schema=not options['no_schema'])
+        self.stdout.write(f"Profile: {report['profile']} ({len(report['installed_apps'])} apps), "
+                          f"process wall time {report['wall'] * 1000:.0f} ms")
+
+        self.stdout.write('\nPhases:')
+        for phase, seconds in report['phases'].items():
+            self.stdout.write(f'  {phase:<10} {seconds * 1000:8.1f} ms')
+
+        self.stdout.write('\nApps (import / models / ready):')
+        for app, timings in report['apps'].items():
+            import_ms, models_ms, ready_ms = (timings.get(key, 0) * 1000 for key in ('import', 'models', 'ready'))
+            self.stdout.write(f'  {app:<30} {import_ms:7.1f} {models_ms:7.1f} {ready_ms:7.1f} ms')
+
+        self.stdout.write('\nImported packages (self / cumulative):')
+        packages = sorted(report['imports'].items(), key=lambda item: item[1][0], reverse=True)
+        for package, (self_us, cumulative_us) in packages[:options['top']]:
+            self.stdout.write(f'  {package:<30} {self_us / 1000:7.1f} {cumulative_us / 1000:7.1f} ms')
+
+    def _compare(self, runs):
+        results = compare(runs=runs)
+        self.stdout.write(f'Median cold start over {runs} runs:')
+        self.stdout.write(f"  {'profile':<8} {'ready':>9} {'+schema':>9}")
+        for profile, timings in results.items():
+            self.stdout.write(f"  {profile:<8} {timings['ready'] * 1000:7.1f}ms {timings['with_schema'] * 1000:7.1f}ms")
+        full, lean = results['full'], results['lean']
+        self.stdout.write(
+            f"Lean profile saves {(full['ready'] - lean['ready']) * 1000:.1f} ms per worker; building the schema "
+            f"costs {(lean['with_schema'] - lean['ready']) * 1000:.1f} ms, paid by the first request when lazy "
+            f"or once in the parent with DJANGO_PREWARM_SCHEMA and a preloading server."
+        )
@@ -0,0 +1,61 @@
+import asyncio
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+from django.test.utils import override_settings
+
+from projects.consumers import DEFAULTS
+from projects.wsload import run_load_test
+
+
+class Command(BaseCommand):
+    help = (
+        'Connect simulated subscription clients to the WebSocket consumer in-process, '
+        'fan task updates out to them and report memory per connection and delivery latency.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--clients', type=int, default=10000)
+        parser.add_argument('--events', type=int, default=10, help='Task updates to fan out.')
+        parser.add_argument('--slow', type=float, default=0.01, help='Fraction of clients that never read.')
+        parser.add_argument('--interval', type=float, default=0.2, help='Seconds between events.')
+        parser.add_argument('--policy', choices=['drop', 'disconnect'], default=DEFAULTS['SLOW_CONSUMER_POLICY'],
+                            help='What to do with a slow client whose send queue is full.')
+        parser.add_argument('--queue-size', type=int, default=DEFAULTS['SEND_QUEUE_SIZE'])
+        parser.add_argument('--json', action='store_true', help='Print the result as JSON.')
+
+    def handle(self, *args, **options):
+        if options['clients'] < 1 or options['events'] < 1:
+            raise CommandError('--clients and --events must be at least 1.')
+        if not 0 <= options['slow'] < 1:
+            raise CommandError('--slow must be between 0 and 1.')
+
+        subscriptions = {'SLOW_CONSUMER_POLICY': options['policy'], 'SEND_QUEUE_SIZE': options['queue_size']}
+        log = (lambda line: None) if options['json'] else self.stdout.write
+        with override_settings(SUBSCRIPTIONS=subscriptions):
+            result = asyncio.run(run_load_test(
+                clients=options['clients'],
+                events=options['events'],
+                slow_fraction=options['slow'],
+                interval=options['interval'],
+                log=log,
+            ))
+
+        if options['json']:
+            self.stdout.write(json.dumps(result, indent=2))
+            return
+        latency = result['latency_ms']
+        self.stdout.write(
+            f"{result['clients']} clients ({result['slow_clients']} slow), "
+            f"{result['kb_per_connection']:.1f} KB per connection, "
+            f"connected in {result['connect_seconds']:.1f}s"
+        )
+        self.stdout.write(f"Delivered {result['delivered']}/{result['expected']} messages to fast clients")
+        self.stdout.write(
+            f"Fan-out latency: p50 {latency['p50']:.0f} ms, p95 {latency['p95']:.0f} ms, "
+            f"p99 {latency['p99']:.0f} ms, max {latency['max']:.0f} ms"
+        )
+        self.stdout.write(
+            f"Slow clients disconnected: {result['slow_disconnected']}/{result['slow_clients']} "
+            f"(policy: {options['policy']})"
+        )
@@ -1,4 +1,5 @@
 from .models import Organization
+from .sharding import organization_scope
 
 
 class OrganizationMiddleware:
@@ -11,13 +12,18 @@ class OrganizationMiddleware:
         org_slug = request.headers.get('X-Organization-Slug')
         request.organization = None
 
-        if org_slug:
+        if not org_slug:
+            return self.get_response(request)
+
+        # The organization's rows, and the queries of this request, live
+        # on the database its placement names.
+        with organization_scope(org_slug):
             try:
                 request.organization = Organization.objects.get(slug=org_slug)
             except Organization.DoesNotExist:
                 pass
 
-        return self.get_response(request)
+            return self.get_response(request)
 
 
 def get_organization_from_info(info):
@@ -0,0 +1,24 @@
+# Generated by Django 6.0.1 on 2026-10-18 23:40
+
+from django.db import migrations, models
+from django.db.models.functions import Lower, Trim
+
+
+def normalize_assignee_emails(apps, schema_editor):
+    Task = apps.get_model('projects', 'Task')
+    Task.objects.exclude(assignee_email='').update(assignee_email=Lower(Trim('assignee_email')))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('projects', '0002_advised_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(normalize_assignee_emails, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='task',
+            index=models.Index(fields=['assignee_email', 'due_date', 'id'], name='projects_ta_assigne_21f0f4_idx'),
+        ),
+    ]
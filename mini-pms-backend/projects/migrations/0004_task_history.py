@@ -0,0 +1,48 @@
+# Generated by Django 6.0.1 on 2026-10-19 00:05
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('projects', '0003_task_assignee_due_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProjectDailyRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('todo_delta', models.IntegerField(default=0)),
+                ('in_progress_delta', models.IntegerField(default=0)),
+                ('done_delta', models.IntegerField(default=0)),
+                ('created', models.PositiveIntegerField(default=0)),
+                ('completed', models.PositiveIntegerField(default=0)),
+                ('reopened', models.PositiveIntegerField(default=0)),
+                ('deleted', models.PositiveIntegerField(default=0)),
+                ('project', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_rollups', to='projects.project')),
+            ],
+            options={
+                'ordering': ['day'],
+                'constraints': [models.UniqueConstraint(fields=('project', 'day'), name='unique_project_daily_rollup')],
+            },
+        ),
+        migrations.CreateModel(
+            name='TaskStatusTransition',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('task_id', models.BigIntegerField()),
+                ('from_status', models.PositiveSmallIntegerField(choices=[(0, 'None'), (1, 'To Do'), (2, 'In Progress'), (3, 'Done')])),
+                ('to_status', models.PositiveSmallIntegerField(choices=[(0, 'None'), (1, 'To Do'), (2, 'In Progress'), (3, 'Done')])),
+                ('created_at', models.DateTimeField()),
+                ('project', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='status_transitions', to='projects.project')),
+            ],
+            options={
+                'ordering': ['created_at', 'id'],
+                'indexes': [models.Index(fields=['project', 'created_at'], name='projects_ta_project_757a7e_idx'), models.Index(fields=['task_id', 'created_at'], name='projects_ta_task_id_6237e0_idx')],
+            },
+        ),
+    ]
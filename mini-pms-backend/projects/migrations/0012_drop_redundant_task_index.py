@@ -0,0 +1,17 @@
+# Generated by Django 6.0.1 on 2026-10-19 17:40
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('projects', '0011_tenant_placement'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='task',
+            name='projects_ta_project_cd2085_idx',
+        ),
+    ]
@@ -2,18 +2,23 @@ from django.db import models
 from django.contrib.auth.models import AbstractBaseUser, BaseUserManager, PermissionsMixin
 from django.core.exceptions import ValidationError
 from django.core.validators import MinLengthValidator, EmailValidator
+from django.utils import timezone
 import re
 
 
 class UserManager(BaseUserManager):
     """Custom user manager for email-based authentication."""
 
-    def create_user(self, email, password=None, **extra_fields):
+    def create_user(self, email, password=None, password_hash=None, **extra_fields):
         if not email:
             raise ValueError('Email is required')
         email = self.normalize_email(email)
         user = self.model(email=email, **extra_fields)
-        user.set_password(password)
+        if password_hash:
+            # Already hashed off the request thread (see projects.hashing).
+            user.password = password_hash
+        else:
+            user.set_password(password)
         user.save(using=self._db)
         return user
 
@@ -33,16 +38,20 @@ class User(AbstractBaseUser, PermissionsMixin):
 
     email = models.EmailField(unique=True, validators=[EmailValidator()])
     name = models.CharField(max_length=100, validators=[MinLengthValidator(2)])
+    # No database constraint: users stay on 'default' while their
+    # organization may live on a shard (see projects.sharding).
     organization = models.ForeignKey(
         'Organization',
         on_delete=models.CASCADE,
         related_name='members',
         null=True,
-        blank=True
+        blank=True,
+        db_constraint=False,
     )
     role = models.CharField(max_length=20, choices=ROLE_CHOICES, default='ORG_MEMBER')
     is_active = models.BooleanField(default=True)
     is_staff = models.BooleanField(default=False)
+    deleted_at = models.DateTimeField(null=True, blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
@@ -53,6 +62,9 @@ class User(AbstractBaseUser, PermissionsMixin):
 
     class Meta:
         ordering = ['name']
+        indexes = [
+            models.Index(fields=['organization', 'name']),
+        ]
 
     def __str__(self):
         return self.email
@@ -99,6 +111,13 @@ class Organization(models.Model):
             self.slug = self.slug.lower().strip()
 
 
+class LiveProjectManager(models.Manager):
+    """Default manager that hides projects marked for deletion."""
+
+    def get_queryset(self):
+        return super().get_queryset().filter(deleted_at__isnull=True)
+
+
 class Project(models.Model):
     """Project model belonging to an organization."""
     STATUS_CHOICES = [
@@ -119,14 +138,22 @@ class Project(models.Model):
     description = models.TextField(blank=True)
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='ACTIVE')
     due_date = models.DateField(null=True, blank=True)
+    # Set by DeleteProject; the rows are removed later by projects.purge.
+    deleted_at = models.DateTimeField(null=True, blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    objects = LiveProjectManager()
+    all_objects = models.Manager()
+
     class Meta:
         ordering = ['-created_at']
+        base_manager_name = 'all_objects'
         indexes = [
             models.Index(fields=['organization', 'status']),
             models.Index(fields=['organization', 'name']),
+            models.Index(fields=['organization', '-created_at']),
+            models.Index(fields=['organization', 'updated_at']),
         ]
 
     def __str__(self):
@@ -145,6 +172,9 @@ class Project(models.Model):
 
     @property
     def completed_tasks(self):
+        if 'tasks' in getattr(self, '_prefetched_objects_cache', {}):
+            # Listed with prefetch_related('tasks'): no query per project.
+            return sum(1 for task in self.tasks.all() if task.status == 'DONE')
         return self.tasks.filter(status='DONE').count()
 
     @property
@@ -182,7 +212,20 @@ class Task(models.Model):
     class Meta:
         ordering = ['-created_at']
         indexes = [
-            models.Index(fields=['project', 'status']),
+            models.Index(fields=['project', '-created_at']),
+            models.Index(fields=['project', 'status', '-created_at', '-id']),
+            models.Index(
+                fields=['due_date'],
+                condition=models.Q(due_date__isnull=False),
+                name='projects_ta_due_dat_4757e0_nn',
+            ),
+            # Serves the org-wide "my tasks" page: exact match on the
+            # lower-cased email, then a range scan in (due_date, id) order.
+            models.Index(fields=['assignee_email', 'due_date', 'id']),
+            models.Index(fields=['updated_at']),
+            # Prefix search in the admin (title__startswith). PostgreSQL
+            # needs the pattern opclass to use it for LIKE 'abc%'.
+            models.Index(fields=['title'], name='projects_task_title_like', opclasses=['varchar_pattern_ops']),
         ]
 
     def __str__(self):
@@ -192,6 +235,8 @@ class Task(models.Model):
         super().clean()
         if self.title:
             self.title = self.title.strip()
+        if self.assignee_email:
+            self.assignee_email = self.assignee_email.strip().lower()
         if self.status and self.status not in dict(self.STATUS_CHOICES):
             raise ValidationError({'status': 'Invalid status value.'})
 
@@ -212,6 +257,10 @@ class TaskComment(models.Model):
 
     class Meta:
         ordering = ['created_at']
+        indexes = [
+            models.Index(fields=['task', 'created_at']),
+            models.Index(fields=['updated_at']),
+        ]
 
     def __str__(self):
         return f"Comment by {self.author_email} on {self.task.title}"
@@ -220,3 +269,238 @@ class TaskComment(models.Model):
         super().clean()
         if self.content:
             self.content = self.content.strip()
+
+
+class TaskStatusTransition(models.Model):
+    """
+    Append-only log of task status changes.
+
+    Statuses are stored as small integer codes; ``from_status`` is NONE for a
+    created task and ``to_status`` is NONE for a deleted one. ``task_id`` is
+    a plain column so the history outlives the task.
+    """
+    NONE = 0
+    TODO = 1
+    IN_PROGRESS = 2
+    DONE = 3
+    STATUS_CODES = {None: NONE, 'TODO': TODO, 'IN_PROGRESS': IN_PROGRESS, 'DONE': DONE}
+    CODE_CHOICES = [
+        (NONE, 'None'),
+        (TODO, 'To Do'),
+        (IN_PROGRESS, 'In Progress'),
+        (DONE, 'Done'),
+    ]
+
+    project = models.ForeignKey(
+        Project,
+        on_delete=models.CASCADE,
+        related_name='status_transitions',
+        db_constraint=False
+    )
+    task_id = models.BigIntegerField()
+    from_status = models.PositiveSmallIntegerField(choices=CODE_CHOICES)
+    to_status = models.PositiveSmallIntegerField(choices=CODE_CHOICES)
+    created_at = models.DateTimeField()
+
+    class Meta:
+        ordering = ['created_at', 'id']
+        indexes = [
+            models.Index(fields=['project', 'created_at']),
+            models.Index(fields=['task_id', 'created_at']),
+        ]
+
+    def __str__(self):
+        return f'Task {self.task_id}: {self.from_status} -> {self.to_status}'
+
+
+class ProjectDailyRollup(models.Model):
+    """
+    Per-project, per-day totals of the status transition log.
+
+    Like the transition log, rollups have no database-level foreign key so
+    they stay in place while their project is archived (see projects.archive);
+    deleting a project through the ORM still removes them.
+
+    The ``*_delta`` columns are the net change in the number of tasks in each
+    status that day, so a running sum gives the board at the end of any day.
+    Rows are updated incrementally as transitions are recorded.
+    """
+    project = models.ForeignKey(
+        Project,
+        on_delete=models.CASCADE,
+        related_name='daily_rollups',
+        db_constraint=False
+    )
+    day = models.DateField()
+    todo_delta = models.IntegerField(default=0)
+    in_progress_delta = models.IntegerField(default=0)
+    done_delta = models.IntegerField(default=0)
+    created = models.PositiveIntegerField(default=0)
+    completed = models.PositiveIntegerField(default=0)
+    reopened = models.PositiveIntegerField(default=0)
+    deleted = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        ordering = ['day']
+        constraints = [
+            models.UniqueConstraint(fields=['project', 'day'], name='unique_project_daily_rollup'),
+        ]
+
+    def __str__(self):
+        return f'{self.project_id} on {self.day}'
+
+
+class ArchivedProject(models.Model):
+    """A completed project moved out of the hot table, keeping its original id."""
+    id = models.BigIntegerField(primary_key=True)
+    organization = models.ForeignKey(
+        Organization,
+        on_delete=models.CASCADE,
+        related_name='archived_projects'
+    )
+    name = models.CharField(max_length=200)
+    description = models.TextField(blank=True)
+    status = models.CharField(max_length=20, choices=Project.STATUS_CHOICES)
+    due_date = models.DateField(null=True, blank=True)
+    created_at = models.DateTimeField()
+    updated_at = models.DateTimeField()
+    archived_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['organization', '-created_at']),
+        ]
+
+    def __str__(self):
+        return self.name
+
+
+class ArchivedTask(models.Model):
+    """
+    A done task moved out of the hot table, keeping its original id.
+
+    ``project_id`` may refer to a live or an archived project, so it is a
+    plain column rather than a foreign key.
+    """
+    id = models.BigIntegerField(primary_key=True)
+    organization = models.ForeignKey(
+        Organization,
+        on_delete=models.CASCADE,
+        related_name='archived_tasks'
+    )
+    project_id = models.BigIntegerField()
+    title = models.CharField(max_length=200)
+    description = models.TextField(blank=True)
+    status = models.CharField(max_length=20, choices=Task.STATUS_CHOICES)
+    assignee_email = models.EmailField(blank=True)
+    due_date = models.DateTimeField(null=True, blank=True)
+    created_at = models.DateTimeField()
+    updated_at = models.DateTimeField()
+    archived_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['project_id', 'status']),
+        ]
+
+    def __str__(self):
+        return self.title
+
+
+class ArchivedTaskComment(models.Model):
+    """A comment archived together with its task."""
+    id = models.BigIntegerField(primary_key=True)
+    task_id = models.BigIntegerField(db_index=True)
+    content = models.TextField()
+    author_email = models.EmailField()
+    created_at = models.DateTimeField()
+    updated_at = models.DateTimeField()
+
+    class Meta:
+        ordering = ['created_at']
+
+    def __str__(self):
+        return f"Comment by {self.author_email} on task {self.task_id}"
+
+
+class OutboxEvent(models.Model):
+    """
+    A channel-layer message written in the same transaction as the change.
+
+    Rows are sent by the outbox dispatcher (projects.outbox) and deleted once
+    delivered. ``available_at`` is pushed back after a failed send;
+    ``failed_at`` is set when an event runs out of attempts.
+    """
+    group = models.CharField(max_length=100)
+    event_type = models.CharField(max_length=50)
+    payload = models.JSONField(default=dict)
+    created_at = models.DateTimeField(auto_now_add=True)
+    available_at = models.DateTimeField(default=timezone.now)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    last_error = models.TextField(blank=True)
+    failed_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['id']
+        indexes = [
+            models.Index(
+                fields=['available_at', 'id'],
+                condition=models.Q(failed_at__isnull=True),
+                name='projects_outbox_pending',
+            ),
+        ]
+
+    def __str__(self):
+        return f'{self.event_type} -> {self.group}'
+
+
+class Tombstone(models.Model):
+    """
+    Records that a project, task or comment was deleted.
+
+    Read by the changesSince sync query so clients can drop the row from
+    their cache, and pruned once older than the sync retention period.
+    """
+    PROJECT = 'project'
+    TASK = 'task'
+    COMMENT = 'comment'
+    KIND_CHOICES = [
+        (PROJECT, 'Project'),
+        (TASK, 'Task'),
+        (COMMENT, 'Comment'),
+    ]
+
+    organization = models.ForeignKey(Organization, on_delete=models.CASCADE, related_name='+')
+    kind = models.CharField(max_length=10, choices=KIND_CHOICES)
+    object_id = models.BigIntegerField()
+    # The project the task or comment belonged to, so clients can find it.
+    project_id = models.BigIntegerField(null=True, blank=True)
+    deleted_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        ordering = ['deleted_at', 'id']
+        indexes = [
+            models.Index(fields=['organization', 'deleted_at']),
+        ]
+
+    def __str__(self):
+        return f'{self.kind} {self.object_id} deleted'
+
+
+class TenantPlacement(models.Model):
+    """
+    The database alias an organization's rows live on (see projects.sharding).
+
+    Kept on 'default' only. Organizations without a row live on 'default'.
+    ``read_only`` is set while move_tenant copies the last changes across.
+    """
+    organization_id = models.BigIntegerField(unique=True)
+    slug = models.SlugField(unique=True)
+    alias = models.CharField(max_length=50)
+    read_only = models.BooleanField(default=False)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f'{self.slug} -> {self.alias}'
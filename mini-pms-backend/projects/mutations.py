@@ -1,7 +1,15 @@
 import graphene
 from django.db import IntegrityError, transaction
-from django.contrib.auth import authenticate
-from .models import Organization, Project, Task, TaskComment, User
+from .archive import get_or_restore
+from .hashing import HashingPoolBusy, authenticate_user, hash_password
+from .history import record_transition
+from .models import Organization, Project, Task, TaskComment, Tombstone, User
+from .purge import delete_project, delete_user
+from .ratelimit import RATE_LIMIT_MESSAGE, allow_attempt
+from .reminders import deadline_changed
+from .sharding import organization_scope, slug_taken, sync_placement_slug, tenant_db
+from .subscriptions import notify_comment_added, notify_project_updated, notify_task_updated
+from .sync import record_tombstone
 from .types import OrganizationType, ProjectType, TaskType, TaskCommentType, UserType
 from .types import OrganizationInput, ProjectInput, TaskInput, TaskCommentInput
 from .types import RegisterInput, LoginInput, CreateMemberInput
@@ -13,6 +21,12 @@ from .validators import (
 )
 
 
+BUSY_MESSAGE = 'Server is busy, please try again shortly.'
+
+# Tasks whose project hasn't been deleted.
+LIVE_TASKS = Task.objects.filter(project__deleted_at__isnull=True)
+
+
 class CreateOrganization(graphene.Mutation):
     class Arguments:
         input = OrganizationInput(required=True)
@@ -26,6 +40,9 @@ class CreateOrganization(graphene.Mutation):
         if validation.has_errors():
             return CreateOrganization(organization=None, success=False, errors=validation.get_errors())
 
+        if slug_taken(input.slug.lower().strip()):
+            return CreateOrganization(organization=None, success=False, errors=['An organization with this slug already exists.'])
+
         try:
             org = Organization.objects.create(
                 name=input.name.strip(),
@@ -55,10 +72,13 @@ class UpdateOrganization(graphene.Mutation):
 
         try:
             org = Organization.objects.get(pk=id)
+            if slug_taken(input.slug.lower().strip(), exclude_id=org.pk):
+                raise IntegrityError
             org.name = input.name.strip()
             org.slug = input.slug.lower().strip()
             org.contact_email = input.contact_email.lower().strip()
             org.save()
+            sync_placement_slug(org)
             return UpdateOrganization(organization=org, success=True, errors=[])
         except Organization.DoesNotExist:
             return UpdateOrganization(organization=None, success=False, errors=['Organization not found.'])
@@ -82,14 +102,18 @@ class CreateProject(graphene.Mutation):
             return CreateProject(project=None, success=False, errors=validation.get_errors())
 
         try:
-            org = Organization.objects.get(pk=input.organization_id)
-            project = Project.objects.create(
-                organization=org,
-                name=input.name.strip(),
-                description=(input.description or '').strip(),
-                status=input.status or 'ACTIVE',
-                due_date=input.due_date
-            )
+            with organization_scope(organization_id=input.organization_id):
+                org = Organization.objects.get(pk=input.organization_id)
+                with transaction.atomic(using=tenant_db()):
+                    project = Project.objects.create(
+                        organization=org,
+                        name=input.name.strip(),
+                        description=(input.description or '').strip(),
+                        status=input.status or 'ACTIVE',
+                        due_date=input.due_date
+                    )
+                    deadline_changed(project)
+                    notify_project_updated(project)
             return CreateProject(project=project, success=True, errors=[])
         except Organization.DoesNotExist:
             return CreateProject(project=None, success=False, errors=['Organization not found.'])
@@ -112,7 +136,7 @@ class UpdateProject(graphene.Mutation):
             return UpdateProject(project=None, success=False, errors=validation.get_errors())
 
         try:
-            project = Project.objects.get(pk=id)
+            project = get_or_restore(Project, id, Project.objects.select_related('organization'))
             project.name = input.name.strip()
             if input.description is not None:
                 project.description = input.description.strip()
@@ -120,7 +144,10 @@ class UpdateProject(graphene.Mutation):
                 project.status = input.status
             if input.due_date is not None:
                 project.due_date = input.due_date
-            project.save()
+            with transaction.atomic(using=tenant_db()):
+                project.save()
+                deadline_changed(project)
+                notify_project_updated(project)
             return UpdateProject(project=project, success=True, errors=[])
         except Project.DoesNotExist:
             return UpdateProject(project=None, success=False, errors=['Project not found.'])
@@ -137,8 +164,14 @@ class DeleteProject(graphene.Mutation):
 
     def mutate(self, info, id):
         try:
-            project = Project.objects.get(pk=id)
-            project.delete()
+            project = get_or_restore(Project, id, Project.objects.select_related('organization'))
+            with transaction.atomic(using=tenant_db()):
+                deadline_changed(project, deleted=True)
+                # Hide the project now; its tasks and comments are removed in
+                # batches by the deletion worker after commit.
+                delete_project(project)
+                record_tombstone(Tombstone.PROJECT, project.pk, project.organization_id)
+                notify_project_updated(project)
             return DeleteProject(success=True, errors=[])
         except Project.DoesNotExist:
             return DeleteProject(success=False, errors=['Project not found.'])
@@ -160,15 +193,19 @@ class CreateTask(graphene.Mutation):
             return CreateTask(task=None, success=False, errors=validation.get_errors())
 
         try:
-            project = Project.objects.get(pk=input.project_id)
-            task = Task.objects.create(
-                project=project,
-                title=input.title.strip(),
-                description=(input.description or '').strip(),
-                status=input.status or 'TODO',
-                assignee_email=(input.assignee_email or '').strip().lower(),
-                due_date=input.due_date
-            )
+            project = get_or_restore(Project, input.project_id)
+            with transaction.atomic(using=tenant_db()):
+                task = Task.objects.create(
+                    project=project,
+                    title=input.title.strip(),
+                    description=(input.description or '').strip(),
+                    status=input.status or 'TODO',
+                    assignee_email=(input.assignee_email or '').strip().lower(),
+                    due_date=input.due_date
+                )
+                record_transition(task, None, task.status)
+                deadline_changed(task)
+                notify_task_updated(task)
             return CreateTask(task=task, success=True, errors=[])
         except Project.DoesNotExist:
             return CreateTask(task=None, success=False, errors=['Project not found.'])
@@ -191,7 +228,8 @@ class UpdateTask(graphene.Mutation):
             return UpdateTask(task=None, success=False, errors=validation.get_errors())
 
         try:
-            task = Task.objects.get(pk=id)
+            task = get_or_restore(Task, id, LIVE_TASKS)
+            previous_status = task.status
             task.title = input.title.strip()
             if input.description is not None:
                 task.description = input.description.strip()
@@ -201,7 +239,11 @@ class UpdateTask(graphene.Mutation):
                 task.assignee_email = input.assignee_email.strip().lower()
             if input.due_date is not None:
                 task.due_date = input.due_date
-            task.save()
+            with transaction.atomic(using=tenant_db()):
+                task.save()
+                record_transition(task, previous_status, task.status)
+                deadline_changed(task)
+                notify_task_updated(task)
             return UpdateTask(task=task, success=True, errors=[])
         except Task.DoesNotExist:
             return UpdateTask(task=None, success=False, errors=['Task not found.'])
@@ -218,8 +260,13 @@ class DeleteTask(graphene.Mutation):
 
     def mutate(self, info, id):
         try:
-            task = Task.objects.get(pk=id)
-            task.delete()
+            task = get_or_restore(Task, id, LIVE_TASKS.select_related('project'))
+            with transaction.atomic(using=tenant_db()):
+                record_transition(task, task.status, None)
+                deadline_changed(task, deleted=True)
+                record_tombstone(Tombstone.TASK, task.pk, task.project.organization_id, task.project_id)
+                notify_task_updated(task)
+                task.delete()
             return DeleteTask(success=True, errors=[])
         except Task.DoesNotExist:
             return DeleteTask(success=False, errors=['Task not found.'])
@@ -241,12 +288,14 @@ class AddTaskComment(graphene.Mutation):
             return AddTaskComment(comment=None, success=False, errors=validation.get_errors())
 
         try:
-            task = Task.objects.get(pk=input.task_id)
-            comment = TaskComment.objects.create(
-                task=task,
-                content=input.content.strip(),
-                author_email=input.author_email.strip().lower()
-            )
+            task = get_or_restore(Task, input.task_id, LIVE_TASKS)
+            with transaction.atomic(using=tenant_db()):
+                comment = TaskComment.objects.create(
+                    task=task,
+                    content=input.content.strip(),
+                    author_email=input.author_email.strip().lower()
+                )
+                notify_comment_added(comment)
             return AddTaskComment(comment=comment, success=True, errors=[])
         except Task.DoesNotExist:
             return AddTaskComment(comment=None, success=False, errors=['Task not found.'])
@@ -263,8 +312,12 @@ class DeleteTaskComment(graphene.Mutation):
 
     def mutate(self, info, id):
         try:
-            comment = TaskComment.objects.get(pk=id)
-            comment.delete()
+            comment = get_or_restore(TaskComment, id, TaskComment.objects.select_related('task__project'))
+            with transaction.atomic(using=tenant_db()):
+                record_tombstone(
+                    Tombstone.COMMENT, comment.pk, comment.task.project.organization_id, comment.task.project_id
+                )
+                comment.delete()
             return DeleteTaskComment(success=True, errors=[])
         except TaskComment.DoesNotExist:
             return DeleteTaskComment(success=False, errors=['Comment not found.'])
@@ -284,6 +337,9 @@ class Register(graphene.Mutation):
     errors = graphene.List(graphene.String)
 
     def mutate(self, info, input):
+        if not allow_attempt('register', info.context, input.email):
+            return Register(user=None, organization=None, success=False, errors=[RATE_LIMIT_MESSAGE])
+
         errors = []
 
         # Validate email
@@ -307,12 +363,17 @@ class Register(graphene.Mutation):
         # Validate organization slug
         if not input.organization_slug:
             errors.append('Organization slug is required.')
-        elif Organization.objects.filter(slug=input.organization_slug.lower()).exists():
+        elif slug_taken(input.organization_slug.lower()):
             errors.append('Organization slug already taken.')
 
         if errors:
             return Register(user=None, organization=None, success=False, errors=errors)
 
+        try:
+            password_hash = hash_password(input.password)
+        except (HashingPoolBusy, TimeoutError):
+            return Register(user=None, organization=None, success=False, errors=[BUSY_MESSAGE])
+
         try:
             with transaction.atomic():
                 # Create organization
@@ -325,7 +386,7 @@ class Register(graphene.Mutation):
                 # Create admin user
                 user = User.objects.create_user(
                     email=input.email.lower().strip(),
-                    password=input.password,
+                    password_hash=password_hash,
                     name=input.name.strip(),
                     organization=org,
                     role='ORG_ADMIN'
@@ -349,7 +410,13 @@ class Login(graphene.Mutation):
         if not input.email or not input.password:
             return Login(user=None, success=False, errors=['Email and password required.'])
 
-        user = authenticate(email=input.email.lower(), password=input.password)
+        if not allow_attempt('login', info.context, input.email):
+            return Login(user=None, success=False, errors=[RATE_LIMIT_MESSAGE])
+
+        try:
+            user = authenticate_user(input.email.lower(), input.password)
+        except (HashingPoolBusy, TimeoutError):
+            return Login(user=None, success=False, errors=[BUSY_MESSAGE])
 
         if user is None:
             return Login(user=None, success=False, errors=['Invalid credentials.'])
@@ -371,6 +438,9 @@ class CreateOrgMember(graphene.Mutation):
     errors = graphene.List(graphene.String)
 
     def mutate(self, info, input, organization_id):
+        if not allow_attempt('create_org_member', info.context):
+            return CreateOrgMember(user=None, success=False, errors=[RATE_LIMIT_MESSAGE])
+
         errors = []
 
         # Validate email
@@ -391,11 +461,13 @@ class CreateOrgMember(graphene.Mutation):
             return CreateOrgMember(user=None, success=False, errors=errors)
 
         try:
-            org = Organization.objects.get(pk=organization_id)
+            with organization_scope(organization_id=organization_id):
+                org = Organization.objects.get(pk=organization_id)
+            password_hash = hash_password(input.password)
 
             user = User.objects.create_user(
                 email=input.email.lower().strip(),
-                password=input.password,
+                password_hash=password_hash,
                 name=input.name.strip(),
                 organization=org,
                 role='ORG_MEMBER'
@@ -404,6 +476,8 @@ class CreateOrgMember(graphene.Mutation):
             return CreateOrgMember(user=user, success=True, errors=[])
         except Organization.DoesNotExist:
             return CreateOrgMember(user=None, success=False, errors=['Organization not found.'])
+        except (HashingPoolBusy, TimeoutError):
+            return CreateOrgMember(user=None, success=False, errors=[BUSY_MESSAGE])
         except Exception as e:
             return CreateOrgMember(user=None, success=False, errors=[str(e)])
 
@@ -418,10 +492,10 @@ class DeleteOrgMember(graphene.Mutation):
 
     def mutate(self, info, user_id):
         try:
-            user = User.objects.get(pk=user_id)
+            user = User.objects.get(pk=user_id, deleted_at__isnull=True)
             if user.role == 'ORG_ADMIN':
                 return DeleteOrgMember(success=False, errors=['Cannot delete org admin.'])
-            user.delete()
+            delete_user(user)
             return DeleteOrgMember(success=True, errors=[])
         except User.DoesNotExist:
             return DeleteOrgMember(success=False, errors=['User not found.'])
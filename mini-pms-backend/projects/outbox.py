@@ -0,0 +1,91 @@
+from datetime import timedelta
+
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+from django.utils import timezone
+
+from .models import OutboxEvent
+from .sharding import tenant_db
+
+
+DEFAULT_BATCH_SIZE = 100
+MAX_ATTEMPTS = 10
+BASE_BACKOFF = timedelta(seconds=1)
+MAX_BACKOFF = timedelta(minutes=5)
+
+
+def enqueue(group, event_type, payload):
+    """
+    Queue a channel-layer message in the current transaction.
+
+    The row commits or rolls back with the change it describes, and the
+    request never waits on the channel layer; the dispatcher sends it.
+    """
+    return OutboxEvent.objects.create(group=group, event_type=event_type, payload=payload)
+
+
+def backoff(attempts):
+    return min(BASE_BACKOFF * (2 ** (attempts - 1)), MAX_BACKOFF)
+
+
+def _pending(now):
+    """Deliverable events, oldest first, skipping groups that are waiting on a retry."""
+    waiting = OutboxEvent.objects.filter(failed_at__isnull=True, available_at__gt=now).values('group')
+    return OutboxEvent.objects.filter(
+        failed_at__isnull=True, available_at__lte=now
+    ).exclude(group__in=waiting).order_by('id')
+
+
+def dispatch_batch(channel_layer=None, batch_size=DEFAULT_BATCH_SIZE, now=None):
+    """
+    Send one batch of outbox events and return (sent, failed).
+
+    Events go out in id order. When a send fails, the event is rescheduled
+    with exponential backoff and the rest of its group is held back (in this
+    batch and in later ones until the retry is due), so each group is
+    delivered in order. Rows are locked with SKIP LOCKED where the database
+    supports it, so an overlapping dispatcher never sends an event twice;
+    run a single dispatcher to keep the per-group ordering guarantee.
+    """
+    channel_layer = channel_layer or get_channel_layer()
+    now = now or timezone.now()
+    sent = []
+    failed = 0
+    blocked = set()
+
+    with transaction.atomic(using=tenant_db()):
+        events = _pending(now)
+        if connections[events.db].features.has_select_for_update_skip_locked:
+            events = events.select_for_update(skip_locked=True)
+        for event in list(events[:batch_size]):
+            if event.group in blocked:
+                continue
+            try:
+                message = {'type': event.event_type, 'group': event.group, 'event_id': event.id, **event.payload}
+                if events.db != DEFAULT_DB_ALIAS:
+                    # Ids repeat across shards: consumers only take their own.
+                    message['shard'] = events.db
+                async_to_sync(channel_layer.group_send)(event.group, message)
+            except Exception as e:
+                failed += 1
+                blocked.add(event.group)
+                event.attempts += 1
+                event.last_error = str(e)[:1000]
+                if event.attempts >= MAX_ATTEMPTS:
+                    event.failed_at = now
+                else:
+                    event.available_at = now + backoff(event.attempts)
+                event.save(update_fields=['attempts', 'last_error', 'available_at', 'failed_at'])
+            else:
+                sent.append(event.id)
+        if sent:
+            OutboxEvent.objects.filter(pk__in=sent).delete()
+    return len(sent), failed
+
+
+def retry_failed():
+    """Make events that ran out of attempts deliverable again."""
+    return OutboxEvent.objects.filter(failed_at__isnull=False).update(
+        failed_at=None, attempts=0, available_at=timezone.now()
+    )
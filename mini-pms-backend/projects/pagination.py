@@ -0,0 +1,123 @@
+import base64
+import json
+
+from django.utils.dateparse import parse_datetime
+
+
+DEFAULT_PAGE_SIZE = 20
+MAX_PAGE_SIZE = 100
+
+
+class InvalidCursor(ValueError):
+    """Raised when a pagination cursor cannot be decoded."""
+
+
+def clamp_page_size(first, default=DEFAULT_PAGE_SIZE, maximum=MAX_PAGE_SIZE):
+    if first is None:
+        return default
+    return max(1, min(first, maximum))
+
+
+def encode_cursor(*values):
+    """Encode the sort key of the last returned row as an opaque cursor."""
+    payload = [value.isoformat() if hasattr(value, 'isoformat') else value for value in values]
+    return base64.urlsafe_b64encode(json.dumps(payload, separators=(',', ':')).encode()).decode()
+
+
+def decode_cursor(cursor, size):
+    """Decode a cursor produced by encode_cursor into a list of ``size`` values."""
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor.encode()).decode())
+    except (ValueError, TypeError, UnicodeDecodeError):
+        raise InvalidCursor('Invalid cursor.')
+    if not isinstance(values, list) or len(values) != size:
+        raise InvalidCursor('Invalid cursor.')
+    return values
+
+
+def decode_due_cursor(cursor):
+    """Decode a (due_date, id) cursor; due_date is None once past the dated rows."""
+    due_date, pk = decode_cursor(cursor, 2)
+    if not isinstance(pk, int):
+        raise InvalidCursor('Invalid cursor.')
+    if due_date is not None:
+        due_date = parse_datetime(due_date) if isinstance(due_date, str) else None
+        if due_date is None:
+            raise InvalidCursor('Invalid cursor.')
+    return due_date, pk
+
+
+def due_date_page(queryset, first, after=None):
+    """
+    Keyset page over tasks ordered by (due_date, id), undated tasks last.
+
+    The dated rows and the undated rows are read with two separate range
+    scans over an (..., due_date, id) index, so a page never sorts or skips
+    rows: the cursor seeks straight to the next key.
+    Returns (items, next_cursor, has_next_page).
+    """
+    due_date, pk = decode_due_cursor(after) if after else (None, None)
+    past_dated = after is not None and due_date is None
+    items = []
+
+    if not past_dated:
+        dated = queryset.filter(due_date__isnull=False)
+        if after:
+            dated = dated.filter(due_date__gte=due_date).exclude(due_date=due_date, id__lte=pk)
+        items = list(dated.order_by('due_date', 'id')[:first + 1])
+
+    if len(items) <= first:
+        undated = queryset.filter(due_date__isnull=True)
+        if past_dated:
+            undated = undated.filter(id__gt=pk)
+        items += list(undated.order_by('id')[:first + 1 - len(items)])
+
+    has_next_page = len(items) > first
+    items = items[:first]
+    next_cursor = encode_cursor(items[-1].due_date, items[-1].id) if has_next_page else None
+    return items, next_cursor, has_next_page
+
+
+def decode_created_cursor(cursor):
+    """Decode a (created_at, id) cursor."""
+    created_at, pk = decode_cursor(cursor, 2)
+    created_at = parse_datetime(created_at) if isinstance(created_at, str) else None
+    if created_at is None or not isinstance(pk, int):
+        raise InvalidCursor('Invalid cursor.')
+    return created_at, pk
+
+
+def created_at_page(queryset, first, after=None):
+    """
+    Keyset page ordered by (created_at, id), oldest first.
+
+    Used for comment threads: with an index on (task, created_at) each
+    page is a range scan that starts right after the cursor.
+    Returns (items, next_cursor, has_next_page).
+    """
+    if after:
+        created_at, pk = decode_created_cursor(after)
+        queryset = queryset.filter(created_at__gte=created_at).exclude(created_at=created_at, id__lte=pk)
+    items = list(queryset.order_by('created_at', 'id')[:first + 1])
+    has_next_page = len(items) > first
+    items = items[:first]
+    next_cursor = encode_cursor(items[-1].created_at, items[-1].id) if has_next_page else None
+    return items, next_cursor, has_next_page
+
+
+def newest_first_page(queryset, first, after=None):
+    """
+    Keyset page ordered by (created_at, id), newest first.
+
+    Used for board columns: with an index on (project, status, -created_at,
+    -id) each page is a range scan that starts right after the cursor.
+    Returns (items, next_cursor, has_next_page).
+    """
+    if after:
+        created_at, pk = decode_created_cursor(after)
+        queryset = queryset.filter(created_at__lte=created_at).exclude(created_at=created_at, id__gte=pk)
+    items = list(queryset.order_by('-created_at', '-id')[:first + 1])
+    has_next_page = len(items) > first
+    items = items[:first]
+    next_cursor = encode_cursor(items[-1].created_at, items[-1].id) if has_next_page else None
+    return items, next_cursor, has_next_page
@@ -0,0 +1,90 @@
+import time
+
+
+class PresenceTracker:
+    """
+    Who is viewing which project board, for one process.
+
+    Local viewers are counted per (project, user) so several tabs of one
+    user count once. Other processes' viewers arrive as announcements of
+    their full local set per project, kept as one frozenset per process
+    that expires after ``ttl`` seconds unless it is announced again.
+    Nothing is sent per join or leave: ``tick()`` runs at a fixed interval
+    and returns the announcements to broadcast and one diff per changed
+    project for the local subscribers.
+    """
+
+    def __init__(self, origin, ttl=30, clock=time.monotonic):
+        self.origin = origin
+        self.ttl = ttl
+        self.clock = clock
+        self.local = {}
+        self.remote = {}
+        self.published = {}
+        self.announced = {}
+        self.announce_at = {}
+
+    def add(self, project_id, user_id):
+        counts = self.local.setdefault(project_id, {})
+        counts[user_id] = counts.get(user_id, 0) + 1
+
+    def remove(self, project_id, user_id):
+        counts = self.local.get(project_id, {})
+        if counts.get(user_id, 0) > 1:
+            counts[user_id] -= 1
+        else:
+            counts.pop(user_id, None)
+
+    def viewers(self, project_id):
+        """The viewers last published to subscribers of ``project_id``."""
+        return self.published.get(project_id, frozenset())
+
+    def apply(self, origin, project_id, viewers, now=None):
+        """Record another process's announcement of its viewers of ``project_id``."""
+        if origin == self.origin or project_id not in self.local:
+            return
+        now = self.clock() if now is None else now
+        known = self.remote.setdefault(project_id, {})
+        if origin not in known and viewers:
+            # A process we haven't heard from: announce ourselves on the
+            # next tick instead of leaving it to wait for our refresh.
+            self.announce_at[project_id] = now
+        if viewers:
+            known[origin] = (frozenset(viewers), now + self.ttl)
+        else:
+            known.pop(origin, None)
+
+    def tick(self, now=None):
+        """
+        Expire stale entries and batch up everything that changed since the last tick.
+
+        Returns ``(announcements, diffs)``: a list of ``(project_id, viewers)``
+        to send to the other processes, and a dict of ``project_id`` to
+        ``(joined, left, count)`` for projects whose viewers changed.
+        """
+        now = self.clock() if now is None else now
+        announcements, diffs = [], {}
+        for project_id in list(self.local):
+            local = frozenset(self.local[project_id])
+            if local != self.announced.get(project_id) or now >= self.announce_at.get(project_id, 0):
+                announcements.append((project_id, sorted(local)))
+                self.announced[project_id] = local
+                self.announce_at[project_id] = now + self.ttl / 3
+            if not local:
+                # Our last viewer left and the others were told so.
+                for state in (self.local, self.remote, self.published, self.announced, self.announce_at):
+                    state.pop(project_id, None)
+                continue
+
+            current = set(local)
+            remote = self.remote.get(project_id, {})
+            for origin, (viewers, expires_at) in list(remote.items()):
+                if expires_at <= now:
+                    del remote[origin]
+                else:
+                    current |= viewers
+            previous = self.published.get(project_id, frozenset())
+            if current != previous:
+                diffs[project_id] = (sorted(current - previous), sorted(previous - current), len(current))
+                self.published[project_id] = frozenset(current)
+        return announcements, diffs
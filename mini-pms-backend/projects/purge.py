@@ -0,0 +1,162 @@
+import contextvars
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.signals import setting_changed
+from django.db import close_old_connections, router, transaction
+from django.dispatch import receiver
+from django.utils import timezone
+
+from .models import (
+    ArchivedTask, ArchivedTaskComment, Project, ProjectDailyRollup, Task, TaskComment,
+    TaskStatusTransition, User,
+)
+from .sharding import TenantMoving, each_shard, tenant_db, use_shard
+
+
+DEFAULTS = {
+    'BACKGROUND': True,
+    'BATCH_SIZE': 1000,
+}
+
+
+def _config():
+    return {**DEFAULTS, **getattr(settings, 'DELETION_WORKER', {})}
+
+
+def _delete_in_batches(queryset, batch_size):
+    """
+    Delete the rows of ``queryset`` a batch of ids at a time.
+
+    Each batch is one SELECT of ids plus one ``DELETE ... WHERE id IN (...)``
+    in its own short transaction; rows are never loaded as model instances
+    and no cascade collector runs, so callers delete children first.
+    """
+    deleted = 0
+    ids_query = queryset.order_by().values_list('pk', flat=True)
+    while True:
+        ids = list(ids_query[:batch_size])
+        if not ids:
+            return deleted
+        # Routed as a write, so it is refused while the organization moves.
+        db = router.db_for_write(queryset.model)
+        with transaction.atomic(using=db):
+            deleted += queryset.model._base_manager.filter(pk__in=ids)._raw_delete(db)
+
+
+def purge_project(project_id, batch_size=None):
+    """Remove a project marked as deleted together with its tasks, comments, history and archive rows."""
+    batch_size = batch_size or _config()['BATCH_SIZE']
+    if not Project.all_objects.filter(pk=project_id, deleted_at__isnull=False).exists():
+        return 0
+
+    deleted = 0
+    tasks = Task.objects.filter(project_id=project_id).order_by('id')
+    while True:
+        task_ids = list(tasks.values_list('id', flat=True)[:batch_size])
+        if not task_ids:
+            break
+        deleted += _delete_in_batches(TaskComment.objects.filter(task_id__in=task_ids), batch_size)
+        deleted += _delete_in_batches(Task.objects.filter(pk__in=task_ids), batch_size)
+
+    archived_tasks = ArchivedTask.objects.filter(project_id=project_id).order_by('id')
+    while True:
+        task_ids = list(archived_tasks.values_list('id', flat=True)[:batch_size])
+        if not task_ids:
+            break
+        deleted += _delete_in_batches(ArchivedTaskComment.objects.filter(task_id__in=task_ids), batch_size)
+        deleted += _delete_in_batches(ArchivedTask.objects.filter(pk__in=task_ids), batch_size)
+
+    deleted += _delete_in_batches(TaskStatusTransition.objects.filter(project_id=project_id), batch_size)
+    deleted += _delete_in_batches(ProjectDailyRollup.objects.filter(project_id=project_id), batch_size)
+    deleted += _delete_in_batches(Project.all_objects.filter(pk=project_id), batch_size)
+    return deleted
+
+
+def purge_user(user_id):
+    """Remove a user marked as deleted (a handful of auth rows cascade with it)."""
+    with transaction.atomic():
+        return User.objects.filter(pk=user_id, deleted_at__isnull=False).delete()[0]
+
+
+def purge_deleted(batch_size=None):
+    """Purge everything still marked as deleted, e.g. after a worker restart."""
+    totals = {'projects': 0, 'users': 0}
+    for _ in each_shard():
+        for project_id in list(Project.all_objects.filter(deleted_at__isnull=False).values_list('id', flat=True)):
+            try:
+                purge_project(project_id, batch_size)
+            except TenantMoving:
+                # Still marked as deleted; the next run purges it on its new database.
+                continue
+            totals['projects'] += 1
+    for user_id in list(User.objects.filter(deleted_at__isnull=False).values_list('id', flat=True)):
+        purge_user(user_id)
+        totals['users'] += 1
+    return totals
+
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def _get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            # One worker: purges run one after another instead of competing
+            # with requests for locks and I/O.
+            _executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='purge')
+        return _executor
+
+
+@receiver(setting_changed)
+def _reset_on_setting_changed(setting, **kwargs):
+    global _executor
+    if setting == 'DELETION_WORKER':
+        with _executor_lock:
+            executor, _executor = _executor, None
+        if executor is not None:
+            executor.shutdown(wait=True)
+
+
+def _run_in_worker(func, *args):
+    close_old_connections()
+    try:
+        # The request's scope may predate a move that started since.
+        with use_shard(tenant_db()):
+            return func(*args)
+    finally:
+        close_old_connections()
+
+
+def schedule_purge(func, *args, using=None):
+    """
+    Run ``func(*args)`` once the current transaction on ``using`` commits.
+
+    With ``DELETION_WORKER['BACKGROUND']`` it runs on a single background
+    thread, in the tenant scope of the caller; otherwise (e.g. in tests) it
+    runs inline. Rows left behind by a crash are picked up by the
+    purge_deleted command.
+    """
+    context = contextvars.copy_context()
+
+    def submit():
+        if _config()['BACKGROUND']:
+            _get_executor().submit(context.run, _run_in_worker, func, *args)
+        else:
+            func(*args)
+    transaction.on_commit(submit, using=using, robust=True)
+
+
+def delete_project(project):
+    """Mark a project as deleted and queue its removal."""
+    Project.all_objects.filter(pk=project.pk).update(deleted_at=timezone.now())
+    schedule_purge(purge_project, project.pk, using=project._state.db)
+
+
+def delete_user(user):
+    """Deactivate and mark a user as deleted, and queue its removal."""
+    User.objects.filter(pk=user.pk).update(deleted_at=timezone.now(), is_active=False)
+    schedule_purge(purge_user, user.pk)
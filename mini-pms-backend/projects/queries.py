@@ -1,7 +1,29 @@
 import graphene
-from django.db.models import Q
-from .models import Organization, Project, Task, User
-from .types import OrganizationType, ProjectType, TaskType, ProjectStatisticsType, UserType
+from datetime import timedelta
+from django.db.models import Count, Q
+from django.utils import timezone
+from graphql import GraphQLError
+from .archive import archived_projects, archived_tasks, find_project, find_task
+from .board import COLUMNS, board_column, board_columns, board_filters
+from .history import burndown
+from .loaders import prime_archived_tasks, prime_comment_counts, prime_recent_projects, prime_task_counts
+from .models import ArchivedTask, Organization, Project, Task, User
+from .pagination import InvalidCursor, clamp_page_size, due_date_page
+from .sharding import organization_scope, placed_aliases
+from .sync import changes_since
+from .types import OrganizationType, ProjectType, TaskType, TaskPageType, ProjectStatisticsType, UserType
+from .types import BoardColumnType, BoardType, BurndownPointType, SyncType
+
+
+MAX_BURNDOWN_DAYS = 731
+
+
+def organizations_with_project_count():
+    # Counted in SQL rather than by loading every project; the filter
+    # matches Project.objects, which hides projects marked for deletion.
+    return Organization.objects.annotate(
+        project_count=Count('projects', filter=Q(projects__deleted_at__isnull=True)),
+    )
 
 
 class Query(graphene.ObjectType):
@@ -14,9 +36,14 @@ class Query(graphene.ObjectType):
         ProjectType,
         organization_slug=graphene.String(required=True),
         status=graphene.String(),
-        search=graphene.String()
+        search=graphene.String(),
+        include_archived=graphene.Boolean(default_value=False)
+    )
+    project = graphene.Field(
+        ProjectType,
+        id=graphene.ID(required=True),
+        include_archived=graphene.Boolean(default_value=False)
     )
-    project = graphene.Field(ProjectType, id=graphene.ID(required=True))
 
     # Tasks
     tasks = graphene.List(
@@ -24,9 +51,46 @@ class Query(graphene.ObjectType):
         project_id=graphene.ID(required=True),
         status=graphene.String(),
         search=graphene.String(),
+        assignee_email=graphene.String(),
+        include_archived=graphene.Boolean(default_value=False)
+    )
+    task = graphene.Field(
+        TaskType,
+        id=graphene.ID(required=True),
+        include_archived=graphene.Boolean(default_value=False)
+    )
+    my_tasks = graphene.Field(
+        TaskPageType,
+        organization_slug=graphene.String(required=True),
+        email=graphene.String(required=True),
+        first=graphene.Int(),
+        after=graphene.String()
+    )
+
+    # Board
+    board = graphene.Field(
+        BoardType,
+        project_id=graphene.ID(required=True),
+        first=graphene.Int(),
+        search=graphene.String(),
+        assignee_email=graphene.String()
+    )
+    board_column = graphene.Field(
+        BoardColumnType,
+        project_id=graphene.ID(required=True),
+        status=graphene.String(required=True),
+        first=graphene.Int(),
+        after=graphene.String(),
+        search=graphene.String(),
         assignee_email=graphene.String()
     )
-    task = graphene.Field(TaskType, id=graphene.ID(required=True))
+
+    # Delta sync
+    changes_since = graphene.Field(
+        SyncType,
+        organization_slug=graphene.String(required=True),
+        cursor=graphene.String()
+    )
 
     # Statistics
     project_statistics = graphene.Field(
@@ -34,6 +98,13 @@ class Query(graphene.ObjectType):
         organization_slug=graphene.String(required=True)
     )
 
+    burndown = graphene.List(
+        BurndownPointType,
+        project_id=graphene.ID(required=True),
+        start_date=graphene.Date(),
+        end_date=graphene.Date()
+    )
+
     # Users
     me = graphene.Field(UserType, email=graphene.String(required=True))
     org_members = graphene.List(
@@ -42,89 +113,192 @@ class Query(graphene.ObjectType):
     )
 
     def resolve_organizations(self, info):
-        return Organization.objects.prefetch_related('projects').all()
+        # Each database holds the organizations placed on it.
+        aliases = placed_aliases()
+        organizations = []
+        for alias in aliases:
+            organizations += organizations_with_project_count().using(alias)
+        if len(aliases) > 1:
+            organizations.sort(key=lambda organization: organization.name)
+        return prime_recent_projects(info.context, organizations)
 
     def resolve_organization(self, info, slug):
         try:
-            return Organization.objects.prefetch_related('projects').get(slug=slug)
+            with organization_scope(slug):
+                return organizations_with_project_count().get(slug=slug)
         except Organization.DoesNotExist:
             return None
 
-    def resolve_projects(self, info, organization_slug, status=None, search=None):
-        try:
-            org = Organization.objects.get(slug=organization_slug)
-        except Organization.DoesNotExist:
-            return []
+    def resolve_projects(self, info, organization_slug, status=None, search=None, include_archived=False):
+        with organization_scope(organization_slug):
+            try:
+                org = Organization.objects.get(slug=organization_slug)
+            except Organization.DoesNotExist:
+                return []
 
-        queryset = Project.objects.filter(organization=org).select_related('organization').prefetch_related('tasks')
+            filters = Q(organization=org)
 
-        if status:
-            queryset = queryset.filter(status=status)
+            if status:
+                filters &= Q(status=status)
 
-        if search:
-            queryset = queryset.filter(
-                Q(name__icontains=search) | Q(description__icontains=search)
-            )
+            if search:
+                filters &= Q(name__icontains=search) | Q(description__icontains=search)
 
-        return queryset
+            queryset = Project.objects.filter(filters).select_related('organization').prefetch_related('tasks')
+            projects = prime_task_counts(info.context, list(queryset))
+            if include_archived:
+                return projects + prime_archived_tasks(info.context, archived_projects(filters))
+            return projects
 
-    def resolve_project(self, info, id):
+    def resolve_project(self, info, id, include_archived=False):
         try:
             return Project.objects.select_related('organization').prefetch_related('tasks').get(pk=id)
         except Project.DoesNotExist:
-            return None
+            return find_project(id, include_archived=True) if include_archived else None
 
-    def resolve_tasks(self, info, project_id, status=None, search=None, assignee_email=None):
-        queryset = Task.objects.filter(project_id=project_id).select_related('project').prefetch_related('comments')
+    def resolve_tasks(self, info, project_id, status=None, search=None, assignee_email=None, include_archived=False):
+        filters = Q(project_id=project_id)
 
         if status:
-            queryset = queryset.filter(status=status)
+            filters &= Q(status=status)
 
         if search:
-            queryset = queryset.filter(
-                Q(title__icontains=search) | Q(description__icontains=search)
-            )
+            filters &= Q(title__icontains=search) | Q(description__icontains=search)
 
         if assignee_email:
-            queryset = queryset.filter(assignee_email__icontains=assignee_email)
+            filters &= Q(assignee_email__icontains=assignee_email)
 
-        return queryset
+        if not Project.objects.filter(pk=project_id).exists():
+            # Deleted (or fully archived) project: its live tasks are hidden.
+            return prime_comment_counts(info.context, archived_tasks(filters) if include_archived else [])
 
-    def resolve_task(self, info, id):
+        # Comments are not prefetched: the board only shows commentCount,
+        # which is counted for the whole list in one grouped query.
+        tasks = list(Task.objects.filter(filters).select_related('project'))
+        if include_archived:
+            tasks += archived_tasks(filters)
+        return prime_comment_counts(info.context, tasks)
+
+    def resolve_task(self, info, id, include_archived=False):
         try:
-            return Task.objects.select_related('project').prefetch_related('comments').get(pk=id)
+            return Task.objects.select_related('project').get(
+                pk=id, project__deleted_at__isnull=True
+            )
         except Task.DoesNotExist:
+            return find_task(id, include_archived=True) if include_archived else None
+
+    def resolve_my_tasks(self, info, organization_slug, email, first=None, after=None):
+        with organization_scope(organization_slug):
+            try:
+                org = Organization.objects.get(slug=organization_slug)
+            except Organization.DoesNotExist:
+                return TaskPageType(items=[], next_cursor=None, has_next_page=False)
+
+            # assignee_email is stored lower-cased, so an exact match can use the
+            # (assignee_email, due_date, id) index instead of scanning every task.
+            queryset = Task.objects.filter(
+                assignee_email=email.strip().lower(),
+                project__organization=org,
+                project__deleted_at__isnull=True
+            ).select_related('project')
+
+            try:
+                items, next_cursor, has_next_page = due_date_page(queryset, clamp_page_size(first), after)
+            except InvalidCursor as e:
+                raise GraphQLError(str(e))
+            prime_comment_counts(info.context, items)
+            return TaskPageType(items=items, next_cursor=next_cursor, has_next_page=has_next_page)
+
+    def resolve_board(self, info, project_id, first=None, search=None, assignee_email=None):
+        project = Project.objects.filter(pk=project_id).first()
+        if project is None:
             return None
+        columns = board_columns(board_filters(project.pk, search, assignee_email), clamp_page_size(first))
+        tasks = [task for column in columns for task in column['items']]
+        for task in tasks:
+            task.project = project
+        prime_comment_counts(info.context, tasks)
+        return BoardType(project_id=project_id, columns=[BoardColumnType(**column) for column in columns])
 
-    def resolve_project_statistics(self, info, organization_slug):
-        try:
-            org = Organization.objects.get(slug=organization_slug)
-        except Organization.DoesNotExist:
+    def resolve_board_column(self, info, project_id, status, first=None, after=None, search=None, assignee_email=None):
+        if status not in COLUMNS:
+            raise GraphQLError('Invalid status value.')
+        if not Project.objects.filter(pk=project_id).exists():
             return None
+        try:
+            column = board_column(
+                board_filters(project_id, search, assignee_email), status, clamp_page_size(first), after
+            )
+        except InvalidCursor as e:
+            raise GraphQLError(str(e))
+        prime_comment_counts(info.context, column['items'])
+        return BoardColumnType(**column)
+
+    def resolve_changes_since(self, info, organization_slug, cursor=None):
+        with organization_scope(organization_slug):
+            try:
+                org = Organization.objects.get(slug=organization_slug)
+            except Organization.DoesNotExist:
+                return None
 
-        projects = Project.objects.filter(organization=org)
-        tasks = Task.objects.filter(project__organization=org)
+            try:
+                changes = changes_since(org, cursor)
+            except InvalidCursor as e:
+                raise GraphQLError(str(e))
+            prime_comment_counts(info.context, changes['tasks'])
+            prime_task_counts(info.context, changes['projects'])
+            return SyncType(**changes)
 
-        total_tasks = tasks.count()
-        completed_tasks = tasks.filter(status='DONE').count()
+    def resolve_project_statistics(self, info, organization_slug):
+        with organization_scope(organization_slug):
+            try:
+                org = Organization.objects.get(slug=organization_slug)
+            except Organization.DoesNotExist:
+                return None
 
-        return ProjectStatisticsType(
-            total_projects=projects.count(),
-            active_projects=projects.filter(status='ACTIVE').count(),
-            completed_projects=projects.filter(status='COMPLETED').count(),
-            on_hold_projects=projects.filter(status='ON_HOLD').count(),
-            total_tasks=total_tasks,
-            completed_tasks=completed_tasks,
-            overall_completion_rate=round((completed_tasks / total_tasks * 100), 1) if total_tasks > 0 else 0
-        )
+            projects = Project.objects.filter(organization=org)
+            tasks = Task.objects.filter(project__organization=org, project__deleted_at__isnull=True)
+
+            # DONE tasks archived on their own still belong to a live project.
+            archived = ArchivedTask.objects.filter(
+                organization=org, project_id__in=projects.values('id')
+            ).aggregate(total=Count('pk'), done=Count('pk', filter=Q(status='DONE')))
+
+            total_tasks = tasks.count() + archived['total']
+            completed_tasks = tasks.filter(status='DONE').count() + archived['done']
+
+            return ProjectStatisticsType(
+                total_projects=projects.count(),
+                active_projects=projects.filter(status='ACTIVE').count(),
+                completed_projects=projects.filter(status='COMPLETED').count(),
+                on_hold_projects=projects.filter(status='ON_HOLD').count(),
+                total_tasks=total_tasks,
+                completed_tasks=completed_tasks,
+                overall_completion_rate=round((completed_tasks / total_tasks * 100), 1) if total_tasks > 0 else 0
+            )
+
+    def resolve_burndown(self, info, project_id, start_date=None, end_date=None):
+        end_date = end_date or timezone.localdate()
+        start_date = start_date or end_date - timedelta(days=29)
+        if start_date > end_date:
+            raise GraphQLError('Start date must be on or before end date.')
+        if (end_date - start_date).days >= MAX_BURNDOWN_DAYS:
+            raise GraphQLError(f'Date range cannot exceed {MAX_BURNDOWN_DAYS} days.')
+        if not Project.objects.filter(pk=project_id).exists():
+            return []
+        return [BurndownPointType(**point) for point in burndown(project_id, start_date, end_date)]
 
     def resolve_me(self, info, email):
+        # Users stay on 'default' while their organization may live on a
+        # shard, so it is fetched on its own, routed by the user's placement.
         try:
-            return User.objects.select_related('organization').get(email=email.lower())
+            return User.objects.get(email=email.lower(), deleted_at__isnull=True)
         except User.DoesNotExist:
             return None
 
     def resolve_org_members(self, info, organization_id):
-        return User.objects.filter(
-            organization_id=organization_id
-        ).select_related('organization').order_by('name')
+        with organization_scope(organization_id=organization_id):
+            return list(User.objects.filter(
+                organization_id=organization_id,
+                deleted_at__isnull=True
+            ).prefetch_related('organization').order_by('name'))
@@ -0,0 +1,262 @@
+import json
+import os
+from datetime import timedelta
+
+from django.db import connection, transaction
+from django.test import RequestFactory
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from .models import TaskComment
+from .pagination import encode_cursor
+from .schema import schema
+from .synthetic import seed_dataset
+
+
+BUDGET_PATH = os.path.join(os.path.dirname(__file__), 'query_budgets.json')
+
+# Two dataset sizes; an operation whose query count differs between them
+# runs queries per row (N+1).
+SIZES = {
+    'small': {'projects_per_org': 2, 'tasks_per_project': 3, 'comments_per_task': 1, 'members_per_org': 2},
+    'large': {'projects_per_org': 4, 'tasks_per_project': 12, 'comments_per_task': 3, 'members_per_org': 4},
+}
+
+# (name, document, variables(dataset)). Selections follow the frontend's
+# operations; mutations run in a savepoint that is rolled back.
+OPERATIONS = [
+    (
+        'organizations',
+        'query { organizations { id name slug projectCount recentProjects(limit: 3) { id name status } } }',
+        lambda ds: {},
+    ),
+    (
+        'organization',
+        'query($slug: String!) { organization(slug: $slug) { id name slug contactEmail } }',
+        lambda ds: {'slug': ds.organization_slugs[0]},
+    ),
+    (
+        'projects',
+        '''query($slug: String!) {
+            projects(organizationSlug: $slug) {
+                id name description status dueDate taskCount completedTasks completionRate
+            }
+        }''',
+        lambda ds: {'slug': ds.organization_slugs[0]},
+    ),
+    (
+        'project',
+        '''query($id: ID!) {
+            project(id: $id) {
+                id name status taskCount completedTasks completionRate
+                organization { id name slug }
+                tasks { id title status assigneeEmail dueDate }
+            }
+        }''',
+        lambda ds: {'id': ds.project_ids[0]},
+    ),
+    (
+        'project_statistics',
+        '''query($slug: String!) {
+            projectStatistics(organizationSlug: $slug) {
+                totalProjects activeProjects completedProjects totalTasks completedTasks
+            }
+        }''',
+        lambda ds: {'slug': ds.organization_slugs[0]},
+    ),
+    (
+        'tasks',
+        '''query($projectId: ID!) {
+            tasks(projectId: $projectId) {
+                id title description status assigneeEmail dueDate commentCount comments { id content }
+            }
+        }''',
+        lambda ds: {'projectId': ds.project_ids[0]},
+    ),
+    (
+        'board',
+        '''query($projectId: ID!) {
+            board(projectId: $projectId, first: 5) {
+                columns { status count nextCursor hasNextPage items { id title status commentCount } }
+            }
+        }''',
+        lambda ds: {'projectId': ds.project_ids[0]},
+    ),
+    (
+        'board_column',
+        '''query($projectId: ID!) {
+            boardColumn(projectId: $projectId, status: "DONE", first: 5) {
+                count nextCursor hasNextPage items { id title commentCount }
+            }
+        }''',
+        lambda ds: {'projectId': ds.project_ids[0]},
+    ),
+    (
+        'task',
+        '''query($id: ID!) {
+            task(id: $id) {
+                id title description status commentCount
+                commentPage(first: 10) { items { id content authorEmail createdAt } nextCursor hasNextPage }
+            }
+        }''',
+        lambda ds: {'id': ds.task_ids[0]},
+    ),
+    (
+        'my_tasks',
+        '''query($slug: String!, $email: String!) {
+            myTasks(organizationSlug: $slug, email: $email, first: 10) {
+                items { id title status dueDate project { id name } } nextCursor hasNextPage
+            }
+        }''',
+        lambda ds: {'slug': ds.organization_slugs[0], 'email': ds.assignee_emails[0]},
+    ),
+    (
+        'changes_since',
+        '''query($slug: String!, $cursor: String) {
+            changesSince(organizationSlug: $slug, cursor: $cursor) {
+                cursor fullResync
+                projects { id name status }
+                tasks { id title status commentCount }
+                comments { id content }
+                deleted { kind id projectId }
+            }
+        }''',
+        lambda ds: {'slug': ds.organization_slugs[0], 'cursor': encode_cursor(timezone.now() - timedelta(hours=1))},
+    ),
+    (
+        'burndown',
+        'query($projectId: ID!) { burndown(projectId: $projectId) { date remaining completed } }',
+        lambda ds: {'projectId': ds.project_ids[0]},
+    ),
+    (
+        'me',
+        'query($email: String!) { me(email: $email) { id email name role organization { id slug } } }',
+        lambda ds: {'email': ds.assignee_emails[0]},
+    ),
+    (
+        'org_members',
+        'query($organizationId: ID!) { orgMembers(organizationId: $organizationId) { id email name role } }',
+        lambda ds: {'organizationId': ds.organization_ids[0]},
+    ),
+    (
+        'create_project',
+        '''mutation($organizationId: ID!) {
+            createProject(input: {name: "Budget project", organizationId: $organizationId}) {
+                success errors project { id name taskCount }
+            }
+        }''',
+        lambda ds: {'organizationId': ds.organization_ids[0]},
+    ),
+    (
+        'update_project',
+        '''mutation($id: ID!, $organizationId: ID!) {
+            updateProject(id: $id, input: {name: "Renamed", status: "ON_HOLD", organizationId: $organizationId}) {
+                success errors project { id name status }
+            }
+        }''',
+        lambda ds: {'id': ds.project_ids[0], 'organizationId': ds.organization_ids[0]},
+    ),
+    (
+        'delete_project',
+        'mutation($id: ID!) { deleteProject(id: $id) { success errors } }',
+        lambda ds: {'id': ds.project_ids[0]},
+    ),
+    (
+        'create_task',
+        '''mutation($projectId: ID!) {
+            createTask(input: {title: "Budget task", status: "TODO", projectId: $projectId}) {
+                success errors task { id title status }
+            }
+        }''',
+        lambda ds: {'projectId': ds.project_ids[0]},
+    ),
+    (
+        'update_task',
+        '''mutation($id: ID!, $projectId: ID!) {
+            updateTask(id: $id, input: {title: "Moved", status: "IN_PROGRESS", projectId: $projectId}) {
+                success errors task { id title status }
+            }
+        }''',
+        lambda ds: {'id': ds.task_ids[0], 'projectId': ds.project_ids[0]},
+    ),
+    (
+        'delete_task',
+        'mutation($id: ID!) { deleteTask(id: $id) { success errors } }',
+        lambda ds: {'id': ds.task_ids[0]},
+    ),
+    (
+        'add_task_comment',
+        '''mutation($taskId: ID!) {
+            addTaskComment(input: {content: "Budget", authorEmail: "budget@example.com", taskId: $taskId}) {
+                success errors comment { id content }
+            }
+        }''',
+        lambda ds: {'taskId': ds.task_ids[0]},
+    ),
+    (
+        'delete_task_comment',
+        'mutation($id: ID!) { deleteTaskComment(id: $id) { success errors } }',
+        lambda ds: {'id': TaskComment.objects.filter(task_id=ds.task_ids[0]).values_list('id', flat=True).first()},
+    ),
+]
+
+
+def count_queries(document, variables):
+    """Number of SQL statements one execution of ``document`` runs, as over HTTP."""
+    with transaction.atomic(), CaptureQueriesContext(connection) as queries:
+        result = schema.execute(document, variables=variables, context_value=RequestFactory().post('/graphql/'))
+        transaction.set_rollback(True)
+    if result.errors:
+        raise result.errors[0]
+    # Savepoints come from how transactions nest here, not from the operation.
+    return sum(1 for query in queries if not query['sql'].startswith(('SAVEPOINT', 'RELEASE SAVEPOINT', 'ROLLBACK TO SAVEPOINT')))
+
+
+def measure(operations=OPERATIONS, sizes=SIZES):
+    """Query count of every operation at every dataset size: ``{name: {size: count}}``."""
+    counts = {name: {} for name, _, _ in operations}
+    for size, shape in sizes.items():
+        with transaction.atomic():
+            dataset = seed_dataset(organizations=1, prefix=f'budget-{size}', **shape)
+            for name, document, variables in operations:
+                counts[name][size] = count_queries(document, variables(dataset))
+            transaction.set_rollback(True)
+    return counts
+
+
+def load_budgets(path=BUDGET_PATH):
+    if not os.path.exists(path):
+        return {}
+    with open(path, encoding='utf-8') as handle:
+        return json.load(handle)
+
+
+def write_budgets(counts, path=BUDGET_PATH):
+    budgets = {name: max(by_size.values()) for name, by_size in sorted(counts.items())}
+    with open(path, 'w', encoding='utf-8') as handle:
+        json.dump(budgets, handle, indent=2)
+        handle.write('\n')
+    return budgets
+
+
+def check(counts, budgets):
+    """
+    Compare measured counts with the budgets; returns ``(failures, improvements)`` as lists of messages.
+
+    An operation fails when its count differs between dataset sizes, when
+    it exceeds its budget, or when it has no budget yet.
+    """
+    failures, improvements = [], []
+    for name, by_size in counts.items():
+        if len(set(by_size.values())) > 1:
+            detail = ', '.join(f'{count} at {size}' for size, count in by_size.items())
+            failures.append(f'{name}: query count scales with data size ({detail})')
+            continue
+        count = max(by_size.values())
+        if name not in budgets:
+            failures.append(f'{name}: no budget ({count} queries)')
+        elif count > budgets[name]:
+            failures.append(f'{name}: {count} queries, budget is {budgets[name]}')
+        elif count < budgets[name]:
+            improvements.append(f'{name}: {count} queries, budget is {budgets[name]}')
+    return failures, improvements
@@ -0,0 +1,168 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+
+
+DEFAULTS = {
+    'ENABLED': True,
+    'BACKEND': 'memory',
+    'CACHE_ALIAS': 'default',
+    'MAX_KEYS': 10000,
+    'TRUST_X_FORWARDED_FOR': False,
+    'RULES': {},
+}
+
+RATE_LIMIT_MESSAGE = 'Too many attempts. Please try again later.'
+
+
+class TokenBucketLimiter:
+    """
+    In-process token buckets keyed by client identity.
+
+    Each key refills at ``limit / period`` tokens per second up to ``limit``.
+    The key table is an LRU capped at ``max_keys``; a bucket that is evicted
+    was idle the longest, and a fresh bucket is what it would have refilled to
+    anyway once ``period`` has passed.
+    """
+
+    def __init__(self, limit, period, max_keys=10000, clock=time.monotonic):
+        self.limit = float(limit)
+        self.rate = float(limit) / period
+        self.max_keys = max_keys
+        self.clock = clock
+        self._buckets = OrderedDict()
+        self._lock = threading.Lock()
+
+    def allow(self, key):
+        now = self.clock()
+        with self._lock:
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                tokens = self.limit
+                if len(self._buckets) >= self.max_keys:
+                    self._buckets.popitem(last=False)
+            else:
+                tokens = min(self.limit, bucket[0] + (now - bucket[1]) * self.rate)
+                self._buckets.move_to_end(key)
+
+            allowed = tokens >= 1
+            if allowed:
+                tokens -= 1
+            self._buckets[key] = [tokens, now]
+            return allowed
+
+    def __len__(self):
+        return len(self._buckets)
+
+
+class CacheSlidingWindowLimiter:
+    """
+    Sliding-window counters stored in the Django cache, shared by all workers.
+
+    The count is approximated from the current and previous fixed windows,
+    weighting the previous window by how much of it still overlaps.
+    """
+
+    def __init__(self, name, limit, period, cache_alias='default', clock=time.time):
+        self.name = name
+        self.limit = limit
+        self.period = period
+        self.cache = caches[cache_alias]
+        self.clock = clock
+
+    def _key(self, key, window):
+        digest = hashlib.sha1(key.encode()).hexdigest()
+        return f'ratelimit:{self.name}:{digest}:{window}'
+
+    def allow(self, key):
+        now = self.clock()
+        window = int(now // self.period)
+        overlap = 1 - (now - window * self.period) / self.period
+        current_key = self._key(key, window)
+        previous_key = self._key(key, window - 1)
+
+        counts = self.cache.get_many([current_key, previous_key])
+        estimated = counts.get(previous_key, 0) * overlap + counts.get(current_key, 0)
+        if estimated >= self.limit:
+            return False
+
+        timeout = self.period * 2
+        if not self.cache.add(current_key, 1, timeout=timeout):
+            try:
+                self.cache.incr(current_key)
+            except ValueError:
+                self.cache.set(current_key, 1, timeout=timeout)
+        return True
+
+
+_limiters = {}
+_limiters_lock = threading.Lock()
+
+
+def _config():
+    return {**DEFAULTS, **getattr(settings, 'AUTH_RATE_LIMITS', {})}
+
+
+def _get_limiter(action, scope, limit, period, config):
+    name = f'{action}:{scope}'
+    with _limiters_lock:
+        limiter = _limiters.get(name)
+        if limiter is None:
+            if config['BACKEND'] == 'cache':
+                limiter = CacheSlidingWindowLimiter(name, limit, period, config['CACHE_ALIAS'])
+            else:
+                limiter = TokenBucketLimiter(limit, period, max_keys=config['MAX_KEYS'])
+            _limiters[name] = limiter
+        return limiter
+
+
+def reset_limiters():
+    with _limiters_lock:
+        _limiters.clear()
+
+
+@receiver(setting_changed)
+def _reset_on_setting_changed(setting, **kwargs):
+    if setting == 'AUTH_RATE_LIMITS':
+        reset_limiters()
+
+
+def get_client_ip(request, trust_forwarded=False):
+    """Return the client IP, optionally honouring the first X-Forwarded-For hop."""
+    if trust_forwarded:
+        forwarded = request.META.get('HTTP_X_FORWARDED_FOR', '')
+        if forwarded:
+            return forwarded.split(',')[0].strip()
+    return request.META.get('REMOTE_ADDR', '')
+
+
+def allow_attempt(action, request, email=None):
+    """
+    Record an attempt of ``action`` and return False if it should be rejected.
+
+    Rules are configured per action in ``AUTH_RATE_LIMITS['RULES']`` as
+    ``{'ip': (limit, period_seconds), 'email': (limit, period_seconds)}``.
+    Call this before any password hashing so rejected attempts cost nothing.
+    """
+    config = _config()
+    rules = config['RULES'].get(action)
+    if not config['ENABLED'] or not rules:
+        return True
+
+    identities = {
+        'ip': get_client_ip(request, config['TRUST_X_FORWARDED_FOR']) if request is not None else '',
+        'email': (email or '').strip().lower(),
+    }
+    for scope, (limit, period) in rules.items():
+        identity = identities.get(scope)
+        if not identity:
+            continue
+        if not _get_limiter(action, scope, limit, period, config).allow(identity):
+            return False
+    return True
@@ -0,0 +1,244 @@
+import asyncio
+import heapq
+import itertools
+from datetime import datetime, time, timedelta
+
+from asgiref.sync import sync_to_async
+from channels.layers import get_channel_layer
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from .models import Project, Task
+from .outbox import enqueue
+
+
+SCHEDULER_GROUP = 'due_reminders'
+DUE_SOON = 'due_soon'
+OVERDUE = 'overdue'
+
+
+def project_deadline(due_date):
+    """Projects are due at the end of their due date, in the current time zone."""
+    return timezone.make_aware(datetime.combine(due_date + timedelta(days=1), time.min))
+
+
+def _task_group(project_id):
+    return f'project_{project_id}_tasks'
+
+
+def _project_group(slug):
+    return f'org_{slug}_projects'
+
+
+class ReminderScheduler:
+    """
+    Fires due-soon and overdue events from an in-memory timer heap.
+
+    Only deadlines inside ``[now, horizon)`` are loaded, using the due_date
+    indexes, and the window is extended by another slice once half of it has
+    elapsed, so memory and work follow the number of deadlines in the
+    lookahead window rather than the size of the tables.
+
+    Events are queued in the outbox as ``task.reminder`` or
+    ``project.reminder`` for the task's project group or the project's
+    organization group, which the taskReminder and projectReminder
+    subscriptions listen to.
+
+    Changes made by mutations arrive as channel-layer messages (see
+    ``deadline_changed``). Superseded heap entries are not removed; each key
+    maps to its current deadline and entries that disagree are dropped when
+    popped. The task or project is checked again before an event is sent.
+    Keys whose overdue event has fired keep that deadline in ``_fired``, so
+    an edit that leaves the deadline alone does not report it again; they
+    are forgotten once the deadline is a lookahead in the past, and changes
+    to deadlines that old are ignored.
+    """
+
+    def __init__(self, lookahead=timedelta(hours=6), due_soon=timedelta(hours=1),
+                 clock=timezone.now, channel_layer=None, max_sleep=60):
+        if due_soon > lookahead / 2:
+            raise ValueError('due_soon must be at most half of lookahead.')
+        self.lookahead = lookahead
+        self.due_soon = due_soon
+        self.clock = clock
+        self.channel_layer = channel_layer or get_channel_layer()
+        self.max_sleep = max_sleep
+        self.horizon = None
+        self._heap = []
+        self._deadlines = {}
+        self._fired = {}
+        self._counter = itertools.count()
+        self._wakeup = None
+        self._stopped = False
+
+    def __len__(self):
+        return len(self._heap)
+
+    # Heap maintenance
+
+    def schedule(self, key, group, deadline, now):
+        """Track ``key`` (('task'|'project', id)) as due at ``deadline``."""
+        self._deadlines[key] = deadline
+        if deadline > now:
+            soon_at = max(deadline - self.due_soon, now)
+            heapq.heappush(self._heap, (soon_at, next(self._counter), DUE_SOON, key, group, deadline))
+        heapq.heappush(self._heap, (deadline, next(self._counter), OVERDUE, key, group, deadline))
+        self._wake()
+
+    def unschedule(self, key):
+        self._deadlines.pop(key, None)
+
+    def apply_change(self, message):
+        """Apply a ``reminder.changed`` message from deadline_changed()."""
+        key = (message['kind'], message['id'])
+        deadline = parse_datetime(message['deadline']) if message.get('deadline') else None
+        if (deadline is None or self.horizon is None or deadline >= self.horizon
+                or deadline < self.clock() - self.lookahead):
+            # Deadlines beyond the window are picked up by a later refill.
+            self.unschedule(key)
+            self._fired.pop(key, None)
+        elif self._fired.get(key) == deadline:
+            return
+        elif self._deadlines.get(key) != deadline:
+            self._fired.pop(key, None)
+            self.schedule(key, message['group'], deadline, self.clock())
+
+    def _wake(self):
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    # Loading
+
+    def load_window(self, start, end):
+        """Return (key, group, deadline) for open tasks and projects due in [start, end)."""
+        entries = []
+        tasks = Task.objects.filter(
+            due_date__gte=start, due_date__lt=end
+        ).exclude(status='DONE').values_list('id', 'project_id', 'due_date')
+        for task_id, project_id, due_date in tasks:
+            entries.append((('task', task_id), _task_group(project_id), due_date))
+
+        projects = Project.objects.filter(
+            due_date__gte=timezone.localdate(start) - timedelta(days=1),
+            due_date__lte=timezone.localdate(end),
+        ).exclude(status='COMPLETED').values_list('id', 'organization__slug', 'due_date')
+        for project_id, slug, due_date in projects:
+            deadline = project_deadline(due_date)
+            if start <= deadline < end:
+                entries.append((('project', project_id), _project_group(slug), deadline))
+        return entries
+
+    async def refill(self, now):
+        start = self.horizon or now
+        end = now + self.lookahead
+        if end <= start:
+            return
+        for key, group, deadline in await sync_to_async(self.load_window)(start, end):
+            self.schedule(key, group, deadline, now)
+        self.horizon = end
+        forget_before = now - self.lookahead
+        self._fired = {key: deadline for key, deadline in self._fired.items() if deadline >= forget_before}
+
+    def refill_at(self):
+        return self.horizon - self.lookahead / 2
+
+    # Firing
+
+    def is_still_due(self, key, deadline):
+        kind, pk = key
+        if kind == 'task':
+            return Task.objects.filter(pk=pk, due_date=deadline).exclude(status='DONE').exists()
+        return Project.objects.filter(
+            pk=pk, due_date=timezone.localdate(deadline) - timedelta(days=1)
+        ).exclude(status='COMPLETED').exists()
+
+    async def fire(self, event, key, group, deadline):
+        await sync_to_async(enqueue)(group, f'{key[0]}.reminder', {
+            f'{key[0]}_id': key[1],
+            'reminder': event,
+            'due_date': deadline.isoformat(),
+        })
+
+    async def step(self):
+        """Refill the window if needed and fire every event that is due. Returns the fired events."""
+        now = self.clock()
+        if self.horizon is None or now >= self.refill_at():
+            await self.refill(now)
+
+        fired = []
+        while self._heap and self._heap[0][0] <= now:
+            _, _, event, key, group, deadline = heapq.heappop(self._heap)
+            if self._deadlines.get(key) != deadline:
+                continue
+            if event == OVERDUE:
+                self.unschedule(key)
+            if not await sync_to_async(self.is_still_due)(key, deadline):
+                self.unschedule(key)
+                self._fired.pop(key, None)
+                continue
+            await self.fire(event, key, group, deadline)
+            if event == OVERDUE:
+                self._fired[key] = deadline
+            fired.append((event, key))
+        return fired
+
+    def seconds_until_next(self):
+        now = self.clock()
+        wake_at = self.refill_at()
+        if self._heap:
+            wake_at = min(wake_at, self._heap[0][0])
+        return max(0.0, min((wake_at - now).total_seconds(), self.max_sleep))
+
+    async def listen(self):
+        """Apply deadline changes published by mutations in any process."""
+        channel = await self.channel_layer.new_channel()
+        await self.channel_layer.group_add(SCHEDULER_GROUP, channel)
+        try:
+            while not self._stopped:
+                message = await self.channel_layer.receive(channel)
+                if message.get('type') == 'reminder.changed':
+                    self.apply_change(message)
+        finally:
+            await self.channel_layer.group_discard(SCHEDULER_GROUP, channel)
+
+    async def run(self):
+        self._wakeup = asyncio.Event()
+        listener = asyncio.ensure_future(self.listen())
+        try:
+            while not self._stopped:
+                await self.step()
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), self.seconds_until_next())
+                except asyncio.TimeoutError:
+                    pass
+        finally:
+            listener.cancel()
+
+    def stop(self):
+        self._stopped = True
+        self._wake()
+
+
+def deadline_changed(instance, deleted=False):
+    """
+    Tell running schedulers that a task or project deadline may have changed.
+
+    The message goes through the outbox, so it is only delivered if the
+    surrounding transaction commits and never delays the mutation.
+    """
+    if isinstance(instance, Task):
+        kind, group = 'task', _task_group(instance.project_id)
+        deadline = instance.due_date if instance.status != 'DONE' else None
+    else:
+        kind, group = 'project', _project_group(instance.organization.slug)
+        deadline = (
+            project_deadline(instance.due_date)
+            if instance.due_date and instance.status != 'COMPLETED' else None
+        )
+    enqueue(SCHEDULER_GROUP, 'reminder.changed', {
+        'kind': kind,
+        'id': instance.pk,
+        'group': group,
+        'deadline': None if deleted or deadline is None else deadline.isoformat(),
+    })
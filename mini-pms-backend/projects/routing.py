@@ -1,5 +1,7 @@
 from django.urls import path
 
+from .consumers import GraphQLSubscriptionConsumer
+
 websocket_urlpatterns = [
-    # WebSocket routes will be added here for subscriptions
+    path('graphql/', GraphQLSubscriptionConsumer.as_asgi()),
 ]
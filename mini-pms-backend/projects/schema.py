@@ -1,4 +1,6 @@
 import graphene
+from graphql import specified_directives
+from .incremental import DeferDirective, StreamDirective
 from .queries import Query
 from .mutations import Mutation
 from .subscriptions import Subscription
@@ -6,5 +8,6 @@ from .subscriptions import Subscription
 schema = graphene.Schema(
     query=Query,
     mutation=Mutation,
-    subscription=Subscription
+    subscription=Subscription,
+    directives=[*specified_directives, DeferDirective, StreamDirective],
 )
@@ -0,0 +1,332 @@
+import asyncio
+import errno
+import json
+import os
+import random
+import resource
+import select
+import signal
+import socket
+import time
+
+from django.db import connections
+
+
+DEFAULTS = {
+    'HOST': '0.0.0.0',
+    'PORT': 8000,
+    'WORKERS': os.cpu_count() or 1,
+    'MAX_REQUESTS': 10000,
+    'MAX_REQUESTS_JITTER': 1000,
+    'MAX_RSS_MB': 512,
+    'GRACEFUL_TIMEOUT': 30,
+    'STATS_INTERVAL': 10,
+    'BACKLOG': 2048,
+}
+
+
+def current_rss_mb():
+    """Resident set size of this process in MB (peak RSS where /proc is unavailable)."""
+    try:
+        with open('/proc/self/statm') as handle:
+            pages = int(handle.read().split()[1])
+        return pages * os.sysconf('SC_PAGE_SIZE') / (1024 * 1024)
+    except (OSError, ValueError, IndexError):
+        # ru_maxrss is in KB on Linux and bytes on macOS.
+        maxrss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return maxrss / (1024 * 1024) if os.uname().sysname == 'Darwin' else maxrss / 1024
+
+
+def recycle_limit(max_requests, jitter):
+    """Per-worker request limit, jittered so that workers don't all restart at once."""
+    if not max_requests:
+        return None
+    return max_requests + random.randint(0, jitter) if jitter else max_requests
+
+
+def run_worker(application, sock, stats_fd, max_requests=None, max_rss_mb=None,
+               graceful_timeout=30, stats_interval=10):
+    """
+    Serve ``application`` on the inherited socket until the worker is recycled or stopped.
+
+    Runs in a forked child. uvicorn stops the worker after ``max_requests``;
+    a monitor task reports the load to the parent every ``stats_interval``
+    seconds and asks uvicorn to exit once RSS goes above ``max_rss_mb``.
+    On exit uvicorn stops accepting, closes WebSockets with 1012 (service
+    restart) so clients reconnect to another worker, and waits up to
+    ``graceful_timeout`` seconds for in-flight requests.
+    """
+    import uvicorn
+
+    config = uvicorn.Config(
+        application,
+        lifespan='off',
+        limit_max_requests=max_requests,
+        timeout_graceful_shutdown=graceful_timeout,
+        log_level='warning',
+    )
+    server = uvicorn.Server(config)
+    reason = ['stopped']
+
+    def report(**extra):
+        state = server.server_state
+        stats = {
+            'requests': state.total_requests,
+            'connections': len(state.connections),
+            'rss_mb': round(current_rss_mb(), 1),
+            **extra,
+        }
+        try:
+            os.write(stats_fd, (json.dumps(stats) + '\n').encode())
+        except OSError:
+            pass
+
+    async def monitor():
+        while not server.should_exit:
+            await asyncio.sleep(stats_interval)
+            report()
+            if max_rss_mb and current_rss_mb() > max_rss_mb:
+                reason[0] = 'rss'
+                server.should_exit = True
+
+    async def main():
+        task = asyncio.ensure_future(monitor())
+        try:
+            await server.serve(sockets=[sock])
+        finally:
+            task.cancel()
+        if max_requests and server.server_state.total_requests >= max_requests:
+            reason[0] = 'requests'
+        report(exiting=reason[0])
+
+    asyncio.run(main())
+
+
+class Worker:
+    def __init__(self, index, pid, stats_fd):
+        self.index = index
+        self.pid = pid
+        self.stats_fd = stats_fd
+        self.started_at = time.monotonic()
+        self.buffer = b''
+        self.stats = {'requests': 0, 'connections': 0, 'rss_mb': 0.0}
+        self.reported_requests = 0
+        self.exit_code = None
+
+
+class PreforkServer:
+    """
+    Pre-forking ASGI server.
+
+    The parent imports the application (and, through config.asgi, builds the
+    GraphQL schema), binds the listening socket and forks ``workers``
+    children that share its memory copy-on-write and accept on the same
+    socket. Children that exit, e.g. when recycled, are replaced. SIGTERM or
+    SIGINT drains and stops every worker; SIGHUP recycles them one at a time.
+    """
+
+    def __init__(self, application, host=DEFAULTS['HOST'], port=DEFAULTS['PORT'], workers=DEFAULTS['WORKERS'],
+                 max_requests=DEFAULTS['MAX_REQUESTS'], max_requests_jitter=DEFAULTS['MAX_REQUESTS_JITTER'],
+                 max_rss_mb=DEFAULTS['MAX_RSS_MB'], graceful_timeout=DEFAULTS['GRACEFUL_TIMEOUT'],
+                 stats_interval=DEFAULTS['STATS_INTERVAL'], backlog=DEFAULTS['BACKLOG'], log=print):
+        self.application = application
+        self.host = host
+        self.port = port
+        self.worker_count = workers
+        self.max_requests = max_requests
+        self.max_requests_jitter = max_requests_jitter
+        self.max_rss_mb = max_rss_mb
+        self.graceful_timeout = graceful_timeout
+        self.stats_interval = stats_interval
+        self.backlog = backlog
+        self.log = log
+        self.workers = {}
+        self.sock = None
+        self._stopping = False
+        self._rolling = []
+        self._wakeup_r, self._wakeup_w = None, None
+
+    # Parent
+
+    def bind(self):
+        sock = socket.socket(socket.AF_INET6 if ':' in self.host else socket.AF_INET, socket.SOCK_STREAM)
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        sock.bind((self.host, self.port))
+        sock.listen(self.backlog)
+        sock.setblocking(False)
+        sock.set_inheritable(True)
+        self.sock = sock
+        return sock
+
+    def spawn(self, index):
+        stats_r, stats_w = os.pipe()
+        pid = os.fork()
+        if pid == 0:
+            os.close(stats_r)
+            self._run_child(stats_w)
+        os.close(stats_w)
+        os.set_blocking(stats_r, False)
+        self.workers[pid] = Worker(index, pid, stats_r)
+        return pid
+
+    def _run_child(self, stats_fd):
+        code = 0
+        try:
+            for signum in (signal.SIGTERM, signal.SIGINT, signal.SIGHUP, signal.SIGCHLD):
+                signal.signal(signum, signal.SIG_DFL)
+            os.close(self._wakeup_r)
+            os.close(self._wakeup_w)
+            for worker in self.workers.values():
+                os.close(worker.stats_fd)
+            run_worker(
+                self.application, self.sock, stats_fd,
+                max_requests=recycle_limit(self.max_requests, self.max_requests_jitter),
+                max_rss_mb=self.max_rss_mb,
+                graceful_timeout=self.graceful_timeout,
+                stats_interval=self.stats_interval,
+            )
+        except BaseException:
+            import traceback
+            traceback.print_exc()
+            code = 1
+        finally:
+            os._exit(code)
+
+    def _on_signal(self, signum, frame):
+        if signum in (signal.SIGTERM, signal.SIGINT):
+            self._stopping = True
+        elif signum == signal.SIGHUP and not self._rolling:
+            self._rolling = sorted(self.workers)
+            self._recycle_next()
+        try:
+            os.write(self._wakeup_w, b'.')
+        except OSError:
+            pass
+
+    def _recycle_next(self):
+        while self._rolling:
+            pid = self._rolling.pop(0)
+            if pid in self.workers:
+                self._kill(pid, signal.SIGTERM)
+                return
+
+    def _kill(self, pid, signum):
+        try:
+            os.kill(pid, signum)
+        except ProcessLookupError:
+            pass
+
+    def read_stats(self, worker):
+        """Read the stats lines a worker wrote since the last call."""
+        try:
+            while True:
+                chunk = os.read(worker.stats_fd, 4096)
+                if not chunk:
+                    break
+                worker.buffer += chunk
+        except BlockingIOError:
+            pass
+        *lines, worker.buffer = worker.buffer.split(b'\n')
+        for line in lines:
+            try:
+                worker.stats.update(json.loads(line))
+            except ValueError:
+                continue
+
+    def reap(self):
+        """Collect exited workers; returns the Worker objects that exited."""
+        exited = []
+        while True:
+            try:
+                pid, status = os.waitpid(-1, os.WNOHANG)
+            except ChildProcessError:
+                break
+            if pid == 0:
+                break
+            worker = self.workers.pop(pid, None)
+            if worker is None:
+                continue
+            self.read_stats(worker)
+            os.close(worker.stats_fd)
+            worker.exit_code = os.waitstatus_to_exitcode(status)
+            exited.append(worker)
+        return exited
+
+    def load_report(self):
+        """One line per worker: requests since the last report, total requests, open connections, RSS."""
+        lines = []
+        for worker in sorted(self.workers.values(), key=lambda w: w.index):
+            requests = worker.stats['requests']
+            lines.append(
+                f"worker {worker.index} (pid {worker.pid}): +{requests - worker.reported_requests} requests "
+                f"({requests} total), {worker.stats['connections']} connections, {worker.stats['rss_mb']} MB"
+            )
+            worker.reported_requests = requests
+        return lines
+
+    def run(self):
+        connections.close_all()
+        if self.sock is None:
+            self.bind()
+        self._wakeup_r, self._wakeup_w = os.pipe()
+        os.set_blocking(self._wakeup_r, False)
+        os.set_blocking(self._wakeup_w, False)
+        for signum in (signal.SIGTERM, signal.SIGINT, signal.SIGHUP, signal.SIGCHLD):
+            signal.signal(signum, self._on_signal)
+
+        host, port = self.sock.getsockname()[:2]
+        self.log(f'Listening on {host}:{port} with {self.worker_count} workers (parent pid {os.getpid()})')
+        for index in range(self.worker_count):
+            self.spawn(index)
+
+        next_report = time.monotonic() + self.stats_interval
+        while not self._stopping:
+            self._wait(next_report)
+            for worker in list(self.workers.values()):
+                self.read_stats(worker)
+            for worker in self.reap():
+                reason = worker.stats.get('exiting') or f'exit code {worker.exit_code}'
+                self.log(f"worker {worker.index} (pid {worker.pid}) exited ({reason}) "
+                         f"after {worker.stats['requests']} requests")
+                if not self._stopping:
+                    if worker.exit_code and time.monotonic() - worker.started_at < 1:
+                        # Crashing on boot: don't spin.
+                        time.sleep(1)
+                    self.spawn(worker.index)
+                    self._recycle_next()
+            if time.monotonic() >= next_report:
+                for line in self.load_report():
+                    self.log(line)
+                next_report = time.monotonic() + self.stats_interval
+        self.stop()
+
+    def _wait(self, until):
+        fds = [self._wakeup_r] + [worker.stats_fd for worker in self.workers.values()]
+        try:
+            readable, _, _ = select.select(fds, [], [], max(0.0, until - time.monotonic()))
+        except (InterruptedError, OSError) as e:
+            if getattr(e, 'errno', errno.EINTR) != errno.EINTR:
+                raise
+            return
+        if self._wakeup_r in readable:
+            try:
+                while os.read(self._wakeup_r, 512):
+                    pass
+            except BlockingIOError:
+                pass
+
+    def stop(self):
+        """Drain every worker, killing those still running after the graceful timeout."""
+        self.log('Stopping workers...')
+        for pid in list(self.workers):
+            self._kill(pid, signal.SIGTERM)
+        deadline = time.monotonic() + self.graceful_timeout + 5
+        while self.workers and time.monotonic() < deadline:
+            self.reap()
+            time.sleep(0.1)
+        for pid in list(self.workers):
+            self._kill(pid, signal.SIGKILL)
+        while self.workers:
+            if not self.reap():
+                time.sleep(0.05)
+        self.sock.close()
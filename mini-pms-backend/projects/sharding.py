@@ -0,0 +1,412 @@
+import contextvars
+import time
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections, models, transaction
+from django.utils import timezone
+
+from .models import (
+    ArchivedProject, ArchivedTask, ArchivedTaskComment, Organization, OutboxEvent, Project,
+    ProjectDailyRollup, Task, TaskComment, TaskStatusTransition, TenantPlacement, Tombstone,
+)
+
+
+# Models that live on the organization's database. Users and everything
+# outside this app stay on 'default'.
+TENANT_MODELS = {
+    model._meta.model_name for model in (
+        Organization, Project, Task, TaskComment, TaskStatusTransition, ProjectDailyRollup,
+        ArchivedProject, ArchivedTask, ArchivedTaskComment, Tombstone, OutboxEvent,
+    )
+}
+
+MOVING_MESSAGE = 'This organization is being moved; please try again in a few seconds.'
+
+_scope = contextvars.ContextVar('tenant_scope', default=None)
+
+
+class TenantMoving(Exception):
+    """Raised on writes to an organization while move_tenant switches its database."""
+
+
+def _moving_from(alias):
+    """Whether move_tenant is switching an organization off ``alias`` (no query without shards)."""
+    return bool(shard_aliases()) and TenantPlacement.objects.filter(alias=alias, read_only=True).exists()
+
+
+def shard_aliases():
+    return list(getattr(settings, 'DB_SHARDS', []))
+
+
+def all_aliases():
+    return [DEFAULT_DB_ALIAS, *shard_aliases()]
+
+
+def placed_aliases():
+    """'default' plus every database the directory places an organization on (no query without shards)."""
+    if not shard_aliases():
+        return [DEFAULT_DB_ALIAS]
+    placed = set(TenantPlacement.objects.values_list('alias', flat=True))
+    return [DEFAULT_DB_ALIAS, *sorted(placed - {DEFAULT_DB_ALIAS})]
+
+
+def tenant_db():
+    """The database of the current organization scope; pass to transaction.atomic(using=...)."""
+    scope = _scope.get()
+    return scope[0] if scope else DEFAULT_DB_ALIAS
+
+
+@contextmanager
+def use_shard(alias, read_only=False, check_moves=True):
+    """
+    Send tenant queries made inside the block to ``alias``.
+
+    With ``check_moves`` every write to a table move_tenant copies first
+    checks the directory, and fails with TenantMoving while an organization
+    is being moved off ``alias``: workers span all of a database's
+    organizations, so the drain that covers requests can't cover them.
+    """
+    token = _scope.set((alias, read_only, check_moves))
+    try:
+        yield alias
+    finally:
+        _scope.reset(token)
+
+
+def placement(slug=None, organization_id=None):
+    """The organization's TenantPlacement, or None if it lives on 'default' (no query without shards)."""
+    if not shard_aliases():
+        return None
+    lookup = {'slug': slug} if slug is not None else {'organization_id': organization_id}
+    return TenantPlacement.objects.filter(**lookup).first()
+
+
+@contextmanager
+def organization_scope(slug=None, organization_id=None):
+    """Run the block against the database of the organization ``slug`` (or ``organization_id``)."""
+    found = placement(slug=slug, organization_id=organization_id)
+    # The placement was just read, so writes need no check of their own.
+    alias = found.alias if found else DEFAULT_DB_ALIAS
+    with use_shard(alias, read_only=bool(found and found.read_only), check_moves=False):
+        yield
+
+
+def each_shard():
+    """
+    Run the body of a for loop once per database, scoped to it; for workers that poll every shard.
+
+    A database an organization is being moved off is skipped until the
+    move is done; a move that starts mid-run makes the worker's next write
+    fail with TenantMoving (see use_shard).
+    """
+    for alias in all_aliases():
+        if _moving_from(alias):
+            continue
+        with use_shard(alias):
+            yield alias
+
+
+def bind_scope(iterator):
+    """
+    Iterate ``iterator`` in the scope active now.
+
+    For streamed responses, whose body is produced after the middleware
+    that set the scope has returned.
+    """
+    context = contextvars.copy_context()
+    while True:
+        try:
+            item = context.run(next, iterator)
+        except StopIteration:
+            return
+        yield item
+
+
+def slug_taken(slug, exclude_id=None):
+    """Whether another organization, on any database, already uses ``slug``."""
+    if Organization.objects.using(DEFAULT_DB_ALIAS).filter(slug=slug).exclude(pk=exclude_id).exists():
+        return True
+    return TenantPlacement.objects.filter(slug=slug).exclude(organization_id=exclude_id).exists()
+
+
+def sync_placement_slug(organization):
+    """Keep the directory's slug in step after an organization is renamed."""
+    if shard_aliases():
+        TenantPlacement.objects.filter(organization_id=organization.pk).update(slug=organization.slug)
+
+
+class TenantRouter:
+    """
+    Sends an organization's rows to its database.
+
+    The database comes from the instance a query starts from (its own
+    database, or the placement of its ``organization_id`` for a user), then
+    from the scope set by OrganizationMiddleware or use_shard(), and is
+    'default' otherwise. New organizations are always created on 'default'
+    so organization ids stay unique across databases; move_tenant places
+    them afterwards. Shards hold the tenant tables only.
+    """
+
+    def db_for_read(self, model, **hints):
+        return self._route(model, hints, write=False)
+
+    def db_for_write(self, model, **hints):
+        return self._route(model, hints, write=True)
+
+    def _route(self, model, hints, write):
+        if model._meta.app_label != 'projects':
+            return None
+        if model is TenantPlacement:
+            return DEFAULT_DB_ALIAS
+        if model._meta.model_name not in TENANT_MODELS:
+            return None
+        scope = _scope.get()
+        if write and scope and (scope[1] or (
+            scope[2] and model._meta.model_name in MOVED_MODELS and _moving_from(scope[0])
+        )):
+            raise TenantMoving(MOVING_MESSAGE)
+        instance = hints.get('instance')
+        if instance is not None:
+            if type(instance)._meta.model_name in TENANT_MODELS:
+                if model is Organization and instance._state.adding and not instance._state.db:
+                    return DEFAULT_DB_ALIAS
+                if instance._state.db:
+                    return instance._state.db
+            elif getattr(instance, 'organization_id', None) is not None and shard_aliases():
+                found = placement(organization_id=instance.organization_id)
+                return found.alias if found else DEFAULT_DB_ALIAS
+        return scope[0] if scope else None
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Users on 'default' point at organizations on any database.
+        names = {obj1._meta.model_name, obj2._meta.model_name}
+        if names & TENANT_MODELS and not names <= TENANT_MODELS:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        if db not in shard_aliases():
+            return None
+        return app_label == 'projects' and (model_name is None or model_name in TENANT_MODELS)
+
+
+# Id ranges
+
+# move_tenant keeps ids, so every database hands out its own range: 'default'
+# from 1, the n-th alias of DB_SHARDS from n * SHARD_ID_RANGE + 1. New shards
+# are appended to DB_SHARDS; reordering it would give a shard another range.
+SHARD_ID_RANGE = 10 ** 12
+
+
+def id_range_start(alias):
+    if alias == DEFAULT_DB_ALIAS:
+        return 0
+    return (shard_aliases().index(alias) + 1) * SHARD_ID_RANGE
+
+
+def _sequenced_models():
+    return [
+        model for model in Organization._meta.app_config.get_models()
+        if model._meta.model_name in TENANT_MODELS and isinstance(model._meta.pk, models.AutoField)
+    ]
+
+
+def reserve_id_range(alias):
+    """
+    Point the id sequences of the tenant tables on ``alias`` past the last id of its range.
+
+    Run after each migrate of a shard, and by move_tenant after copying
+    rows: SQLite moves a table's sequence up to any id inserted, including
+    ids from another database's range. PostgreSQL sequences are never moved
+    back, so concurrent inserts can't be handed an id twice.
+    """
+    start = id_range_start(alias)
+    connection = connections[alias]
+    quote = connection.ops.quote_name
+    with connection.cursor() as cursor:
+        for model in _sequenced_models():
+            table, column = model._meta.db_table, model._meta.pk.column
+            cursor.execute(
+                f'SELECT MAX({quote(column)}) FROM {quote(table)} WHERE {quote(column)} > %s AND {quote(column)} <= %s',
+                [start, start + SHARD_ID_RANGE],
+            )
+            last = cursor.fetchone()[0] or start
+            if connection.vendor == 'postgresql':
+                cursor.execute(
+                    'SELECT setval(seq, GREATEST(%s, COALESCE(pg_sequence_last_value(seq) + 1, 1)), false) '
+                    'FROM (SELECT pg_get_serial_sequence(%s, %s)::regclass AS seq) AS sequence',
+                    [last + 1, table, column],
+                )
+            elif connection.vendor == 'sqlite':
+                cursor.execute('UPDATE sqlite_sequence SET seq = %s WHERE name = %s', [last, table])
+                if not cursor.rowcount:
+                    cursor.execute('INSERT INTO sqlite_sequence (name, seq) VALUES (%s, %s)', [table, last])
+
+
+def reserve_id_range_after_migrate(using=DEFAULT_DB_ALIAS, **kwargs):
+    """post_migrate receiver: give a shard its id range as soon as its tables exist."""
+    if using in shard_aliases():
+        reserve_id_range(using)
+
+
+# Moving an organization
+
+def _organization_rows(model, alias, organization_id):
+    manager = model._base_manager.using(alias)
+    if model is Organization:
+        return manager.filter(pk=organization_id)
+    if model is ArchivedTaskComment:
+        task_ids = ArchivedTask._base_manager.using(alias).filter(organization_id=organization_id).values('pk')
+        return manager.filter(task_id__in=task_ids)
+    if model is TaskComment:
+        return manager.filter(task__project__organization_id=organization_id)
+    if model in (Task, TaskStatusTransition, ProjectDailyRollup):
+        return manager.filter(project__organization_id=organization_id)
+    return manager.filter(organization_id=organization_id)
+
+
+# Parents first. How the final catch-up finds rows changed during the copy:
+# 'updated' by their auto_now updated_at, 'all' re-copies every row (projects
+# are soft-deleted with .update(), rollups have no timestamp), 'new' only
+# adds and removes rows (they are never edited). Outbox events stay behind:
+# the old database's dispatcher still sends them.
+MOVE_PLAN = [
+    (Organization, 'updated'),
+    (Project, 'all'),
+    (Task, 'updated'),
+    (TaskComment, 'updated'),
+    (TaskStatusTransition, 'new'),
+    (ProjectDailyRollup, 'all'),
+    (ArchivedProject, 'new'),
+    (ArchivedTask, 'new'),
+    (ArchivedTaskComment, 'new'),
+    (Tombstone, 'new'),
+]
+MOVED_MODELS = {model._meta.model_name for model, _ in MOVE_PLAN}
+
+
+def _copy(model, source, target, pks, batch_size):
+    """Insert the rows ``pks`` of ``model`` from ``source`` into ``target`` as they are."""
+    fields = model._meta.local_concrete_fields
+    pks = sorted(pks)
+    for start in range(0, len(pks), batch_size):
+        rows = list(model._base_manager.using(source).filter(pk__in=pks[start:start + batch_size]).order_by())
+        # raw=True keeps auto_now/auto_now_add values instead of stamping now.
+        model._base_manager.using(target)._insert(rows, fields=fields, using=target, raw=True)
+    return len(pks)
+
+
+def _delete(model, alias, pks, batch_size):
+    pks = sorted(pks)
+    for start in range(0, len(pks), batch_size):
+        model._base_manager.using(alias).filter(pk__in=pks[start:start + batch_size])._raw_delete(alias)
+
+
+def _pks(model, alias, organization_id):
+    return set(_organization_rows(model, alias, organization_id).values_list('pk', flat=True))
+
+
+def _check_free(model, source, target, organization_id, batch_size):
+    pks = sorted(_pks(model, source, organization_id))
+    for start in range(0, len(pks), batch_size):
+        if model._base_manager.using(target).filter(pk__in=pks[start:start + batch_size]).exists():
+            raise ValueError(
+                f'{model._meta.verbose_name_plural} ids of this organization are already used on {target} '
+                '(migrate it again to give it its own id range).'
+            )
+
+
+def _check_range(model, source, target, organization_id):
+    # SQLite continues a table's ids after the largest one in it, whatever
+    # its sequence says, so rows from a higher range would move it along.
+    if connections[target].vendor != 'sqlite' or model not in _sequenced_models():
+        return
+    end = id_range_start(target) + SHARD_ID_RANGE
+    if _organization_rows(model, source, organization_id).filter(pk__gt=end).exists():
+        raise ValueError(
+            f'{model._meta.verbose_name_plural} ids of this organization are above the id range of {target}, '
+            'which SQLite would then continue from; move it to a database with a higher range.'
+        )
+
+
+def move_tenant(slug, target, batch_size=1000, drain_seconds=2.0, log=print):
+    """
+    Move the organization ``slug`` and everything it owns to the database ``target``.
+
+    The organization stays writable while its rows are copied. It is then
+    made read-only (writes fail with TenantMoving) for ``drain_seconds``,
+    so requests already running finish, and for the catch-up: rows added,
+    changed or deleted during the copy are applied to ``target``. The
+    directory is switched to ``target`` and the rows are deleted from the
+    old database. Ids are kept; each database hands out its own id range
+    (see reserve_id_range), so they are free on ``target``.
+    Returns the number of rows moved per model.
+    """
+    if target not in all_aliases():
+        raise ValueError(f"Unknown database '{target}', expected one of: {', '.join(all_aliases())}.")
+    current = placement(slug=slug)
+    source = current.alias if current else DEFAULT_DB_ALIAS
+    organization = Organization._base_manager.using(source).filter(slug=slug).first()
+    if organization is None:
+        raise ValueError(f"Organization '{slug}' not found on {source}.")
+    if source == target:
+        raise ValueError(f"Organization '{slug}' already lives on {target}.")
+    organization_id = organization.pk
+    for model, _ in MOVE_PLAN:
+        _check_free(model, source, target, organization_id, batch_size)
+        _check_range(model, source, target, organization_id)
+
+    started = timezone.now()
+    moved = {}
+    try:
+        with transaction.atomic(using=target):
+            for model, _ in MOVE_PLAN:
+                moved[model.__name__] = _copy(model, source, target, _pks(model, source, organization_id), batch_size)
+            reserve_id_range(target)
+        log(f"Copied {sum(moved.values())} rows of '{slug}' from {source} to {target}.")
+
+        current, _ = TenantPlacement.objects.update_or_create(
+            organization_id=organization_id, defaults={'slug': slug, 'alias': source, 'read_only': True},
+        )
+        time.sleep(drain_seconds)
+        changed = 0
+        with transaction.atomic(using=target):
+            # Foreign keys are checked at commit, so children can be
+            # re-inserted before their parents.
+            for model, mode in reversed(MOVE_PLAN):
+                source_pks, target_pks = _pks(model, source, organization_id), _pks(model, target, organization_id)
+                stale = target_pks - source_pks
+                if mode == 'all':
+                    stale |= target_pks & source_pks
+                elif mode == 'updated':
+                    stale |= target_pks & set(_organization_rows(model, source, organization_id).filter(
+                        updated_at__gte=started).values_list('pk', flat=True))
+                _delete(model, target, stale, batch_size)
+                changed += _copy(model, source, target, source_pks - (target_pks - stale), batch_size)
+                moved[model.__name__] = len(source_pks)
+            reserve_id_range(target)
+    except BaseException:
+        # Back to where it was: writable on the old database, nothing on the new one.
+        with transaction.atomic(using=target):
+            for model, _ in reversed(MOVE_PLAN):
+                _delete(model, target, _pks(model, target, organization_id), batch_size)
+        if source == DEFAULT_DB_ALIAS:
+            TenantPlacement.objects.filter(organization_id=organization_id).delete()
+        else:
+            TenantPlacement.objects.filter(organization_id=organization_id).update(read_only=False)
+        raise
+
+    # Only switched once the rows are committed on the new database.
+    if target == DEFAULT_DB_ALIAS:
+        current.delete()
+    else:
+        current.alias, current.read_only = target, False
+        current.save()
+    log(f"Applied {changed} rows changed during the copy; '{slug}' now lives on {target}.")
+
+    with transaction.atomic(using=source):
+        for model, _ in reversed(MOVE_PLAN):
+            _delete(model, source, _pks(model, source, organization_id), batch_size)
+    log(f"Deleted '{slug}' from {source}.")
+    return moved
@@ -0,0 +1,168 @@
+"""
+Startup profiling and schema pre-warming.
+
+``python -X importtime -m projects.startup`` runs the probe below in a fresh
+interpreter: it boots Django the way a worker does and prints the time spent
+in each phase as JSON. The startup_report command runs it and combines it
+with the interpreter's per-module import times.
+
+Only the standard library is imported at module level so the probe measures
+Django's startup and nothing else.
+"""
+import json
+import os
+import re
+import statistics
+import subprocess
+import sys
+import time
+from collections import defaultdict
+from pathlib import Path
+
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+IMPORTTIME_LINE = re.compile(r'^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)\s*$')
+
+
+def _timed(timings, key, func):
+    def wrapper(*args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            timings[key] = timings.get(key, 0.0) + time.perf_counter() - start
+    return wrapper
+
+
+def probe(build_schema=True):
+    """
+    Boot Django and return the seconds spent per phase.
+
+    ``apps`` breaks django.setup() down per installed app into importing the
+    app, importing its models and running ready().
+    """
+    phases = {}
+    apps = defaultdict(dict)
+    start = time.perf_counter()
+
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
+    from django.conf import settings
+    settings.INSTALLED_APPS
+    phases['settings'] = time.perf_counter() - start
+
+    from django.apps.config import AppConfig
+    create = AppConfig.create.__func__
+    import_models = AppConfig.import_models
+
+    def timed_create(cls, entry):
+        return _timed(apps[entry], 'import', create)(cls, entry)
+
+    def timed_import_models(self):
+        _timed(apps[self.name], 'models', import_models)(self)
+        self.ready = _timed(apps[self.name], 'ready', self.ready)
+
+    AppConfig.create = classmethod(timed_create)
+    AppConfig.import_models = timed_import_models
+    try:
+        import django
+        mark = time.perf_counter()
+        django.setup()
+        phases['apps'] = time.perf_counter() - mark
+    finally:
+        AppConfig.create = classmethod(create)
+        AppConfig.import_models = import_models
+
+    mark = time.perf_counter()
+    from django.urls import get_resolver
+    get_resolver().url_patterns
+    phases['urlconf'] = time.perf_counter() - mark
+
+    if build_schema:
+        mark = time.perf_counter()
+        prewarm()
+        phases['schema'] = time.perf_counter() - mark
+
+    phases['total'] = time.perf_counter() - start
+    return {
+        'profile': settings.STARTUP_PROFILE,
+        'installed_apps': list(settings.INSTALLED_APPS),
+        'phases': phases,
+        'apps': dict(apps),
+    }
+
+
+def prewarm():
+    """
+    Import the URLconf and build the GraphQL schema now instead of on the first request.
+
+    Called from wsgi.py/asgi.py when ``PREWARM_SCHEMA`` is set; with a
+    preloading server (``gunicorn --preload``) this runs once in the parent
+    and every forked worker starts with the schema already built.
+    """
+    from django.urls import get_resolver
+    from graphene_django.settings import graphene_settings
+    get_resolver().url_patterns
+    return graphene_settings.SCHEMA
+
+
+def parse_importtime(stderr):
+    """Sum ``-X importtime`` output into {top-level package: (self_us, cumulative_us)}."""
+    totals = defaultdict(lambda: [0, 0])
+    for line in stderr.splitlines():
+        match = IMPORTTIME_LINE.match(line)
+        if not match:
+            continue
+        self_us, cumulative_us, indent, name = match.groups()
+        package = totals[name.split('.')[0]]
+        package[0] += int(self_us)
+        if len(indent) == 1:
+            # Outermost imports only, so nested imports aren't counted twice.
+            package[1] += int(cumulative_us)
+    return {name: tuple(values) for name, values in totals.items()}
+
+
+def run_probe(profile='full', build_schema=True, importtime=True, python=sys.executable):
+    """Run the probe in a fresh interpreter with ``DJANGO_STARTUP_PROFILE=profile``."""
+    env = {**os.environ, 'DJANGO_STARTUP_PROFILE': profile, 'PYTHONPATH': str(BASE_DIR)}
+    env.pop('DJANGO_PREWARM_SCHEMA', None)
+    args = [python] + (['-X', 'importtime'] if importtime else []) + ['-m', 'projects.startup']
+    if not build_schema:
+        args.append('--no-schema')
+    start = time.perf_counter()
+    result = subprocess.run(args, cwd=BASE_DIR, env=env, capture_output=True, text=True, check=False)
+    wall = time.perf_counter() - start
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.strip().splitlines()[-1] if result.stderr.strip() else 'Startup probe failed.')
+    report = json.loads(result.stdout.strip().splitlines()[-1])
+    report['wall'] = wall
+    report['imports'] = parse_importtime(result.stderr)
+    return report
+
+
+def compare(profiles=('full', 'lean'), runs=5, python=sys.executable):
+    """
+    Median cold start per profile, with and without building the schema.
+
+    ``ready`` is what a worker pays before it can serve (schema built on the
+    first request, or before the fork when pre-warmed); ``with_schema`` is a
+    worker that builds it itself. Runs without ``-X importtime``, whose
+    bookkeeping would inflate the numbers.
+    """
+    samples = defaultdict(list)
+    for _ in range(runs):
+        # Interleaved so that drift in machine load affects every variant alike.
+        for profile in profiles:
+            for build_schema in (False, True):
+                report = run_probe(profile, build_schema, False, python)
+                samples[(profile, build_schema)].append(report['phases']['total'])
+    return {
+        profile: {
+            'ready': statistics.median(samples[(profile, False)]),
+            'with_schema': statistics.median(samples[(profile, True)]),
+        }
+        for profile in profiles
+    }
+
+if __name__ == '__main__':
+    sys.path.insert(0, str(BASE_DIR))
+    print(json.dumps(probe(build_schema='--no-schema' not in sys.argv[1:])))
@@ -1,46 +1,65 @@
 import graphene
-from channels.layers import get_channel_layer
-from asgiref.sync import async_to_sync
+from django.utils.dateparse import parse_datetime
+from .models import Task
+from .outbox import enqueue
 from .types import TaskType, ProjectType, TaskCommentType
 
 
+class BoardPresenceType(graphene.ObjectType):
+    """Viewers of a project board that joined or left since the last message."""
+    project_id = graphene.ID()
+    joined = graphene.List(graphene.NonNull(graphene.ID))
+    left = graphene.List(graphene.NonNull(graphene.ID))
+    viewer_count = graphene.Int()
+
+
+class DeadlineReminderType(graphene.ObjectType):
+    """A due-soon or overdue reminder sent by the reminder scheduler (manage.py run_reminders)."""
+    reminder = graphene.String()
+    due_date = graphene.DateTime()
+    task = graphene.Field(TaskType)
+    project = graphene.Field(ProjectType)
+
+
 class Subscription(graphene.ObjectType):
     task_updated = graphene.Field(TaskType, project_id=graphene.ID(required=True))
     comment_added = graphene.Field(TaskCommentType, task_id=graphene.ID(required=True))
     project_updated = graphene.Field(ProjectType, organization_slug=graphene.String(required=True))
+    # Reminders for the project's tasks, or for the organization's projects;
+    # ``reminder`` is 'due_soon' or 'overdue'.
+    task_reminder = graphene.Field(DeadlineReminderType, project_id=graphene.ID(required=True))
+    project_reminder = graphene.Field(DeadlineReminderType, organization_slug=graphene.String(required=True))
+    # Subscribing marks user_id as viewing the board; the first message
+    # lists the current viewers, later ones are batched diffs.
+    board_presence = graphene.Field(
+        BoardPresenceType, project_id=graphene.ID(required=True), user_id=graphene.ID(required=True)
+    )
+
 
+# The notify_* helpers write to the outbox in the caller's transaction; the
+# outbox dispatcher (manage.py dispatch_outbox) delivers them to the groups.
 
 def notify_task_updated(task):
     """Send notification when a task is updated."""
-    channel_layer = get_channel_layer()
-    async_to_sync(channel_layer.group_send)(
-        f'project_{task.project_id}_tasks',
-        {
-            'type': 'task.updated',
-            'task_id': task.id,
-        }
-    )
+    enqueue(f'project_{task.project_id}_tasks', 'task.updated', {'task_id': task.id})
 
 
 def notify_comment_added(comment):
     """Send notification when a comment is added."""
-    channel_layer = get_channel_layer()
-    async_to_sync(channel_layer.group_send)(
-        f'task_{comment.task_id}_comments',
-        {
-            'type': 'comment.added',
-            'comment_id': comment.id,
-        }
-    )
+    enqueue(f'task_{comment.task_id}_comments', 'comment.added', {'comment_id': comment.id})
 
 
 def notify_project_updated(project):
     """Send notification when a project is updated."""
-    channel_layer = get_channel_layer()
-    async_to_sync(channel_layer.group_send)(
-        f'org_{project.organization.slug}_projects',
-        {
-            'type': 'project.updated',
-            'project_id': project.id,
-        }
-    )
+    enqueue(f'org_{project.organization.slug}_projects', 'project.updated', {'project_id': project.id})
+
+
+def reminder_value(instance, event):
+    """The DeadlineReminderType value of a ``task.reminder`` or ``project.reminder`` event about ``instance``."""
+    is_task = isinstance(instance, Task)
+    return {
+        'reminder': event['reminder'],
+        'due_date': parse_datetime(event['due_date']),
+        'task': instance if is_task else None,
+        'project': instance.project if is_task else instance,
+    }
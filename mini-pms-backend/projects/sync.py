@@ -0,0 +1,100 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from .models import Project, Task, TaskComment, Tombstone
+from .pagination import InvalidCursor, decode_cursor, encode_cursor
+
+
+DEFAULTS = {
+    # Rows whose updated_at is this close before the cursor are sent again,
+    # so a transaction that committed after a sync but stamped its rows
+    # before it is not missed. Clients apply changes idempotently.
+    'OVERLAP_SECONDS': 30,
+    'TOMBSTONE_RETENTION_DAYS': 30,
+    'MAX_CHANGES': 1000,
+}
+
+
+def _config():
+    return {**DEFAULTS, **getattr(settings, 'SYNC', {})}
+
+
+def record_tombstone(kind, object_id, organization_id, project_id=None):
+    """Note a deletion for changesSince, in the caller's transaction."""
+    return Tombstone.objects.create(
+        kind=kind, object_id=object_id, organization_id=organization_id, project_id=project_id
+    )
+
+
+def record_tombstones(kind, rows):
+    """Like record_tombstone, for many (object_id, organization_id, project_id) rows in one insert."""
+    return Tombstone.objects.bulk_create([
+        Tombstone(kind=kind, object_id=object_id, organization_id=organization_id, project_id=project_id)
+        for object_id, organization_id, project_id in rows
+    ])
+
+
+def decode_sync_cursor(cursor):
+    (value,) = decode_cursor(cursor, 1)
+    since = parse_datetime(value) if isinstance(value, str) else None
+    if since is None:
+        raise InvalidCursor('Invalid cursor.')
+    return since
+
+
+def changes_since(organization, cursor=None, now=None):
+    """
+    Projects, tasks and comments of ``organization`` changed since ``cursor``, plus tombstones.
+
+    Every list is a range scan over an updated_at (or deleted_at) index, so
+    the work follows the number of changes, not the size of the tables.
+    Returns a dict with a new ``cursor`` and ``full_resync`` set when the
+    client must reload instead: no cursor yet, a cursor older than the
+    tombstone retention, or more than MAX_CHANGES rows of one kind.
+    """
+    config = _config()
+    now = now or timezone.now()
+    result = {
+        'cursor': encode_cursor(now),
+        'full_resync': True,
+        'projects': [],
+        'tasks': [],
+        'comments': [],
+        'deleted': [],
+    }
+    if cursor is None:
+        return result
+    since = decode_sync_cursor(cursor)
+    if since < now - timedelta(days=config['TOMBSTONE_RETENTION_DAYS']):
+        return result
+
+    since -= timedelta(seconds=config['OVERLAP_SECONDS'])
+    limit = config['MAX_CHANGES']
+    changes = {
+        'projects': Project.objects.filter(
+            organization=organization, updated_at__gte=since
+        ).select_related('organization').order_by('updated_at', 'id'),
+        'tasks': Task.objects.filter(
+            updated_at__gte=since, project__organization=organization, project__deleted_at__isnull=True
+        ).select_related('project').order_by('updated_at', 'id'),
+        'comments': TaskComment.objects.filter(
+            updated_at__gte=since, task__project__organization=organization, task__project__deleted_at__isnull=True
+        ).order_by('updated_at', 'id'),
+        'deleted': Tombstone.objects.filter(organization=organization, deleted_at__gte=since),
+    }
+    for key, queryset in changes.items():
+        rows = list(queryset[:limit + 1])
+        if len(rows) > limit:
+            return {**result, 'projects': [], 'tasks': [], 'comments': [], 'deleted': []}
+        result[key] = rows
+    result['full_resync'] = False
+    return result
+
+
+def prune_tombstones(now=None):
+    """Delete tombstones older than the retention period; returns how many."""
+    cutoff = (now or timezone.now()) - timedelta(days=_config()['TOMBSTONE_RETENTION_DAYS'])
+    return Tombstone.objects.filter(deleted_at__lt=cutoff).delete()[0]
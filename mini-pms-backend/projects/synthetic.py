@@ -0,0 +1,189 @@
+import random
+from datetime import timedelta
+
+from django.contrib.auth.hashers import make_password
+from django.utils import timezone
+
+from .models import Organization, Project, Task, TaskComment, User
+
+
+class SyntheticDataset:
+    """Identifiers of a seeded dataset, used to parameterize workload operations."""
+
+    def __init__(self):
+        self.organization_ids = []
+        self.organization_slugs = []
+        self.project_ids = []
+        self.task_ids = []
+        self.assignee_emails = []
+
+    def sample(self, values, index=0):
+        return values[index % len(values)] if values else None
+
+
+def seed_dataset(organizations=2, projects_per_org=10, tasks_per_project=200, comments_per_task=2,
+                 members_per_org=5, seed=0, batch_size=1000, prefix='synthetic'):
+    """
+    Create a deterministic synthetic dataset with bulk_create and return its ids.
+
+    Task statuses, assignees and due dates are spread the way boards look in
+    practice: most tasks DONE, a handful of assignees per org, and due dates
+    both past and future with some left empty.
+    """
+    rng = random.Random(seed)
+    dataset = SyntheticDataset()
+    now = timezone.now()
+    unusable_password = make_password(None)
+
+    orgs = Organization.objects.bulk_create([
+        Organization(name=f'{prefix.title()} Org {i}', slug=f'{prefix}-org-{i}', contact_email=f'admin@{prefix}{i}.example.com')
+        for i in range(organizations)
+    ])
+    orgs = list(Organization.objects.filter(slug__in=[org.slug for org in orgs]).order_by('id'))
+    dataset.organization_ids = [org.id for org in orgs]
+    dataset.organization_slugs = [org.slug for org in orgs]
+
+    members = []
+    for org in orgs:
+        for m in range(members_per_org):
+            members.append(User(
+                email=f'member{m}@{org.slug}.example.com',
+                name=f'Member {m}',
+                organization=org,
+                role='ORG_ADMIN' if m == 0 else 'ORG_MEMBER',
+                password=unusable_password,
+            ))
+    User.objects.bulk_create(members, batch_size=batch_size)
+    emails_by_org = {}
+    for member in members:
+        emails_by_org.setdefault(member.organization_id, []).append(member.email)
+    dataset.assignee_emails = [member.email for member in members]
+
+    Project.objects.bulk_create([
+        Project(
+            organization=org,
+            name=f'Project {p}',
+            description=f'Synthetic project {p}',
+            status=rng.choice(['ACTIVE', 'ACTIVE', 'COMPLETED', 'ON_HOLD']),
+            due_date=(now + timedelta(days=rng.randint(-60, 120))).date(),
+        )
+        for org in orgs
+        for p in range(projects_per_org)
+    ], batch_size=batch_size)
+    projects = list(Project.objects.filter(organization__in=orgs).order_by('id').values_list('id', 'organization_id'))
+    dataset.project_ids = [project_id for project_id, _ in projects]
+
+    batch = []
+    for project_id, org_id in projects:
+        emails = emails_by_org.get(org_id, [''])
+        for t in range(tasks_per_project):
+            due_in = rng.randint(-30, 60)
+            batch.append(Task(
+                project_id=project_id,
+                title=f'Task {t}',
+                description='Synthetic task',
+                status=rng.choices(['TODO', 'IN_PROGRESS', 'DONE'], weights=[2, 1, 5])[0],
+                assignee_email=rng.choice(emails + ['']),
+                due_date=None if rng.random() < 0.3 else now + timedelta(days=due_in, hours=rng.randint(0, 23)),
+            ))
+            if len(batch) >= batch_size:
+                Task.objects.bulk_create(batch)
+                batch = []
+    if batch:
+        Task.objects.bulk_create(batch)
+
+    task_ids = list(Task.objects.filter(project_id__in=dataset.project_ids).order_by('id').values_list('id', flat=True))
+    dataset.task_ids = task_ids
+
+    batch = []
+    for task_id in task_ids:
+        for c in range(comments_per_task):
+            batch.append(TaskComment(
+                task_id=task_id,
+                content=f'Comment {c}',
+                author_email=rng.choice(dataset.assignee_emails) if dataset.assignee_emails else 'author@example.com',
+            ))
+            if len(batch) >= batch_size:
+                TaskComment.objects.bulk_create(batch)
+                batch = []
+    if batch:
+        TaskComment.objects.bulk_create(batch)
+
+    return dataset
+
+
+# Representative GraphQL workload: (name, query, variables(dataset)).
+WORKLOAD = [
+    (
+        'projects',
+        '''query Projects($slug: String!) {
+            projects(organizationSlug: $slug) { id name status taskCount completionRate }
+        }''',
+        lambda ds: {'slug': ds.sample(ds.organization_slugs)},
+    ),
+    (
+        'project',
+        '''query Project($id: ID!) {
+            project(id: $id) { id name status tasks { id title status } }
+        }''',
+        lambda ds: {'id': ds.sample(ds.project_ids)},
+    ),
+    (
+        'tasks',
+        '''query Tasks($projectId: ID!) {
+            tasks(projectId: $projectId) { id title status assigneeEmail dueDate comments { id } }
+        }''',
+        lambda ds: {'projectId': ds.sample(ds.project_ids)},
+    ),
+    (
+        'tasks_by_status',
+        '''query TasksByStatus($projectId: ID!) {
+            tasks(projectId: $projectId, status: "IN_PROGRESS") { id title }
+        }''',
+        lambda ds: {'projectId': ds.sample(ds.project_ids, 1)},
+    ),
+    (
+        'tasks_by_assignee',
+        '''query TasksByAssignee($projectId: ID!, $email: String!) {
+            tasks(projectId: $projectId, assigneeEmail: $email) { id title dueDate }
+        }''',
+        lambda ds: {'projectId': ds.sample(ds.project_ids), 'email': ds.sample(ds.assignee_emails, 1)},
+    ),
+    (
+        'task',
+        '''query Task($id: ID!) {
+            task(id: $id) { id title comments { id content authorEmail createdAt } }
+        }''',
+        lambda ds: {'id': ds.sample(ds.task_ids)},
+    ),
+    (
+        'project_statistics',
+        '''query Statistics($slug: String!) {
+            projectStatistics(organizationSlug: $slug) { totalProjects totalTasks completedTasks }
+        }''',
+        lambda ds: {'slug': ds.sample(ds.organization_slugs)},
+    ),
+    (
+        'org_members',
+        '''query Members($organizationId: ID!) {
+            orgMembers(organizationId: $organizationId) { id email name role }
+        }''',
+        lambda ds: {'organizationId': ds.sample(ds.organization_ids)},
+    ),
+]
+
+
+def due_window_scan(ds, hours=24):
+    """The due-date range scan a deadline job runs (no GraphQL resolver filters on due_date)."""
+    now = timezone.now()
+    return list(
+        Task.objects.filter(due_date__gte=now, due_date__lt=now + timedelta(hours=hours))
+        .order_by('due_date')
+        .values_list('id', 'due_date')
+    )
+
+
+# Statements issued outside GraphQL that belong to the same workload: (name, callable(dataset)).
+ORM_WORKLOAD = [
+    ('due_window_scan', due_window_scan),
+]
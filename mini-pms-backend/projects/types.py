@@ -1,17 +1,32 @@
 import graphene
 from graphene_django import DjangoObjectType
-from .models import Organization, Project, Task, TaskComment, User
+from graphql import GraphQLError
+from .archive import archived_comments, as_comment, find_project
+from .loaders import get_loader, prime_comment_counts, prime_task_counts
+from .models import ArchivedTaskComment, Organization, Project, Task, TaskComment, User
+from .pagination import InvalidCursor, clamp_page_size, created_at_page
+
+
+MAX_RECENT_PROJECTS = 20
 
 
 class OrganizationType(DjangoObjectType):
     project_count = graphene.Int()
+    recent_projects = graphene.List(lambda: ProjectType, limit=graphene.Int(default_value=5))
 
     class Meta:
         model = Organization
         fields = ['id', 'name', 'slug', 'contact_email', 'created_at', 'updated_at']
 
     def resolve_project_count(self, info):
-        return self.projects.count()
+        # Annotated by the organization queries; counted here otherwise.
+        count = getattr(self, 'project_count', None)
+        return self.projects.count() if count is None else count
+
+    def resolve_recent_projects(self, info, limit):
+        limit = clamp_page_size(limit, maximum=MAX_RECENT_PROJECTS)
+        projects = get_loader(info.context, 'recent_projects').load(self.pk, limit, using=self._state.db)
+        return prime_task_counts(info.context, projects)
 
 
 class TaskCommentType(DjangoObjectType):
@@ -20,29 +35,133 @@ class TaskCommentType(DjangoObjectType):
         fields = ['id', 'content', 'author_email', 'created_at', 'updated_at', 'task']
 
 
+class CommentPageType(graphene.ObjectType):
+    items = graphene.List(TaskCommentType)
+    next_cursor = graphene.String()
+    has_next_page = graphene.Boolean()
+
+
 class TaskType(DjangoObjectType):
+    is_archived = graphene.Boolean()
+    comment_count = graphene.Int()
+    comment_page = graphene.Field(CommentPageType, first=graphene.Int(), after=graphene.String())
+
     class Meta:
         model = Task
         fields = ['id', 'title', 'description', 'status', 'assignee_email', 'due_date', 'created_at', 'updated_at', 'project', 'comments']
 
+    def resolve_is_archived(self, info):
+        return getattr(self, 'is_archived', False)
+
+    def resolve_project(self, info):
+        if getattr(self, 'is_archived', False):
+            return find_project(self.project_id, include_archived=True)
+        return self.project
+
+    def resolve_comments(self, info):
+        if getattr(self, 'is_archived', False):
+            return archived_comments(self.id, using=self._state.db)
+        return get_loader(info.context, 'comments').load(self.id, using=self._state.db)
+
+    def resolve_comment_count(self, info):
+        if getattr(self, 'is_archived', False):
+            return get_loader(info.context, 'archived_comment_count').load(self.id, using=self._state.db)
+        return get_loader(info.context, 'comment_count').load(self.id, using=self._state.db)
+
+    def resolve_comment_page(self, info, first=None, after=None):
+        archived = getattr(self, 'is_archived', False)
+        model = ArchivedTaskComment if archived else TaskComment
+        try:
+            items, next_cursor, has_next_page = created_at_page(
+                model.objects.using(self._state.db).filter(task_id=self.id), clamp_page_size(first), after
+            )
+        except InvalidCursor as e:
+            raise GraphQLError(str(e))
+        if archived:
+            items = [as_comment(row) for row in items]
+        return CommentPageType(items=items, next_cursor=next_cursor, has_next_page=has_next_page)
+
+
+class TaskPageType(graphene.ObjectType):
+    items = graphene.List(TaskType)
+    next_cursor = graphene.String()
+    has_next_page = graphene.Boolean()
+
+
+class BoardColumnType(graphene.ObjectType):
+    status = graphene.String()
+    count = graphene.Int()
+    items = graphene.List(TaskType)
+    next_cursor = graphene.String()
+    has_next_page = graphene.Boolean()
+
+
+class BoardType(graphene.ObjectType):
+    project_id = graphene.ID()
+    columns = graphene.List(BoardColumnType)
+
+
+def _archived_tasks(info, project):
+    return get_loader(info.context, 'archived_tasks').load(project.id, using=project._state.db)
+
+
+def _archived_task_counts(info, project):
+    """(total, done) counts of a project's archived tasks."""
+    if getattr(project, 'is_archived', False):
+        tasks = _archived_tasks(info, project)
+        return len(tasks), sum(1 for task in tasks if task.status == 'DONE')
+    return get_loader(info.context, 'archived_task_counts').load(project.id, using=project._state.db)
+
 
 class ProjectType(DjangoObjectType):
     task_count = graphene.Int()
     completed_tasks = graphene.Int()
     completion_rate = graphene.Float()
+    is_archived = graphene.Boolean()
 
     class Meta:
         model = Project
         fields = ['id', 'name', 'description', 'status', 'due_date', 'created_at', 'updated_at', 'organization', 'tasks']
 
+    def resolve_tasks(self, info):
+        if getattr(self, 'is_archived', False):
+            return prime_comment_counts(info.context, _archived_tasks(info, self))
+        return prime_comment_counts(info.context, list(self.tasks.all()))
+
+    # Archived DONE tasks of a live project still count towards its figures.
     def resolve_task_count(self, info):
-        return self.task_count
+        total = _archived_task_counts(info, self)[0]
+        return total if getattr(self, 'is_archived', False) else self.task_count + total
 
     def resolve_completed_tasks(self, info):
-        return self.completed_tasks
+        done = _archived_task_counts(info, self)[1]
+        return done if getattr(self, 'is_archived', False) else self.completed_tasks + done
 
     def resolve_completion_rate(self, info):
-        return self.completion_rate
+        total = ProjectType.resolve_task_count(self, info)
+        return round(ProjectType.resolve_completed_tasks(self, info) / total * 100, 1) if total else 0
+
+    def resolve_is_archived(self, info):
+        return getattr(self, 'is_archived', False)
+
+
+class TombstoneType(graphene.ObjectType):
+    kind = graphene.String()
+    id = graphene.ID()
+    project_id = graphene.ID()
+    deleted_at = graphene.DateTime()
+
+    def resolve_id(self, info):
+        return self.object_id
+
+
+class SyncType(graphene.ObjectType):
+    cursor = graphene.String()
+    full_resync = graphene.Boolean()
+    projects = graphene.List(ProjectType)
+    tasks = graphene.List(TaskType)
+    comments = graphene.List(TaskCommentType)
+    deleted = graphene.List(TombstoneType)
 
 
 # Input Types
@@ -86,6 +205,18 @@ class ProjectStatisticsType(graphene.ObjectType):
     overall_completion_rate = graphene.Float()
 
 
+class BurndownPointType(graphene.ObjectType):
+    date = graphene.Date()
+    todo = graphene.Int()
+    in_progress = graphene.Int()
+    done = graphene.Int()
+    remaining = graphene.Int()
+    created = graphene.Int()
+    completed = graphene.Int()
+    reopened = graphene.Int()
+    deleted = graphene.Int()
+
+
 # User Types
 class UserType(DjangoObjectType):
     is_org_admin = graphene.Boolean()
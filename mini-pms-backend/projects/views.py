@@ -1,3 +1,149 @@
-from django.shortcuts import render
+from asgiref.sync import sync_to_async
+from django.core.handlers.asgi import ASGIRequest
+from django.http import HttpResponseBadRequest, JsonResponse, StreamingHttpResponse
+from django.views.decorators.http import require_POST
+from graphene_django.views import GraphQLView, HttpError
+from graphql import OperationType, get_operation_ast, parse
+from graphql.error import GraphQLError
 
-# Create your views here.
+from .encoding import get_encoder, gzip_response
+from .importers import DEFAULT_BATCH_SIZE, import_upload
+from .incremental import MULTIPART_CONTENT_TYPE, IncrementalExecutionContext, multipart_body
+from .loaders import clear_loaders
+from .models import Organization
+from .sharding import bind_scope, organization_scope
+
+
+MAX_BATCH_OPERATIONS = 20
+
+_DONE = object()
+
+
+@require_POST
+def import_view(request):
+    """Stream an uploaded CSV/JSON file of projects and tasks into an organization."""
+    org = getattr(request, 'organization', None)
+    slug = request.POST.get('organization_slug')
+    if slug:
+        with organization_scope(slug):
+            org = Organization.objects.filter(slug=slug).first()
+    if org is None:
+        return JsonResponse({'success': False, 'errors': ['Organization not found.']}, status=404)
+
+    upload = request.FILES.get('file')
+    if upload is None:
+        return JsonResponse({'success': False, 'errors': ['File is required.']}, status=400)
+
+    file_format = request.POST.get('format') or None
+    if file_format not in (None, 'csv', 'json'):
+        return JsonResponse({'success': False, 'errors': ['Format must be one of: csv, json.']}, status=400)
+
+    try:
+        batch_size = int(request.POST.get('batch_size') or DEFAULT_BATCH_SIZE)
+    except ValueError:
+        batch_size = 0
+    if batch_size < 1:
+        return JsonResponse({'success': False, 'errors': ['Batch size must be a positive integer.']}, status=400)
+
+    try:
+        with organization_scope(org.slug):
+            result = import_upload(org, upload, file_format=file_format, batch_size=batch_size)
+    except (ValueError, UnicodeDecodeError) as e:
+        return JsonResponse({'success': False, 'errors': [str(e)]}, status=400)
+
+    return JsonResponse({'success': not result.has_errors(), **result.as_dict()})
+
+
+async def _pull_async(parts):
+    """
+    Iterate the sync iterator ``parts`` from the event loop, one item at a time.
+
+    Django consumes a sync iterator entirely before sending anything under
+    ASGI; pulling each part on the request's sync thread lets every part go
+    out as soon as it is ready.
+    """
+    pull = sync_to_async(next, thread_sensitive=True)
+    while True:
+        part = await pull(parts, _DONE)
+        if part is _DONE:
+            return
+        yield part
+
+
+def _is_mutation(query, operation_name):
+    try:
+        operation = get_operation_ast(parse(query), operation_name)
+    except GraphQLError:
+        return False
+    return operation is not None and operation.operation == OperationType.MUTATION
+
+
+class BatchGraphQLView(GraphQLView):
+    """
+    GraphQL endpoint that also accepts a JSON array of operations (Apollo's BatchHttpLink).
+
+    The operations of a batch run in order within one request: they share
+    the request as context, and with it the per-request loaders and the
+    database connection, and their results are returned as an array in the
+    same order. A single operation object is handled as before.
+
+    Responses are encoded with the GRAPHQL_RESPONSE encoder (orjson when
+    installed) and gzipped when the client accepts it and the body is at
+    least GZIP_MIN_SIZE bytes.
+
+    A single operation from a client that accepts multipart/mixed runs with
+    @defer and @stream honoured: the response streams the initial result
+    and then one part per deferred fragment or stream batch, each sent as it
+    is executed under both WSGI and ASGI. Other clients
+    get the whole result at once, as if the directives were not there.
+    """
+    subsequent = None
+
+    def dispatch(self, request, *args, **kwargs):
+        response = super().dispatch(request, *args, **kwargs)
+        if self.subsequent is not None and response.status_code == 200:
+            # Later parts are executed while the body streams, after the
+            # middleware's tenant scope has ended.
+            parts = bind_scope(multipart_body(response.content.decode(), self.subsequent, get_encoder()))
+            if isinstance(request, ASGIRequest):
+                parts = _pull_async(parts)
+            return StreamingHttpResponse(parts, content_type=MULTIPART_CONTENT_TYPE)
+        return gzip_response(request, response)
+
+    def json_encode(self, request, d, pretty=False):
+        if self.subsequent is not None and 'data' in d:
+            d = {**d, 'hasNext': True}
+        if self.pretty or pretty or request.GET.get('pretty'):
+            return super().json_encode(request, d, pretty)
+        return get_encoder()(d)
+
+    def parse_body(self, request):
+        if self.get_content_type(request) == 'application/json':
+            self.batch = request.body.lstrip()[:1] == b'['
+        data = super().parse_body(request)
+        if self.batch:
+            if len(data) > MAX_BATCH_OPERATIONS:
+                raise HttpError(HttpResponseBadRequest(f'A batch can contain at most {MAX_BATCH_OPERATIONS} operations.'))
+            if not all(isinstance(entry, dict) for entry in data):
+                raise HttpError(HttpResponseBadRequest('Every operation in a batch must be an object.'))
+        elif 'multipart/mixed' in request.headers.get('Accept', ''):
+            self.execution_context_class = IncrementalExecutionContext
+        return data
+
+    def can_display_graphiql(self, request, data):
+        return not self.batch and super().can_display_graphiql(request, data)
+
+    def execute_graphql_request(self, request, data, query, variables, operation_name, show_graphiql=False):
+        result = super().execute_graphql_request(request, data, query, variables, operation_name, show_graphiql)
+        if self.batch and query and _is_mutation(query, operation_name):
+            # Later operations in the batch must not see counts cached before the write.
+            clear_loaders(request)
+        if not self.batch:
+            self.subsequent = getattr(result, 'subsequent', None)
+        return result
+
+    def get_response(self, request, data, show_graphiql=False):
+        result, status_code = super().get_response(request, data, show_graphiql)
+        # Each result carries its own status; a failed operation must not
+        # fail the whole batch at the HTTP level.
+        return result, 200 if self.batch else status_code
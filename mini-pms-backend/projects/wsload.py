@@ -0,0 +1,206 @@
+import asyncio
+import json
+import statistics
+import time
+
+from asgiref.sync import sync_to_async
+from channels.layers import get_channel_layer
+
+from .consumers import PROTOCOL, GraphQLSubscriptionConsumer
+from .models import Organization, Project, Task
+from .server import current_rss_mb
+
+
+SUBSCRIPTION = '''
+    subscription TaskUpdated($projectId: ID!) {
+        taskUpdated(projectId: $projectId) { id title status }
+    }
+'''
+
+
+class SimulatedClient:
+    """
+    An in-process WebSocket client driving one consumer instance.
+
+    It speaks ASGI directly to the consumer (no sockets), so thousands of
+    them fit in one process. A ``slow`` client never finishes a send, like
+    a client whose TCP window is full, so its consumer's queue backs up.
+    """
+
+    def __init__(self, application, slow=False):
+        self.application = application
+        self.slow = slow
+        self.inbox = asyncio.Queue()
+        self.accepted = False
+        self.handshake = asyncio.Event()
+        self.closed = asyncio.Event()
+        self.close_code = None
+        self.messages = []
+        self.received_at = {}
+        self.task = None
+        self._pong = None
+
+    async def _receive(self):
+        return await self.inbox.get()
+
+    async def _send(self, message):
+        if message['type'] == 'websocket.accept':
+            self.accepted = True
+            self.handshake.set()
+        elif message['type'] == 'websocket.close':
+            self.close_code = message.get('code')
+            self.handshake.set()
+            self.closed.set()
+            self.inbox.put_nowait({'type': 'websocket.disconnect', 'code': self.close_code})
+        elif message['type'] == 'websocket.send':
+            if self.slow:
+                await asyncio.Event().wait()
+            parsed = json.loads(message['text'])
+            self.messages.append(parsed)
+            if parsed['type'] == 'next':
+                task = (parsed['payload'].get('data') or {}).get('taskUpdated')
+                if task:
+                    self.received_at[task['title']] = time.perf_counter()
+            elif parsed['type'] == 'ping':
+                self.send_json({'type': 'pong'})
+            elif parsed['type'] == 'pong' and self._pong is not None:
+                self._pong.set()
+
+    def send_json(self, message):
+        self.inbox.put_nowait({'type': 'websocket.receive', 'text': json.dumps(message)})
+
+    async def connect(self, subprotocols=(PROTOCOL,)):
+        scope = {'type': 'websocket', 'path': '/graphql/', 'subprotocols': list(subprotocols),
+                 'headers': [], 'query_string': b''}
+        self.task = asyncio.ensure_future(self.application(scope, self._receive, self._send))
+        self.inbox.put_nowait({'type': 'websocket.connect'})
+        await self.handshake.wait()
+
+    async def round_trip(self):
+        """Ping and wait for the pong (or the close), i.e. until earlier messages were processed."""
+        self._pong = asyncio.Event()
+        self.send_json({'type': 'ping'})
+        waiters = [asyncio.ensure_future(self._pong.wait()), asyncio.ensure_future(self.closed.wait())]
+        await asyncio.wait(waiters, return_when=asyncio.FIRST_COMPLETED)
+        for waiter in waiters:
+            waiter.cancel()
+
+    async def subscribe(self, project_id, sub_id='1', init=True):
+        if init:
+            self.send_json({'type': 'connection_init'})
+        self.send_json({'id': sub_id, 'type': 'subscribe',
+                        'payload': {'query': SUBSCRIPTION, 'variables': {'projectId': str(project_id)}}})
+        if not self.slow:
+            await self.round_trip()
+
+    async def disconnect(self):
+        if not self.closed.is_set():
+            self.inbox.put_nowait({'type': 'websocket.disconnect', 'code': 1000})
+        if self.task is not None:
+            try:
+                await asyncio.wait_for(self.task, 5)
+            except (asyncio.TimeoutError, asyncio.CancelledError):
+                self.task.cancel()
+
+
+def _percentile(values, fraction):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(fraction * len(values)))]
+
+
+async def run_load_test(clients=10000, events=10, slow_fraction=0.01, interval=0.2, connect_batch=500, log=print):
+    """
+    Connect ``clients`` subscribers to one task's updates and time the fan-out of ``events`` updates.
+
+    Returns a dict with connect time, RSS per connection, delivery counts
+    and fan-out latency percentiles (ms, from group_send to the client
+    receiving the message).
+    """
+    layer = get_channel_layer()
+    application = GraphQLSubscriptionConsumer.as_asgi()
+
+    @sync_to_async
+    def create_task():
+        org, _ = Organization.objects.get_or_create(
+            slug='ws-load-test', defaults={'name': 'WS Load Test', 'contact_email': 'load@example.com'}
+        )
+        project = Project.objects.create(organization=org, name='WS Load Test')
+        return org, project, Task.objects.create(project=project, title='event-0')
+
+    @sync_to_async
+    def rename(task, title):
+        Task.objects.filter(pk=task.pk).update(title=title)
+
+    @sync_to_async
+    def cleanup(org):
+        org.delete()
+
+    org, project, task = await create_task()
+    group = f'project_{project.id}_tasks'
+    slow_every = int(1 / slow_fraction) if slow_fraction else 0
+    pool = []
+    rss_before = current_rss_mb()
+    started = time.perf_counter()
+    try:
+        for first in range(0, clients, connect_batch):
+            batch = [
+                SimulatedClient(application, slow=bool(slow_every) and (first + index) % slow_every == 0)
+                for index in range(min(connect_batch, clients - first))
+            ]
+            await asyncio.gather(*(client.connect() for client in batch))
+            await asyncio.gather(*(client.subscribe(project.id) for client in batch))
+            pool += batch
+        connect_seconds = time.perf_counter() - started
+        rss_connected = current_rss_mb()
+        log(f'{len(pool)} clients connected in {connect_seconds:.1f}s, '
+            f'{(rss_connected - rss_before) * 1024 / max(len(pool), 1):.1f} KB per connection')
+
+        fast = [client for client in pool if not client.slow]
+        latencies = []
+        delivered = 0
+        for number in range(1, events + 1):
+            title = f'event-{number}'
+            await rename(task, title)
+            sent_at = time.perf_counter()
+            await layer.group_send(group, {
+                'type': 'task.updated', 'group': group, 'task_id': task.id, 'event_id': f'load-{number}',
+            })
+            deadline = time.monotonic() + 30
+            while time.monotonic() < deadline and sum(title in client.received_at for client in fast) < len(fast):
+                await asyncio.sleep(0.01)
+            times = [client.received_at[title] - sent_at for client in fast if title in client.received_at]
+            delivered += len(times)
+            latencies += times
+            log(f'{title}: {len(times)}/{len(fast)} delivered, max {max(times, default=0) * 1000:.0f} ms')
+            await asyncio.sleep(interval)
+
+        rss_after = current_rss_mb()
+        slow = [client for client in pool if client.slow]
+        return {
+            'clients': len(pool),
+            'slow_clients': len(slow),
+            'connect_seconds': connect_seconds,
+            'rss_before_mb': rss_before,
+            'rss_connected_mb': rss_connected,
+            'rss_after_mb': rss_after,
+            'kb_per_connection': (rss_connected - rss_before) * 1024 / max(len(pool), 1),
+            'events': events,
+            'delivered': delivered,
+            'expected': events * len(fast),
+            'slow_disconnected': sum(client.closed.is_set() for client in slow),
+            'latency_ms': {
+                'p50': _percentile(latencies, 0.5) * 1000,
+                'p95': _percentile(latencies, 0.95) * 1000,
+                'p99': _percentile(latencies, 0.99) * 1000,
+                'max': max(latencies, default=0) * 1000,
+                'mean': statistics.mean(latencies) * 1000 if latencies else 0.0,
+            },
+        }
+    finally:
+        for client in pool:
+            if client.task is not None and not client.task.done():
+                client.task.cancel()
+        await asyncio.gather(*(client.task for client in pool if client.task), return_exceptions=True)
+        await cleanup(org)
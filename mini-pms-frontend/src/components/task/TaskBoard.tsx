@@ -1,26 +1,26 @@
 import { useState } from 'react';
-import type { Task, TaskStatus } from '../../types';
+import type { BoardColumn, Task, TaskStatus } from '../../types';
+import { Button } from '../ui';
 import { TaskCard } from './TaskCard';
 
 interface TaskBoardProps {
-  tasks: Task[];
+  columns: BoardColumn[];
   onTaskClick: (task: Task) => void;
   onTaskStatusChange?: (taskId: string, newStatus: TaskStatus) => void;
+  onLoadMore?: (status: TaskStatus) => void;
+  loadingMore?: TaskStatus | null;
 }
 
-const columns: { status: TaskStatus; title: string; color: string; dropColor: string }[] = [
+const columnStyles: { status: TaskStatus; title: string; color: string; dropColor: string }[] = [
   { status: 'TODO', title: 'To Do', color: 'bg-gray-100', dropColor: 'bg-gray-200' },
   { status: 'IN_PROGRESS', title: 'In Progress', color: 'bg-yellow-50', dropColor: 'bg-yellow-100' },
   { status: 'DONE', title: 'Done', color: 'bg-green-50', dropColor: 'bg-green-100' },
 ];
 
-export function TaskBoard({ tasks, onTaskClick, onTaskStatusChange }: TaskBoardProps) {
+export function TaskBoard({ columns, onTaskClick, onTaskStatusChange, onLoadMore, loadingMore }: TaskBoardProps) {
   const [draggedTask, setDraggedTask] = useState<Task | null>(null);
   const [dragOverColumn, setDragOverColumn] = useState<TaskStatus | null>(null);
 
-  const getTasksByStatus = (status: TaskStatus) =>
-    tasks.filter((task) => task.status === status);
-
   const handleDragStart = (e: React.DragEvent, task: Task) => {
     setDraggedTask(task);
     e.dataTransfer.effectAllowed = 'move';
@@ -65,8 +65,10 @@ export function TaskBoard({ tasks, onTaskClick, onTaskStatusChange }: TaskBoardP
 
   return (
     <div className="grid grid-cols-1 md:grid-cols-3 gap-4">
-      {columns.map((column) => {
-        const columnTasks = getTasksByStatus(column.status);
+      {columnStyles.map((column) => {
+        const data = columns.find((c) => c.status === column.status);
+        if (!data) return null;
+        const columnTasks = data.items;
         const isDropTarget = dragOverColumn === column.status && draggedTask?.status !== column.status;
 
         return (
@@ -81,7 +83,7 @@ export function TaskBoard({ tasks, onTaskClick, onTaskStatusChange }: TaskBoardP
           >
             <div className="flex items-center justify-between mb-4">
               <h3 className="font-semibold text-gray-900">{column.title}</h3>
-              <span className="text-sm text-gray-500">{columnTasks.length}</span>
+              <span className="text-sm text-gray-500">{data.count}</span>
             </div>
             <div className="space-y-3 min-h-[100px]">
               {columnTasks.map((task) => (
@@ -105,6 +107,17 @@ export function TaskBoard({ tasks, onTaskClick, onTaskStatusChange }: TaskBoardP
                   {isDropTarget ? 'Drop here' : 'No tasks'}
                 </p>
               )}
+              {data.hasNextPage && onLoadMore && (
+                <Button
+                  variant="secondary"
+                  size="sm"
+                  className="w-full"
+                  onClick={() => onLoadMore(column.status)}
+                  loading={loadingMore === column.status}
+                >
+                  Load more ({data.count - columnTasks.length})
+                </Button>
+              )}
             </div>
           </div>
         );
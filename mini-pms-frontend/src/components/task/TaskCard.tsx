@@ -24,12 +24,12 @@ export function TaskCard({ task, onClick }: TaskCardProps) {
             {task.assigneeEmail && (
               <span className="truncate max-w-[120px]">{task.assigneeEmail}</span>
             )}
-            {task.comments && task.comments.length > 0 && (
+            {!!task.commentCount && (
               <span className="flex items-center gap-1">
                 <svg className="w-3.5 h-3.5" fill="none" stroke="currentColor" viewBox="0 0 24 24">
                   <path strokeLinecap="round" strokeLinejoin="round" strokeWidth={2} d="M8 12h.01M12 12h.01M16 12h.01M21 12c0 4.418-4.03 8-9 8a9.863 9.863 0 01-4.255-.949L3 20l1.395-3.72C3.512 15.042 3 13.574 3 12c0-4.418 4.03-8 9-8s9 3.582 9 8z" />
                 </svg>
-                {task.comments.length}
+                {task.commentCount}
               </span>
             )}
           </div>
@@ -1,14 +1,20 @@
 import { useState, useEffect } from 'react';
-import { useMutation } from '@apollo/client/react';
-import { ADD_TASK_COMMENT, DELETE_TASK_COMMENT } from '../../graphql/operations';
+import { useApolloClient, useQuery, useMutation } from '@apollo/client/react';
+import { ADD_TASK_COMMENT, DELETE_TASK_COMMENT, GET_TASK_COMMENTS } from '../../graphql/operations';
 import { useAuth } from '../../contexts/AuthContext';
 import { Button } from '../ui';
-import type { TaskComment } from '../../types';
+import type { CommentPage, TaskComment } from '../../types';
+
+const PAGE_SIZE = 20;
 
 interface TaskCommentsProps {
   taskId: string;
-  comments: TaskComment[];
-  onCommentsChange?: (comments: TaskComment[]) => void;
+  commentCount?: number;
+  onCommentCountChange?: (count: number) => void;
+}
+
+interface TaskCommentsData {
+  task: { id: string; commentPage: CommentPage } | null;
 }
 
 function getInitials(email: string): string {
@@ -31,17 +37,49 @@ function formatDate(dateString: string): string {
   return date.toLocaleDateString();
 }
 
-export function TaskComments({ taskId, comments: initialComments, onCommentsChange }: TaskCommentsProps) {
+export function TaskComments({ taskId, commentCount, onCommentCountChange }: TaskCommentsProps) {
   const { user } = useAuth();
   const [content, setContent] = useState('');
-  const [localComments, setLocalComments] = useState<TaskComment[]>(initialComments);
+  const [localComments, setLocalComments] = useState<TaskComment[]>([]);
+  const [nextCursor, setNextCursor] = useState<string | null>(null);
+  const [loadingMore, setLoadingMore] = useState(false);
+  const client = useApolloClient();
+  const { data, loading } = useQuery<TaskCommentsData>(GET_TASK_COMMENTS, {
+    variables: { id: taskId, first: PAGE_SIZE },
+    fetchPolicy: 'network-only',
+  });
   const [addComment, { loading: adding }] = useMutation(ADD_TASK_COMMENT);
   const [deleteComment] = useMutation(DELETE_TASK_COMMENT);
+  const total = commentCount ?? localComments.length;
 
-  // Sync local state when props change (e.g., when switching tasks)
+  // Reset to the first page when the query result changes (e.g., when switching tasks)
   useEffect(() => {
-    setLocalComments(initialComments);
-  }, [initialComments, taskId]);
+    const page = data?.task?.commentPage;
+    setLocalComments(page?.items ?? []);
+    setNextCursor(page?.hasNextPage ? page.nextCursor : null);
+  }, [data, taskId]);
+
+  const handleLoadMore = async () => {
+    if (!nextCursor) return;
+    setLoadingMore(true);
+    try {
+      // Later pages are kept in local state rather than merged into the cache.
+      const { data: more } = await client.query<TaskCommentsData>({
+        query: GET_TASK_COMMENTS,
+        variables: { id: taskId, first: PAGE_SIZE, after: nextCursor },
+        fetchPolicy: 'no-cache',
+      });
+      const page = more?.task?.commentPage;
+      if (page) {
+        setLocalComments(prev => [...prev, ...page.items]);
+        setNextCursor(page.hasNextPage ? page.nextCursor : null);
+      }
+    } catch (error) {
+      console.error('Error loading comments:', error);
+    } finally {
+      setLoadingMore(false);
+    }
+  };
 
   const handleSubmit = async (e: React.FormEvent) => {
     e.preventDefault();
@@ -59,10 +97,13 @@ export function TaskComments({ taskId, comments: initialComments, onCommentsChan
       });
       if (data?.addTaskComment?.success && data.addTaskComment.comment) {
         const newComment = data.addTaskComment.comment as TaskComment;
-        const updatedComments = [...localComments, newComment];
-        setLocalComments(updatedComments);
+        // Comments are ordered oldest first; while later pages are still
+        // unloaded, the new comment arrives with the last of them.
+        if (!nextCursor) {
+          setLocalComments([...localComments, newComment]);
+        }
         setContent('');
-        onCommentsChange?.(updatedComments);
+        onCommentCountChange?.(total + 1);
       }
     } catch (error) {
       console.error('Error adding comment:', error);
@@ -74,9 +115,8 @@ export function TaskComments({ taskId, comments: initialComments, onCommentsChan
     try {
       const { data } = await deleteComment({ variables: { id: commentId } });
       if (data?.deleteTaskComment?.success) {
-        const updatedComments = localComments.filter(c => c.id !== commentId);
-        setLocalComments(updatedComments);
-        onCommentsChange?.(updatedComments);
+        setLocalComments(localComments.filter(c => c.id !== commentId));
+        onCommentCountChange?.(Math.max(total - 1, 0));
       }
     } catch (error) {
       console.error('Error deleting comment:', error);
@@ -86,12 +126,14 @@ export function TaskComments({ taskId, comments: initialComments, onCommentsChan
   return (
     <div className="mt-6 pt-6 border-t border-gray-200">
       <h3 className="text-sm font-medium text-gray-900 mb-4">
-        Comments ({localComments.length})
+        Comments ({total})
       </h3>
 
       {/* Comment List */}
       <div className="space-y-4 mb-4 max-h-64 overflow-y-auto">
-        {localComments.length === 0 ? (
+        {loading && localComments.length === 0 ? (
+          <p className="text-sm text-gray-500 text-center py-4">Loading comments...</p>
+        ) : localComments.length === 0 ? (
           <p className="text-sm text-gray-500 text-center py-4">
             No comments yet. Be the first to comment!
           </p>
@@ -125,6 +167,16 @@ export function TaskComments({ taskId, comments: initialComments, onCommentsChan
             </div>
           ))
         )}
+        {nextCursor && (
+          <button
+            type="button"
+            onClick={handleLoadMore}
+            disabled={loadingMore}
+            className="w-full text-xs text-blue-600 hover:text-blue-800 py-1"
+          >
+            {loadingMore ? 'Loading...' : 'Load more comments'}
+          </button>
+        )}
       </div>
 
       {/* Add Comment Form */}
@@ -1,18 +1,64 @@
-import { ApolloClient, InMemoryCache, HttpLink, split } from '@apollo/client';
+import { ApolloClient, HttpLink, InMemoryCache, split } from '@apollo/client';
+import { Defer20220824Handler } from '@apollo/client/incremental';
+import { BatchHttpLink } from '@apollo/client/link/batch-http';
+import { SetContextLink } from '@apollo/client/link/context';
 import { GraphQLWsLink } from '@apollo/client/link/subscriptions';
 import { getMainDefinition } from '@apollo/client/utilities';
+import { BREAK, visit, type DocumentNode } from 'graphql';
 import { createClient } from 'graphql-ws';
 
-const httpLink = new HttpLink({
-  uri: import.meta.env.VITE_GRAPHQL_HTTP_URL || 'http://localhost:8000/graphql/',
+const httpUri = import.meta.env.VITE_GRAPHQL_HTTP_URL || 'http://localhost:8000/graphql/';
+
+// Operations started within batchInterval ms go out as one POST (the
+// backend answers an array of operations in order).
+const batchLink = new BatchHttpLink({
+  uri: httpUri,
+  batchMax: 20,
+  batchInterval: 10,
 });
 
+// Queries using @defer/@stream go out on their own so the backend can
+// answer with a multipart response; batched requests can't be streamed.
+const incrementalLink = new HttpLink({ uri: httpUri });
+
+const usesIncrementalDelivery = (query: DocumentNode) => {
+  let found = false;
+  visit(query, {
+    Directive(node) {
+      if (node.name.value === 'defer' || node.name.value === 'stream') {
+        found = true;
+        return BREAK;
+      }
+    },
+  });
+  return found;
+};
+
+// The backend sends each organization's queries to the database it lives
+// on, named by this header; the slug is the first segment of the URL.
+const NON_ORG_PATHS = new Set(['', 'login', 'register']);
+
+const currentOrgSlug = () => {
+  const segment = window.location.pathname.split('/')[1] ?? '';
+  return NON_ORG_PATHS.has(segment) ? undefined : decodeURIComponent(segment);
+};
+
+const orgLink = new SetContextLink((prevContext) => {
+  const slug = currentOrgSlug();
+  return slug ? { headers: { ...prevContext.headers, 'X-Organization-Slug': slug } } : {};
+});
+
+const httpLink = orgLink.concat(
+  split(({ query }) => usesIncrementalDelivery(query), incrementalLink, batchLink)
+);
+
 const wsLink = new GraphQLWsLink(
   createClient({
     url: import.meta.env.VITE_GRAPHQL_WS_URL || 'ws://localhost:8000/graphql/',
-    connectionParams: {
-      // Add authentication headers here if needed
-    },
+    // Read on every (re)connect, so the organization is the one on screen.
+    connectionParams: () => ({
+      organizationSlug: currentOrgSlug(),
+    }),
   })
 );
 
@@ -30,6 +76,7 @@ const splitLink = split(
 
 export const client = new ApolloClient({
   link: splitLink,
+  incrementalHandler: new Defer20220824Handler(),
   cache: new InMemoryCache({
     typePolicies: {
       Query: {
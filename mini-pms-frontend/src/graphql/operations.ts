@@ -164,9 +164,12 @@ export const GET_PROJECT = gql`
       dueDate
       createdAt
       updatedAt
-      taskCount
-      completedTasks
-      completionRate
+      # Counting tasks is the slow part; render the page without it.
+      ... @defer {
+        taskCount
+        completedTasks
+        completionRate
+      }
       organization {
         id
         name
@@ -208,11 +211,52 @@ export const GET_TASKS = gql`
       assigneeEmail
       dueDate
       createdAt
-      comments {
+      commentCount
+    }
+  }
+`;
+
+// Each column's count and first tasks come from one query; more tasks are
+// loaded per column with GET_BOARD_COLUMN and the column's cursor.
+export const GET_BOARD = gql`
+  query GetBoard($projectId: ID!, $first: Int, $search: String, $assigneeEmail: String) {
+    board(projectId: $projectId, first: $first, search: $search, assigneeEmail: $assigneeEmail) {
+      columns {
+        status
+        count
+        nextCursor
+        hasNextPage
+        items {
+          id
+          title
+          description
+          status
+          assigneeEmail
+          dueDate
+          createdAt
+          commentCount
+        }
+      }
+    }
+  }
+`;
+
+export const GET_BOARD_COLUMN = gql`
+  query GetBoardColumn($projectId: ID!, $status: String!, $first: Int, $after: String, $search: String, $assigneeEmail: String) {
+    boardColumn(projectId: $projectId, status: $status, first: $first, after: $after, search: $search, assigneeEmail: $assigneeEmail) {
+      status
+      count
+      nextCursor
+      hasNextPage
+      items {
         id
-        content
-        authorEmail
+        title
+        description
+        status
+        assigneeEmail
+        dueDate
         createdAt
+        commentCount
       }
     }
   }
@@ -243,6 +287,89 @@ export const GET_TASK = gql`
   }
 `;
 
+export const GET_TASK_COMMENTS = gql`
+  query GetTaskComments($id: ID!, $first: Int, $after: String) {
+    task(id: $id) {
+      id
+      commentPage(first: $first, after: $after) {
+        items {
+          id
+          content
+          authorEmail
+          createdAt
+        }
+        nextCursor
+        hasNextPage
+      }
+    }
+  }
+`;
+
+export const GET_MY_TASKS = gql`
+  query GetMyTasks($organizationSlug: String!, $email: String!, $first: Int, $after: String) {
+    myTasks(organizationSlug: $organizationSlug, email: $email, first: $first, after: $after) {
+      items {
+        id
+        title
+        status
+        dueDate
+        project {
+          id
+          name
+        }
+      }
+      nextCursor
+      hasNextPage
+    }
+  }
+`;
+
+// Delta sync: call with the cursor from the previous sync after reconnecting
+export const CHANGES_SINCE = gql`
+  query ChangesSince($organizationSlug: String!, $cursor: String) {
+    changesSince(organizationSlug: $organizationSlug, cursor: $cursor) {
+      cursor
+      fullResync
+      projects {
+        id
+        name
+        description
+        status
+        dueDate
+        updatedAt
+      }
+      tasks {
+        id
+        title
+        description
+        status
+        assigneeEmail
+        dueDate
+        updatedAt
+        commentCount
+        project {
+          id
+        }
+      }
+      comments {
+        id
+        content
+        authorEmail
+        createdAt
+        task {
+          id
+        }
+      }
+      deleted {
+        kind
+        id
+        projectId
+        deletedAt
+      }
+    }
+  }
+`;
+
 // Organization Mutations
 export const CREATE_ORGANIZATION = gql`
   mutation CreateOrganization($input: OrganizationInput!) {
@@ -419,3 +546,15 @@ export const PROJECT_UPDATED_SUBSCRIPTION = gql`
     }
   }
 `;
+
+// The first message lists the current viewers; later ones are batched
+// joined/left diffs sent about once a second.
+export const BOARD_PRESENCE_SUBSCRIPTION = gql`
+  subscription BoardPresence($projectId: ID!, $userId: ID!) {
+    boardPresence(projectId: $projectId, userId: $userId) {
+      joined
+      left
+      viewerCount
+    }
+  }
+`;
@@ -1,12 +1,14 @@
 import { useState } from 'react';
-import { useQuery, useMutation } from '@apollo/client/react';
+import { useApolloClient, useQuery, useMutation } from '@apollo/client/react';
 import { useParams, Link, useNavigate } from 'react-router-dom';
-import { GET_ORGANIZATION, GET_PROJECT, GET_TASKS, CREATE_TASK, UPDATE_TASK, DELETE_TASK, DELETE_PROJECT } from '../graphql/operations';
-import type { Task, TaskInput, Organization, Project, TaskComment, TaskStatus } from '../types';
+import { GET_ORGANIZATION, GET_PROJECT, GET_BOARD, GET_BOARD_COLUMN, CREATE_TASK, UPDATE_TASK, DELETE_TASK, DELETE_PROJECT } from '../graphql/operations';
+import type { Board, BoardColumn, Task, TaskInput, Organization, Project, TaskStatus } from '../types';
 import { Layout } from '../components/layout';
 import { TaskBoard, TaskForm, TaskComments } from '../components/task';
 import { Button, Modal, StatusBadge, LoadingOverlay, SearchInput, Select } from '../components/ui';
 
+const BOARD_PAGE_SIZE = 20;
+
 export function ProjectDetailPage() {
   const { orgSlug, projectId } = useParams<{ orgSlug: string; projectId: string }>();
   const navigate = useNavigate();
@@ -14,6 +16,10 @@ export function ProjectDetailPage() {
   const [selectedTask, setSelectedTask] = useState<Task | null>(null);
   const [search, setSearch] = useState('');
   const [statusFilter, setStatusFilter] = useState('');
+  // Tasks loaded with "Load more", per column, on top of the board's first page.
+  const [more, setMore] = useState<Partial<Record<TaskStatus, BoardColumn>>>({});
+  const [loadingMore, setLoadingMore] = useState<TaskStatus | null>(null);
+  const client = useApolloClient();
 
   const { data: orgData } = useQuery<{ organization: Organization }>(GET_ORGANIZATION, {
     variables: { slug: orgSlug },
@@ -25,10 +31,10 @@ export function ProjectDetailPage() {
     skip: !projectId,
   });
 
-  const { data: tasksData, loading: tasksLoading, refetch: refetchTasks } = useQuery<{ tasks: Task[] }>(GET_TASKS, {
+  const { data: boardData, loading: tasksLoading, refetch: refetchBoard } = useQuery<{ board: Board | null }>(GET_BOARD, {
     variables: {
       projectId,
-      status: statusFilter || undefined,
+      first: BOARD_PAGE_SIZE,
       search: search || undefined,
     },
     skip: !projectId,
@@ -41,7 +47,49 @@ export function ProjectDetailPage() {
 
   const organization = orgData?.organization;
   const project = projectData?.project;
-  const tasks = tasksData?.tasks || [];
+  const columns = (boardData?.board?.columns || [])
+    .filter((column) => !statusFilter || column.status === statusFilter)
+    .map((column) => {
+      const extra = more[column.status];
+      return extra
+        ? { ...column, items: [...column.items, ...extra.items], nextCursor: extra.nextCursor, hasNextPage: extra.hasNextPage }
+        : column;
+    });
+  const tasks = columns.flatMap((column) => column.items);
+
+  const refetchTasks = () => {
+    setMore({});
+    refetchBoard();
+  };
+
+  const handleSearchChange = (value: string) => {
+    setSearch(value);
+    setMore({});
+  };
+
+  const handleLoadMore = async (status: TaskStatus) => {
+    const column = columns.find((c) => c.status === status);
+    if (!column?.nextCursor) return;
+    setLoadingMore(status);
+    try {
+      const { data } = await client.query<{ boardColumn: BoardColumn }>({
+        query: GET_BOARD_COLUMN,
+        variables: { projectId, status, first: BOARD_PAGE_SIZE, after: column.nextCursor, search: search || undefined },
+        fetchPolicy: 'no-cache',
+      });
+      const page = data?.boardColumn;
+      if (page) {
+        setMore((prev) => ({
+          ...prev,
+          [status]: { ...page, items: [...(prev[status]?.items || []), ...page.items] },
+        }));
+      }
+    } catch (error) {
+      console.error('Error loading tasks:', error);
+    } finally {
+      setLoadingMore(null);
+    }
+  };
 
   const handleCreateTask = async (input: TaskInput) => {
     try {
@@ -102,9 +150,9 @@ export function ProjectDetailPage() {
     setSelectedTask(task);
   };
 
-  const handleCommentsChange = (comments: TaskComment[]) => {
+  const handleCommentCountChange = (commentCount: number) => {
     if (selectedTask) {
-      setSelectedTask({ ...selectedTask, comments });
+      setSelectedTask({ ...selectedTask, commentCount });
     }
   };
 
@@ -187,8 +235,8 @@ export function ProjectDetailPage() {
                 <p className="text-gray-600 mb-4">{project.description}</p>
               )}
               <div className="flex items-center gap-6 text-sm text-gray-500">
-                <span>{project.taskCount} tasks</span>
-                <span>{project.completionRate}% complete</span>
+                <span>{project.taskCount ?? '…'} tasks</span>
+                <span>{project.completionRate ?? '…'}% complete</span>
                 {project.dueDate && (
                   <span>Due: {new Date(project.dueDate).toLocaleDateString()}</span>
                 )}
@@ -212,7 +260,7 @@ export function ProjectDetailPage() {
           <div className="flex-1">
             <SearchInput
               value={search}
-              onChange={setSearch}
+              onChange={handleSearchChange}
               placeholder="Search tasks..."
             />
           </div>
@@ -225,7 +273,13 @@ export function ProjectDetailPage() {
           </div>
         </div>
 
-        <TaskBoard tasks={tasks} onTaskClick={handleTaskClick} onTaskStatusChange={handleTaskStatusChange} />
+        <TaskBoard
+          columns={columns}
+          onTaskClick={handleTaskClick}
+          onTaskStatusChange={handleTaskStatusChange}
+          onLoadMore={handleLoadMore}
+          loadingMore={loadingMore}
+        />
 
         {/* Create Task Modal */}
         <Modal
@@ -269,8 +323,8 @@ export function ProjectDetailPage() {
               </div>
               <TaskComments
                 taskId={selectedTask.id}
-                comments={selectedTask.comments || []}
-                onCommentsChange={handleCommentsChange}
+                commentCount={selectedTask.commentCount}
+                onCommentCountChange={handleCommentCountChange}
               />
             </div>
           )}
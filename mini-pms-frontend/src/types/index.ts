@@ -35,6 +35,7 @@ export interface Task {
   updatedAt: string;
   project: Project;
   comments?: TaskComment[];
+  commentCount?: number;
 }
 
 export type TaskStatus = 'TODO' | 'IN_PROGRESS' | 'DONE';
@@ -48,6 +49,24 @@ export interface TaskComment {
   task: Task;
 }
 
+export interface CommentPage {
+  items: TaskComment[];
+  nextCursor: string | null;
+  hasNextPage: boolean;
+}
+
+export interface BoardColumn {
+  status: TaskStatus;
+  count: number;
+  items: Task[];
+  nextCursor: string | null;
+  hasNextPage: boolean;
+}
+
+export interface Board {
+  columns: BoardColumn[];
+}
+
 export interface ProjectInput {
   name: string;
   description?: string;